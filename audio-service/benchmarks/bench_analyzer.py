@@ -0,0 +1,226 @@
+"""
+Micro-benchmarks for the analyzer hot paths.
+
+Times every AudioProcessor feature method on one-second chunks, full-track
+processing (process_audio, process_samples, preview) at several durations,
+and the per-segment mappers, all on deterministic synthetic signals.
+
+The suite is run several times (--rounds), each time in a fresh
+interpreter, and each benchmark keeps the median of its per-round medians:
+timings shift from one process to the next (memory layout, CPU placement)
+as well as over time on a busy host. Results are written as JSON and compared against a stored baseline;
+any benchmark whose median slows down by more than the threshold is
+reported and the exit status is 1.
+
+Usage (from audio-service/):
+    python -m benchmarks.bench_analyzer                        # run + compare
+    python -m benchmarks.bench_analyzer --save-baseline        # record a baseline
+    python -m benchmarks.bench_analyzer --durations 10 60 --repeat 7 --rounds 5 --threshold 0.15
+
+Baselines are machine-specific, so record one on the machine you compare on.
+The default threshold is sized for a shared host: there, back-to-back
+3-round runs of an unchanged tree differ by under 5% at the median
+benchmark, about 15% at the 90th percentile and up to 32% at worst. On a
+quiet, dedicated machine a tighter --threshold (such as 0.2) is usable.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from benchmarks.signals import SIGNALS
+from src.analyzer.audio_processor import AudioProcessor
+from src.analyzer.brain_mapper import brain_mapper
+from src.analyzer.brainwave_predictor import brainwave_predictor
+from src.analyzer.emotion_classifier import emotion_classifier
+from src.analyzer.segments import build_segment
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+
+
+def measure(func: Callable[[], object], repeat: int, number: int = 1) -> Dict[str, float]:
+    """Time `func`, returning per-call statistics in milliseconds."""
+    func()  # warm-up (caches, lazy imports, JIT)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number * 1000)
+    return {
+        'median_ms': round(statistics.median(times), 4),
+        'min_ms': round(min(times), 4),
+        'mean_ms': round(statistics.fmean(times), 4),
+        'stdev_ms': round(statistics.stdev(times), 4) if len(times) > 1 else 0.0,
+        'runs': repeat,
+    }
+
+
+def run_benchmarks(durations: List[float], repeat: int, signals: List[str]) -> Dict[str, Dict[str, float]]:
+    processor = AudioProcessor()
+    sr = processor.sr
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(name: str, func: Callable[[], object], number: int = 1, runs: Optional[int] = None):
+        results[name] = measure(func, runs or repeat, number)
+        print(f"  {name:<48} {results[name]['median_ms']:>10.3f} ms")
+
+    # Per-chunk feature extraction
+    for signal in signals:
+        chunk = SIGNALS[signal](1.0, sr)
+        tempo = processor.estimate_tempo(SIGNALS[signal](8.0, sr))
+        print(f"[chunk] {signal}")
+        record(f"chunk.{signal}.get_frequency_bands", lambda: processor.get_frequency_bands(chunk))
+        record(f"chunk.{signal}.get_tempo_features", lambda: processor.get_tempo_features(chunk, tempo))
+        record(f"chunk.{signal}.get_energy_features", lambda: processor.get_energy_features(chunk))
+        record(f"chunk.{signal}.get_spectral_features", lambda: processor.get_spectral_features(chunk))
+        record(f"chunk.{signal}.get_zcr", lambda: processor.get_zcr(chunk))
+        record(f"chunk.{signal}.process_chunk", lambda: processor.process_chunk(chunk, 0.0, tempo))
+
+        # Per-segment mapping
+        features = processor.process_chunk(chunk, 0.0, tempo)
+        record(f"segment.{signal}.brain_mapper", lambda: brain_mapper.map(features), number=1000)
+        record(f"segment.{signal}.brainwave_predictor", lambda: brainwave_predictor.predict(features), number=1000)
+        record(f"segment.{signal}.emotion_classifier", lambda: emotion_classifier.classify(features), number=1000)
+        record(f"segment.{signal}.build_segment", lambda: build_segment(features), number=1000)
+
+    # Full tracks
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration in durations:
+            for signal in signals:
+                y = SIGNALS[signal](duration, sr)
+                path = os.path.join(tmp, f"{signal}_{duration:g}.wav")
+                sf.write(path, y, sr)
+                runs = max(1, min(repeat, int(120 / duration)))
+                print(f"[track] {signal} {duration:g}s")
+                record(f"track.{signal}.{duration:g}s.estimate_tempo", lambda: processor.estimate_tempo(y), runs=runs)
+                record(f"track.{signal}.{duration:g}s.process_samples", lambda: list(processor.process_samples(y)), runs=runs)
+                record(f"track.{signal}.{duration:g}s.process_audio", lambda: list(processor.process_audio(path)), runs=runs)
+                record(f"track.{signal}.{duration:g}s.preview", lambda: processor.preview(y), runs=runs)
+
+    return results
+
+
+def run_round(durations: List[float], repeat: int, signals: List[str]) -> Dict[str, Dict[str, float]]:
+    """Run the suite once in a separate interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'round.json')
+        subprocess.run([
+            sys.executable, '-m', 'benchmarks.bench_analyzer', '--single-round',
+            '--durations', *(f"{d:g}" for d in durations), '--repeat', str(repeat),
+            '--signals', *signals, '--output', output,
+        ], check=True)
+        with open(output) as f:
+            return json.load(f)['results']
+
+
+def combine_rounds(rounds: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Merge the results of several rounds; stdev_ms is the spread of the round medians."""
+    results: Dict[str, Dict[str, float]] = {}
+    for name in rounds[0]:
+        runs = [r[name] for r in rounds]
+        medians = [run['median_ms'] for run in runs]
+        results[name] = {
+            'median_ms': round(statistics.median(medians), 4),
+            'min_ms': min(run['min_ms'] for run in runs),
+            'mean_ms': round(statistics.fmean(run['mean_ms'] for run in runs), 4),
+            'stdev_ms': round(statistics.stdev(medians), 4) if len(medians) > 1 else runs[0]['stdev_ms'],
+            'runs': sum(run['runs'] for run in runs),
+        }
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Print the comparison with a baseline and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['median_ms']
+        after = current['median_ms']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<48} {before:>10.3f} {after:>10.3f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analyzer hot paths")
+    parser.add_argument('--durations', type=float, nargs='+', default=[10.0, 60.0], help="Track durations in seconds")
+    parser.add_argument('--signals', nargs='+', default=list(SIGNALS), choices=list(SIGNALS))
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--rounds', type=int, default=3, help="Times the whole suite is run")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Allowed slowdown before flagging (0.5 = 50%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Also store the results as the new baseline")
+    parser.add_argument('--single-round', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_round:
+        with open(args.output, 'w') as f:
+            json.dump({'results': run_benchmarks(args.durations, args.repeat, args.signals)}, f)
+        return 0
+
+    rounds = []
+    for i in range(args.rounds):
+        print(f"== Round {i + 1}/{args.rounds}")
+        rounds.append(run_round(args.durations, args.repeat, args.signals))
+    results = combine_rounds(rounds)
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'librosa': librosa.__version__,
+            'durations': args.durations,
+            'repeat': args.repeat,
+            'rounds': args.rounds,
+        },
+        'results': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to record one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark of the track similarity index at library scale.
+
+Builds a synthetic clustered library of embeddings, then times index loads,
+single and batched exact queries, approximate (IVF) queries, and reports the
+approximate mode's recall@k against the exact results.
+
+Usage (from audio-service/):
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --tracks 10000 100000 --k 10
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.bench_analyzer import measure
+from src.analyzer.similarity import EMBEDDING_DIM, SimilarityIndex
+
+
+def synthetic_library(n: int, seed: int = 0) -> np.ndarray:
+    """Embeddings scattered around a few hundred "styles"."""
+    rng = np.random.default_rng(seed)
+    styles = rng.normal(size=(200, EMBEDDING_DIM)).astype(np.float32)
+    noise = rng.normal(scale=0.5, size=(n, EMBEDDING_DIM)).astype(np.float32)
+    return styles[rng.integers(0, len(styles), n)] + noise
+
+
+def run(n: int, k: int, repeat: int, batch: int) -> Dict[str, object]:
+    library = synthetic_library(n)
+    keys = [f"track{i}" for i in range(n)]
+    queries = [keys[i] for i in np.random.default_rng(1).integers(0, n, 100)]
+    results: Dict[str, object] = {"tracks": n}
+
+    exact = SimilarityIndex(approximate=False)
+    start = time.perf_counter()
+    exact.load(zip(keys, library))
+    results["load_exact_s"] = round(time.perf_counter() - start, 3)
+
+    approx = SimilarityIndex(approximate=True)
+    start = time.perf_counter()
+    approx.load(zip(keys, library))
+    results["load_approximate_s"] = round(time.perf_counter() - start, 3)
+    results["clustered"] = approx.clustered
+
+    query = iter(queries * (repeat + 1))
+    results["exact"] = measure(lambda: exact.similar(next(query), k), repeat, number=10)
+    batch_stats = measure(lambda: exact.search(library[:batch], k), repeat)
+    results["exact_batched_per_query_ms"] = round(batch_stats["median_ms"] / batch, 4)
+    query = iter(queries * (repeat + 1))
+    results["approximate"] = measure(lambda: approx.similar(next(query), k), repeat, number=10)
+
+    hits = [
+        len({key for key, _ in approx.similar(q, k)} & {key for key, _ in exact.similar(q, k)}) / k
+        for q in queries
+    ]
+    results[f"recall_at_{k}"] = round(float(np.mean(hits)), 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the track similarity index")
+    parser.add_argument('--tracks', type=int, nargs='+', default=[10000, 100000], help="Library sizes")
+    parser.add_argument('--k', type=int, default=10, help="Neighbours per query")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--batch', type=int, default=64, help="Queries per batched exact search")
+    args = parser.parse_args()
+
+    report: List[Dict[str, object]] = [run(n, args.k, args.repeat, args.batch) for n in args.tracks]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+End-to-end concurrent load harness.
+
+Starts src.main:asgi_app under uvicorn in a background thread. The
+extractor is a stub that works offline: the "local" backend serves fixture
+files from a temp directory, and the "http" backend adds the fixture server
+with simulated latency and bandwidth. The harness then opens N Socket.IO
+clients. Each client subscribes to its job and POSTs /api/analyze.
+
+Reported percentiles (p50/p95/p99):
+    - time to first `chunk` event, from the POST
+    - time to `complete` event, from the POST
+    - event-loop lag, sampled inside the server's loop
+    - per-client message rate (events per second until complete)
+
+Usage (from audio-service/):
+    python -m benchmarks.load_test --clients 20 --videos 5 --duration 30
+    python -m benchmarks.load_test --clients 50 --videos 50 --backend http --latency 0.2 --bandwidth 250000
+    python -m benchmarks.load_test --clients 20 --json results.json
+
+With fewer videos than clients, several clients request the same video ID
+and share one job, which exercises the overlapping-request path.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.signals import clicks, tone
+
+
+@dataclass
+class ClientResult:
+    video_id: str
+    first_chunk: Optional[float] = None
+    complete: Optional[float] = None
+    error: Optional[str] = None
+    events: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def message_rate(self) -> Optional[float]:
+        if not self.complete:
+            return None
+        return sum(self.events.values()) / self.complete
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        'p50': round(float(np.percentile(arr, 50)), 4),
+        'p95': round(float(np.percentile(arr, 95)), 4),
+        'p99': round(float(np.percentile(arr, 99)), 4),
+        'max': round(float(arr.max()), 4),
+        'count': len(values),
+    }
+
+
+def write_fixtures(media_dir: str, videos: int, duration: float, sr: int) -> List[str]:
+    """Write one distinct synthetic track per video ID."""
+    ids = []
+    for i in range(videos):
+        video_id = f"load{i:04d}"
+        y = tone(duration, sr, freq=110.0 * (1 + i % 7)) + clicks(duration, sr, bpm=80 + 10 * (i % 9))
+        sf.write(os.path.join(media_dir, f"{video_id}.wav"), y, sr)
+        ids.append(video_id)
+    return ids
+
+
+class ServerThread(threading.Thread):
+    """Runs the app under uvicorn on its own event loop, sampling loop lag."""
+
+    def __init__(self, port: int, lag_interval: float = 0.01):
+        super().__init__(daemon=True)
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(
+            'src.main:asgi_app', host='127.0.0.1', port=port, log_level='warning', lifespan='on',
+        ))
+        self.lag_interval = lag_interval
+        self.lags: List[float] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _monitor_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            self.lags.append(time.perf_counter() - start - self.lag_interval)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._monitor_lag())
+        try:
+            self.loop.run_until_complete(self.server.serve())
+        finally:
+            # Stop the lag monitor and any leftover socket tasks
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def wait_started(self, timeout: float = 30.0):
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join(timeout=10)
+
+
+async def run_client(base_url: str, video_id: str, session, timeout: float) -> ClientResult:
+    import socketio
+
+    result = ClientResult(video_id=video_id)
+    job_id = f"job_{video_id}"
+    done = asyncio.Event()
+    subscribed = asyncio.Event()
+    start = 0.0
+
+    sio = socketio.AsyncClient(reconnection=False)
+
+    @sio.on('*')
+    async def any_event(event, data=None):
+        result.events[event] = result.events.get(event, 0) + 1
+        now = time.perf_counter() - start
+        if event == 'subscribed':
+            subscribed.set()
+        elif event == 'chunk' and result.first_chunk is None:
+            result.first_chunk = now
+        elif event == 'complete':
+            result.complete = now
+            done.set()
+        elif event == 'error' and start:
+            result.error = (data or {}).get('message', 'error')
+            done.set()
+
+    try:
+        await sio.connect(base_url, transports=['websocket'])
+        await sio.emit('subscribe', {'job_id': job_id})
+        await asyncio.wait_for(subscribed.wait(), timeout)
+
+        start = time.perf_counter()
+        async with session.post(f"{base_url}/api/analyze", json={
+            'video_id': video_id,
+            'youtube_url': f"https://www.youtube.com/watch?v={video_id}",
+        }) as response:
+            body = await response.json()
+            if response.status != 200:
+                result.error = f"HTTP {response.status}: {body}"
+                return result
+
+        if body.get('status') == 'complete':
+            # Finished before this client asked; no events will follow
+            result.complete = time.perf_counter() - start
+        else:
+            await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        result.error = 'timeout'
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        await sio.disconnect()
+    return result
+
+
+async def run_load(base_url: str, video_ids: List[str], clients: int, ramp: float, timeout: float) -> List[ClientResult]:
+    import aiohttp
+
+    async with aiohttp.ClientSession() as session:
+        async def delayed(i: int):
+            await asyncio.sleep(ramp * i / max(clients, 1))
+            return await run_client(base_url, video_ids[i % len(video_ids)], session, timeout)
+
+        return await asyncio.gather(*(delayed(i) for i in range(clients)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent end-to-end load test")
+    parser.add_argument('--clients', type=int, default=10, help="Concurrent Socket.IO clients")
+    parser.add_argument('--videos', type=int, default=None, help="Distinct video IDs (default: one per client)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of audio per fixture")
+    parser.add_argument('--backend', choices=['local', 'http'], default='local')
+    parser.add_argument('--latency', type=float, default=0.0, help="Fixture server latency (http backend)")
+    parser.add_argument('--bandwidth', type=int, default=0, help="Fixture server bytes/s per request (http backend)")
+    parser.add_argument('--ramp', type=float, default=0.0, help="Seconds over which clients start")
+    parser.add_argument('--timeout', type=float, default=300.0, help="Per-client timeout in seconds")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--media-port', type=int, default=8765)
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    media_dir = tempfile.mkdtemp(prefix='load-media-')
+
+    # Configure the app before it is imported (settings are read at import)
+    os.environ['EXTRACTOR_BACKEND'] = args.backend
+    os.environ['MEDIA_DIR'] = media_dir
+    os.environ['MEDIA_SERVER_URL'] = f"http://127.0.0.1:{args.media_port}"
+    os.environ.setdefault('TEMP_DIR', tempfile.mkdtemp(prefix='load-audio-'))
+
+    from src.config import settings
+    video_ids = write_fixtures(media_dir, args.videos or args.clients, args.duration, settings.sample_rate)
+
+    # Every client comes from 127.0.0.1, so lift the per-IP limit
+    from src.middleware.rate_limit import rate_limiter
+    rate_limiter.requests_per_minute = sys.maxsize
+    for name in ('socketio.server', 'engineio.server', 'src'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    fixture_server = None
+    if args.backend == 'http':
+        from src.extractor.fixture_server import FixtureServer
+        fixture_server = FixtureServer(('127.0.0.1', args.media_port), media_dir, args.latency, args.bandwidth)
+        threading.Thread(target=fixture_server.serve_forever, daemon=True).start()
+
+    server = ServerThread(args.port)
+    server.start()
+    server.wait_started()
+
+    print(f"{args.clients} clients, {len(video_ids)} videos of {args.duration:g}s, backend={args.backend}")
+    started = time.perf_counter()
+    results = asyncio.run(run_load(
+        f"http://127.0.0.1:{args.port}", video_ids, args.clients, args.ramp, args.timeout,
+    ))
+    wall = time.perf_counter() - started
+    lags = list(server.lags)
+
+    server.stop()
+    if fixture_server:
+        fixture_server.shutdown()
+
+    errors = [r for r in results if r.error]
+    report = {
+        'config': vars(args),
+        'wall_seconds': round(wall, 3),
+        'errors': len(errors),
+        'time_to_first_chunk': percentiles([r.first_chunk for r in results if r.first_chunk is not None]),
+        'time_to_complete': percentiles([r.complete for r in results if r.complete is not None]),
+        'loop_lag': percentiles(lags),
+        'message_rate': percentiles([r.message_rate for r in results if r.message_rate]),
+        'events': {
+            name: sum(r.events.get(name, 0) for r in results)
+            for name in sorted({name for r in results for name in r.events})
+        },
+    }
+
+    print(f"\nwall time: {report['wall_seconds']}s, errors: {len(errors)}")
+    for key, unit in (('time_to_first_chunk', 's'), ('time_to_complete', 's'), ('loop_lag', 's'), ('message_rate', 'msg/s')):
+        stats = report[key]
+        if stats:
+            print(f"{key:<20} p50={stats['p50']:<10} p95={stats['p95']:<10} p99={stats['p99']:<10} "
+                  f"max={stats['max']:<10} ({unit}, n={stats['count']})")
+    print(f"events: {report['events']}")
+    for r in errors[:5]:
+        print(f"  {r.video_id}: {r.error}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if lags:
+        print(f"mean loop lag: {statistics.fmean(lags) * 1000:.2f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,21 @@
-from .audio_processor import AudioProcessor, AudioFeatures, processor
+from .audio_processor import AudioProcessor, AudioFeatures, FEATURE_VERSION, processor
 from .brain_mapper import BrainMapper, BrainRegionActivation, brain_mapper
 from .brainwave_predictor import BrainwavePredictor, BrainwaveState, brainwave_predictor
 from .emotion_classifier import EmotionClassifier, EmotionClassification, EmotionCategory, emotion_classifier
+from .segments import MAPPER_VERSION, build_analysis, build_segment, derive_segments
+from .streaming import StreamingAnalyzer
+from .aggregates import SegmentAggregator, RunningStats, emotion_histogram, overall_emotion
+from .fingerprint import FINGERPRINT_VERSION, FingerprintIndex, compute_fingerprint, fingerprint_index
+from .similarity import EMBEDDING_VERSION, SimilarityIndex, embed_track, similarity_index
 
 __all__ = [
-    'AudioProcessor', 'AudioFeatures', 'processor',
+    'AudioProcessor', 'AudioFeatures', 'FEATURE_VERSION', 'processor',
     'BrainMapper', 'BrainRegionActivation', 'brain_mapper',
     'BrainwavePredictor', 'BrainwaveState', 'brainwave_predictor',
     'EmotionClassifier', 'EmotionClassification', 'EmotionCategory', 'emotion_classifier',
+    'MAPPER_VERSION', 'build_analysis', 'build_segment', 'derive_segments',
+    'StreamingAnalyzer',
+    'SegmentAggregator', 'RunningStats', 'emotion_histogram', 'overall_emotion',
+    'FINGERPRINT_VERSION', 'FingerprintIndex', 'compute_fingerprint', 'fingerprint_index',
+    'EMBEDDING_VERSION', 'SimilarityIndex', 'embed_track', 'similarity_index',
 ]
@@ -0,0 +1,166 @@
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.analyzer.audio_processor import AudioFeatures
+
+
+def emotion_histogram(segments: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Number of segments per primary emotion, in order of first appearance."""
+    counts: Dict[str, int] = {}
+    for segment in segments:
+        primary = segment["emotion"]["primary"]
+        counts[primary] = counts.get(primary, 0) + 1
+    return counts
+
+
+def overall_emotion(histogram: Dict[str, int]) -> Dict[str, Any]:
+    """Most common primary emotion in a histogram, with its share as confidence."""
+    total = sum(histogram.values())
+    if not total:
+        return {"primary": "calm", "confidence": 0.5}
+    primary = max(histogram, key=histogram.get)
+    return {
+        "primary": primary,
+        "confidence": round(histogram[primary] / total, 3),
+    }
+
+
+class RunningStats:
+    """Running mean/variance/min/max (Welford's algorithm), O(1) per update."""
+
+    __slots__ = ('count', 'mean', '_m2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        if not self.count:
+            return {'mean': 0.0, 'std': 0.0, 'min': 0.0, 'max': 0.0}
+        return {
+            'mean': round(self.mean, 3),
+            'std': round(math.sqrt(self.variance), 3),
+            'min': round(self.min, 3),
+            'max': round(self.max, 3),
+        }
+
+
+class DownsampledCurve:
+    """
+    Fixed-size time series: when full, adjacent buckets are merged and the
+    bucket width doubles, so memory stays bounded for any track length.
+    """
+
+    __slots__ = ('max_points', 'width', '_sums', '_counts', '_pending_sum', '_pending_count')
+
+    def __init__(self, max_points: int = 120):
+        self.max_points = max_points
+        self.width = 1  # samples per bucket
+        self._sums: List[float] = []
+        self._counts: List[int] = []
+        self._pending_sum = 0.0
+        self._pending_count = 0
+
+    def add(self, value: float) -> None:
+        self._pending_sum += value
+        self._pending_count += 1
+        if self._pending_count < self.width:
+            return
+
+        self._sums.append(self._pending_sum)
+        self._counts.append(self._pending_count)
+        self._pending_sum = 0.0
+        self._pending_count = 0
+
+        if len(self._sums) >= self.max_points:
+            self._sums = [sum(self._sums[i:i + 2]) for i in range(0, len(self._sums), 2)]
+            self._counts = [sum(self._counts[i:i + 2]) for i in range(0, len(self._counts), 2)]
+            self.width *= 2
+
+    def values(self) -> List[float]:
+        sums = self._sums + ([self._pending_sum] if self._pending_count else [])
+        counts = self._counts + ([self._pending_count] if self._pending_count else [])
+        return [round(s / c, 3) for s, c in zip(sums, counts)]
+
+
+class SegmentAggregator:
+    """
+    Incrementally summarizes a job's segments as they are produced.
+
+    Every update is O(1) (amortized for the energy curve), so summaries are
+    available at any point during analysis without re-scanning segments.
+    """
+
+    def __init__(self, top_k: int = 5, curve_points: int = 120, chunk_duration: float = 1.0):
+        self.top_k = top_k
+        self.chunk_duration = chunk_duration
+        self.count = 0
+        self.regions: Dict[str, RunningStats] = {}
+        self.brainwaves: Dict[str, RunningStats] = {}
+        self.emotions: Dict[str, int] = {}
+        # Min-heap of (score, -startTime, emotion) holding the top-k peaks
+        self._peaks: List[Tuple[float, float, str]] = []
+        self.energy = DownsampledCurve(curve_points)
+        self.loudness = DownsampledCurve(curve_points)
+
+    def update(self, segment: Dict[str, Any], features: Optional[AudioFeatures] = None) -> None:
+        """Fold one segment (and optionally its raw features) into the summary."""
+        self.count += 1
+
+        for name, value in segment["brainRegions"].items():
+            self.regions.setdefault(name, RunningStats()).update(value)
+        for name, value in segment["brainwaves"].items():
+            self.brainwaves.setdefault(name, RunningStats()).update(value)
+
+        primary = segment["emotion"]["primary"]
+        self.emotions[primary] = self.emotions.get(primary, 0) + 1
+
+        # Peak moments: strongest reward-center response ("chills")
+        peak = (segment["brainRegions"]["nucleusAccumbens"], -segment["startTime"], primary)
+        if len(self._peaks) < self.top_k:
+            heapq.heappush(self._peaks, peak)
+        elif peak > self._peaks[0]:
+            heapq.heapreplace(self._peaks, peak)
+
+        if features is not None:
+            self.energy.add(features.energy)
+            self.loudness.add(features.loudness)
+
+    def overall_emotion(self) -> Dict[str, Any]:
+        """Most common primary emotion so far, with its share as confidence."""
+        return overall_emotion(self.emotions)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current summary (camelCase for frontend)."""
+        return {
+            "segmentCount": self.count,
+            "overallEmotion": self.overall_emotion(),
+            "emotionHistogram": dict(self.emotions),
+            "brainRegions": {name: stats.to_dict() for name, stats in self.regions.items()},
+            "brainwaves": {name: stats.to_dict() for name, stats in self.brainwaves.items()},
+            "peakMoments": [
+                {"time": -neg_time, "nucleusAccumbens": score, "emotion": emotion}
+                for score, neg_time, emotion in sorted(self._peaks, reverse=True)
+            ],
+            "energyCurve": {
+                "interval": self.energy.width * self.chunk_duration,
+                "energy": self.energy.values(),
+                "loudness": self.loudness.values(),
+            },
+        }
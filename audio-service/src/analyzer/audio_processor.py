@@ -1,14 +1,25 @@
 import numpy as np
-import librosa
 import logging
-from typing import Generator
+from typing import Generator, List
 from dataclasses import dataclass
 
 from src.config import settings
+from src.utils.lazy import LazyModule
+from src.utils.metrics import DECODE_SECONDS, FEATURE_SECONDS
+from src.utils.tracing import span
+
+# Imported on first use; see warm_up() for paying that cost up front
+librosa = LazyModule('librosa')
+signal = LazyModule('scipy.signal')
 
 logger = logging.getLogger(__name__)
 
 
+# Bump when feature extraction changes (AudioFeatures fields or how they are
+# computed); stored feature tables with another version are not reused
+FEATURE_VERSION = 1
+
+
 @dataclass
 class AudioFeatures:
     """Features extracted from a 1-second audio chunk."""
@@ -59,7 +70,14 @@ class AudioProcessor:
         """Load audio file and return samples and sample rate."""
         logger.info(f"Loading audio: {file_path}")
 
-        y, sr = librosa.load(file_path, sr=self.sr, mono=True)
+        # Never analyze past the duration cap, whatever the source length.
+        # Decoding and resampling are separate steps so each can be timed.
+        with DECODE_SECONDS.time(stage="decode"), span("decode"):
+            y, sr = librosa.load(file_path, sr=None, mono=True, duration=settings.max_audio_duration)
+        if sr != self.sr:
+            with DECODE_SECONDS.time(stage="resample"), span("resample"):
+                y = librosa.resample(y, orig_sr=sr, target_sr=self.sr)
+            sr = self.sr
         duration = len(y) / sr
 
         logger.info(f"Loaded {duration:.1f}s of audio at {sr}Hz")
@@ -73,6 +91,10 @@ class AudioProcessor:
         # Get frequency bins
         freqs = librosa.fft_frequencies(sr=self.sr, n_fft=self.n_fft)
 
+        return self._band_intensities(fft, freqs)
+
+    def _band_intensities(self, fft: np.ndarray, freqs: np.ndarray) -> dict[str, float]:
+        """Mean magnitude per frequency band, normalized so the loudest band is 1."""
         # Calculate energy in each band
         bands = {}
         for band_name, (low, high) in self.freq_bands.items():
@@ -102,21 +124,28 @@ class AudioProcessor:
 
             # Calculate onset strength as beat indicator
             onset_env = librosa.onset.onset_strength(y=y, sr=self.sr)
-            beat_strength = float(np.mean(onset_env))
-
-            # Normalize beat strength
-            beat_strength = min(beat_strength / 2.0, 1.0)
 
-            return tempo, beat_strength
+            return tempo, self._beat_strength(onset_env)
 
         except Exception as e:
             logger.warning(f"Tempo extraction failed: {e}")
             return 120.0, 0.5
 
+    @staticmethod
+    def _beat_strength(onset_env: np.ndarray) -> float:
+        """Normalize mean onset strength to 0-1."""
+        beat_strength = float(np.mean(onset_env))
+        return min(beat_strength / 2.0, 1.0)
+
     def get_energy_features(self, y: np.ndarray) -> tuple[float, float]:
         """Extract energy and loudness."""
         # RMS energy
         rms = librosa.feature.rms(y=y)[0]
+        return self._energy_loudness(rms)
+
+    @staticmethod
+    def _energy_loudness(rms: np.ndarray) -> tuple[float, float]:
+        """Normalize frame RMS values to energy and loudness (0-1)."""
         energy = float(np.mean(rms))
 
         # Normalize energy (typical range 0-0.5)
@@ -136,20 +165,28 @@ class AudioProcessor:
         """Extract spectral features."""
         # Spectral centroid (brightness)
         centroid = librosa.feature.spectral_centroid(y=y, sr=self.sr)[0]
+
+        # Spectral rolloff (high frequency content)
+        rolloff = librosa.feature.spectral_rolloff(y=y, sr=self.sr)[0]
+
+        # Spectral flatness (noise vs tone)
+        flatness = librosa.feature.spectral_flatness(y=y)[0]
+
+        return self._spectral_norms(centroid, rolloff, flatness)
+
+    @staticmethod
+    def _spectral_norms(centroid: np.ndarray, rolloff: np.ndarray, flatness: np.ndarray) -> tuple[float, float, float]:
+        """Normalize frame spectral centroid/rolloff/flatness to 0-1."""
         centroid_mean = float(np.mean(centroid))
         # Normalize (typical range 500-4000 Hz)
         centroid_norm = (centroid_mean - 500) / 3500
         centroid_norm = max(0, min(1, centroid_norm))
 
-        # Spectral rolloff (high frequency content)
-        rolloff = librosa.feature.spectral_rolloff(y=y, sr=self.sr)[0]
         rolloff_mean = float(np.mean(rolloff))
         # Normalize (typical range 2000-10000 Hz)
         rolloff_norm = (rolloff_mean - 2000) / 8000
         rolloff_norm = max(0, min(1, rolloff_norm))
 
-        # Spectral flatness (noise vs tone)
-        flatness = librosa.feature.spectral_flatness(y=y)[0]
         flatness_mean = float(np.mean(flatness))
 
         return centroid_norm, rolloff_norm, flatness_mean
@@ -157,26 +194,46 @@ class AudioProcessor:
     def get_zcr(self, y: np.ndarray) -> float:
         """Extract zero crossing rate (percussiveness indicator)."""
         zcr = librosa.feature.zero_crossing_rate(y)[0]
+        return self._zcr_norm(zcr)
+
+    @staticmethod
+    def _zcr_norm(zcr: np.ndarray) -> float:
+        """Normalize frame zero crossing rates to 0-1."""
         zcr_mean = float(np.mean(zcr))
         # Normalize (typical range 0-0.2)
         return min(zcr_mean * 5, 1.0)
 
+    def estimate_tempo(self, y: np.ndarray) -> float:
+        """Estimate tempo (BPM) over a longer stretch of audio."""
+        with span("global_tempo"):
+            tempo, _ = librosa.beat.beat_track(y=y, sr=self.sr)
+        return float(tempo)
+
     def process_chunk(self, y: np.ndarray, timestamp: float, global_tempo: float = None) -> AudioFeatures:
         """Process a single audio chunk and extract all features."""
+        with span("features", timestamp=timestamp):
+            return self._process_chunk(y, timestamp, global_tempo)
+
+    def _process_chunk(self, y: np.ndarray, timestamp: float, global_tempo: float = None) -> AudioFeatures:
         # Frequency bands
-        bands = self.get_frequency_bands(y)
+        with FEATURE_SECONDS.time(family="bands"), span("bands"):
+            bands = self.get_frequency_bands(y)
 
         # Tempo and rhythm
-        tempo, beat_strength = self.get_tempo_features(y, global_tempo)
+        with FEATURE_SECONDS.time(family="tempo"), span("tempo"):
+            tempo, beat_strength = self.get_tempo_features(y, global_tempo)
 
         # Energy
-        energy, loudness = self.get_energy_features(y)
+        with FEATURE_SECONDS.time(family="energy"), span("energy"):
+            energy, loudness = self.get_energy_features(y)
 
         # Spectral
-        centroid, rolloff, flatness = self.get_spectral_features(y)
+        with FEATURE_SECONDS.time(family="spectral"), span("spectral"):
+            centroid, rolloff, flatness = self.get_spectral_features(y)
 
         # ZCR
-        zcr = self.get_zcr(y)
+        with FEATURE_SECONDS.time(family="zcr"), span("zcr"):
+            zcr = self.get_zcr(y)
 
         return AudioFeatures(
             timestamp=timestamp,
@@ -208,11 +265,15 @@ class AudioProcessor:
         """
         # Load audio
         y, sr = self.load_audio(file_path)
+        yield from self.process_samples(y, chunk_duration)
+
+    def process_samples(self, y: np.ndarray, chunk_duration: float = 1.0) -> Generator[AudioFeatures, None, None]:
+        """Process already-loaded audio (at self.sr) in chunks."""
+        sr = self.sr
         total_duration = len(y) / sr
 
         # Get global tempo for consistency
-        global_tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        global_tempo = float(global_tempo)
+        global_tempo = self.estimate_tempo(y)
         logger.info(f"Global tempo: {global_tempo:.1f} BPM")
 
         # Process in chunks
@@ -236,6 +297,92 @@ class AudioProcessor:
 
         logger.info(f"Processed {total_duration:.1f}s of audio")
 
+    def preview(self, y: np.ndarray, resolution: float = 10.0, decimation: int = 2) -> List[AudioFeatures]:
+        """
+        Fast coarse pass: features per `resolution` seconds on a decimated signal.
+
+        One STFT over the whole decimated signal feeds every feature, which is
+        then averaged per window. No beat tracking is done; tempo comes from
+        the onset envelope. Accuracy is lower (notably in the top band), but
+        the result is available almost immediately.
+        """
+        with span("preview"):
+            return self._preview(y, resolution, decimation)
+
+    def _preview(self, y: np.ndarray, resolution: float, decimation: int) -> List[AudioFeatures]:
+        sr = self.sr // decimation
+        n_fft = self.n_fft // decimation  # keeps the same frequency resolution
+        hop = self.hop_length
+        y_coarse = signal.resample_poly(y, 1, decimation).astype(np.float32)
+
+        # Frame-level features from a single spectrogram
+        S = np.abs(librosa.stft(y_coarse, n_fft=n_fft, hop_length=hop))
+        freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
+        rms = librosa.feature.rms(S=S, frame_length=n_fft, hop_length=hop)[0]
+        centroid = librosa.feature.spectral_centroid(S=S, sr=sr, n_fft=n_fft, hop_length=hop)[0]
+        rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr, n_fft=n_fft, hop_length=hop)[0]
+        flatness = librosa.feature.spectral_flatness(S=S, n_fft=n_fft, hop_length=hop)[0]
+        # Crossings per sample double when the sample rate is halved
+        zcr = librosa.feature.zero_crossing_rate(y_coarse, frame_length=n_fft, hop_length=hop)[0] / decimation
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+        onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr, hop_length=hop)
+
+        try:
+            tempo = float(librosa.feature.tempo(onset_envelope=onset_env, sr=sr, hop_length=hop)[0])
+        except Exception as e:
+            logger.warning(f"Preview tempo estimate failed: {e}")
+            tempo = 120.0
+
+        frames = max(int(resolution * sr / hop), 1)
+        results = []
+        for start in range(0, S.shape[1], frames):
+            window = slice(start, start + frames)
+            if S[:, window].shape[1] < 2:
+                continue
+
+            bands = self._band_intensities(S[:, window], freqs)
+            energy, loudness = self._energy_loudness(rms[window])
+            centroid_norm, rolloff_norm, flatness_mean = self._spectral_norms(
+                centroid[window], rolloff[window], flatness[window]
+            )
+
+            results.append(AudioFeatures(
+                timestamp=start * hop / sr,
+                bass=bands['bass'],
+                low_mid=bands['low_mid'],
+                mid=bands['mid'],
+                high_mid=bands['high_mid'],
+                high=bands['high'],
+                tempo=tempo,
+                beat_strength=self._beat_strength(onset_env[window]),
+                energy=energy,
+                loudness=loudness,
+                spectral_centroid=centroid_norm,
+                spectral_rolloff=rolloff_norm,
+                spectral_flatness=flatness_mean,
+                zcr=self._zcr_norm(zcr[window]),
+            ))
+        return results
+
+    def warm_up(self, seconds: float = 4.0) -> None:
+        """
+        Run the analysis hot path once on a synthetic buffer.
+
+        This imports librosa and scipy and compiles librosa's numba kernels
+        (beat tracking, onset detection) before the first real job. The
+        compiled kernels go to NUMBA_CACHE_DIR, so later processes load
+        them from disk instead of compiling.
+        """
+        t = np.arange(int(seconds * self.sr)) / self.sr
+        y = 0.3 * np.sin(2 * np.pi * 220.0 * t)
+        y[::self.sr // 2] = 1.0  # clicks at 120 BPM for the beat tracker
+        y = y.astype(np.float32)
+
+        tempo = self.estimate_tempo(y)
+        self.process_chunk(y[:self.sr], 0.0)
+        self.process_chunk(y[:self.sr], 0.0, tempo)
+        self.preview(y)
+
 
 # Singleton instance
 processor = AudioProcessor()
@@ -0,0 +1,139 @@
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.utils.lazy import LazyModule
+
+librosa = LazyModule('librosa')
+
+logger = logging.getLogger(__name__)
+
+# Bump when the fingerprint computation changes, so stored fingerprints are not compared with new ones
+FINGERPRINT_VERSION = 1
+
+# 33 log-spaced bands between 300 Hz and 2 kHz give 32 bits per frame
+FP_N_FFT = 2048
+FP_HOP = 512
+FP_BAND_EDGES = np.geomspace(300, 2000, 34)
+FP_BIT_WEIGHTS = (1 << np.arange(32, dtype=np.uint64))
+
+
+def compute_fingerprint(y: np.ndarray, sr: int, seconds: float = None) -> np.ndarray:
+    """
+    Compute a compact acoustic fingerprint of the start of a track.
+
+    Each frame yields a 32-bit sub-fingerprint: the signs of the energy
+    differences between adjacent bands, differenced over time. These survive
+    re-encoding, gain changes and mild EQ, so re-uploads of the same audio
+    produce (nearly) the same bits. Leading silence is skipped so different
+    intro padding does not shift the comparison.
+    """
+    seconds = seconds or settings.fingerprint_seconds
+
+    # Skip leading silence (< -40 dB relative to peak)
+    peak = float(np.max(np.abs(y))) if len(y) else 0.0
+    if peak == 0.0:
+        return np.zeros(0, dtype=np.uint32)
+    start = int(np.argmax(np.abs(y) > peak * 0.01))
+    y = y[start:start + int(seconds * sr)]
+
+    S = np.abs(librosa.stft(y, n_fft=FP_N_FFT, hop_length=FP_HOP)) ** 2
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=FP_N_FFT)
+    energies = np.stack([
+        S[(freqs >= low) & (freqs < high)].sum(axis=0)
+        for low, high in zip(FP_BAND_EDGES[:-1], FP_BAND_EDGES[1:])
+    ])
+
+    band_diff = energies[:-1] - energies[1:]
+    bits = (band_diff[:, 1:] - band_diff[:, :-1]) > 0
+    return (bits.T.astype(np.uint64) @ FP_BIT_WEIGHTS).astype(np.uint32)
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, offset: int) -> Tuple[float, int]:
+    """Fraction of differing bits when frame i of `a` is aligned with frame i + offset of `b`."""
+    start = max(0, -offset)
+    end = min(len(a), len(b) - offset)
+    if end <= start:
+        return 1.0, 0
+    diff = np.bitwise_xor(a[start:end], b[start + offset:end + offset])
+    errors = int(np.unpackbits(diff.view(np.uint8)).sum())
+    return errors / ((end - start) * 32), end - start
+
+
+class FingerprintIndex:
+    """
+    In-process index from fingerprints to the tracks they were computed for.
+
+    Exact sub-fingerprint matches vote for a (track, offset) alignment; the
+    best alignments are then verified by bit error rate over the overlap.
+    """
+
+    def __init__(self, max_ber: float = None, min_overlap: int = 100, max_candidates: int = 5):
+        self.max_ber = max_ber if max_ber is not None else settings.fingerprint_max_ber
+        self.min_overlap = min_overlap
+        self.max_candidates = max_candidates
+        self._tracks: Dict[str, np.ndarray] = {}
+        self._index: Dict[int, List[Tuple[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def load(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Bulk-add (key, fingerprint) pairs, e.g. from the analysis store at startup."""
+        with self._lock:
+            for key, fingerprint in items:
+                self._put(key, fingerprint)
+        logger.info(f"Fingerprint index loaded with {len(self)} tracks")
+
+    def add(self, key: str, fingerprint: np.ndarray) -> None:
+        """Index a track's fingerprint under `key`, replacing any previous one."""
+        with self._lock:
+            self._put(key, fingerprint)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _put(self, key: str, fingerprint: np.ndarray) -> None:
+        if key in self._tracks:
+            self._remove(key)
+        self._tracks[key] = fingerprint
+        for frame, code in enumerate(fingerprint.tolist()):
+            if code:  # all-zero frames come from silence and match everything
+                self._index.setdefault(code, []).append((key, frame))
+
+    def _remove(self, key: str) -> None:
+        fingerprint = self._tracks.pop(key, None)
+        if fingerprint is None:
+            return
+        for code in set(fingerprint.tolist()):
+            postings = self._index.get(code)
+            if postings:
+                postings[:] = [p for p in postings if p[0] != key]
+                if not postings:
+                    del self._index[code]
+
+    def lookup(self, fingerprint: np.ndarray, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Return (key, bit error rate) of the best matching track, if any."""
+        votes: Counter = Counter()
+        with self._lock:
+            for frame, code in enumerate(fingerprint.tolist()):
+                for key, stored_frame in self._index.get(code, ()):
+                    if key != exclude:
+                        votes[(key, stored_frame - frame)] += 1
+
+            for (key, offset), _ in votes.most_common(self.max_candidates):
+                ber, overlap = bit_error_rate(fingerprint, self._tracks[key], offset)
+                if overlap >= self.min_overlap and ber <= self.max_ber:
+                    logger.info(f"Fingerprint match: {key} (offset {offset}, BER {ber:.3f})")
+                    return key, ber
+        return None
+
+
+# Singleton instance
+fingerprint_index = FingerprintIndex()
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from src.analyzer.aggregates import SegmentAggregator
+from src.analyzer.audio_processor import AudioFeatures
+from src.analyzer.brain_mapper import brain_mapper
+from src.analyzer.brainwave_predictor import brainwave_predictor
+from src.analyzer.emotion_classifier import emotion_classifier
+from src.utils.metrics import MAPPING_SECONDS
+from src.utils.tracing import span
+
+# Bump when BrainMapper, BrainwavePredictor, EmotionClassifier or the segment
+# layout change; stored analyses are then re-derived from stored features
+MAPPER_VERSION = 1
+
+
+def build_segment(features: AudioFeatures, chunk_duration: float = 1.0) -> Dict[str, Any]:
+    """Map features to brain regions, brainwaves and emotion as a segment dict (camelCase for frontend)."""
+    with MAPPING_SECONDS.time(stage="brain_regions"), span("brain_regions"):
+        brain_regions = brain_mapper.map(features)
+    with MAPPING_SECONDS.time(stage="brainwaves"), span("brainwaves"):
+        brainwaves = brainwave_predictor.predict(features)
+    with MAPPING_SECONDS.time(stage="emotion"), span("emotion"):
+        emotion = emotion_classifier.classify(features)
+
+    return {
+        "startTime": features.timestamp,
+        "endTime": features.timestamp + chunk_duration,
+        "frequencies": {
+            "bass": round(features.bass, 3),
+            "lowMid": round(features.low_mid, 3),
+            "mid": round(features.mid, 3),
+            "highMid": round(features.high_mid, 3),
+            "high": round(features.high, 3),
+        },
+        "brainRegions": {
+            "auditoryCortex": round(brain_regions.auditory_cortex, 3),
+            "amygdala": round(brain_regions.amygdala, 3),
+            "hippocampus": round(brain_regions.hippocampus, 3),
+            "nucleusAccumbens": round(brain_regions.nucleus_accumbens, 3),
+            "motorCortex": round(brain_regions.motor_cortex, 3),
+            "prefrontalCortex": round(brain_regions.prefrontal_cortex, 3),
+            "basalGanglia": round(brain_regions.basal_ganglia, 3),
+        },
+        "brainwaves": {
+            "delta": round(brainwaves.delta, 3),
+            "theta": round(brainwaves.theta, 3),
+            "alpha": round(brainwaves.alpha, 3),
+            "beta": round(brainwaves.beta, 3),
+            "gamma": round(brainwaves.gamma, 3),
+        },
+        "emotion": {
+            "primary": emotion.primary,
+            "confidence": round(emotion.confidence, 3),
+        },
+    }
+
+
+def derive_segments(
+    features: List[AudioFeatures], chunk_duration: float = 1.0
+) -> Tuple[List[Dict[str, Any]], SegmentAggregator]:
+    """Map a track's per-chunk features to segments and their running summary."""
+    segments = []
+    aggregator = SegmentAggregator(chunk_duration=chunk_duration)
+    for f in features:
+        segment = build_segment(f, chunk_duration)
+        segments.append(segment)
+        aggregator.update(segment, f)
+    return segments, aggregator
+
+
+def build_analysis(
+    job_id: str,
+    video: Dict[str, Any],
+    truncated: bool,
+    segments: List[Dict[str, Any]],
+    summary: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Assemble the complete analysis document sent to clients."""
+    return {
+        "id": job_id,
+        "video": video,
+        "truncated": truncated,
+        "analyzedDuration": segments[-1]["endTime"] if segments else 0,
+        "overallEmotion": summary["overallEmotion"],
+        "summary": summary,
+        "segments": segments,
+        "analyzedAt": datetime.utcnow().isoformat() + "Z",
+    }
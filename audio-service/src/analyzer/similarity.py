@@ -0,0 +1,296 @@
+"""
+Track similarity ("tracks that feel like this one").
+
+Each analyzed track is summarized as a fixed-length embedding of its feature,
+brain region and brainwave time series (mean, spread and a coarse trajectory)
+plus its emotion distribution. SimilarityIndex keeps the library's embeddings
+in one matrix, standardized per dimension, and answers cosine nearest-neighbour
+queries with a NumPy scan, or approximately by scanning only the nearest
+k-means clusters (IVF) of a large library.
+"""
+import logging
+import math
+import threading
+from dataclasses import fields
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.analyzer.audio_processor import AudioFeatures
+from src.analyzer.emotion_classifier import EmotionCategory
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the embedding layout changes; stored embeddings are then rebuilt
+EMBEDDING_VERSION = 1
+
+FEATURE_CHANNELS = [f.name for f in fields(AudioFeatures) if f.name != "timestamp"]
+REGION_CHANNELS = [
+    "auditoryCortex", "amygdala", "hippocampus", "nucleusAccumbens",
+    "motorCortex", "prefrontalCortex", "basalGanglia",
+]
+BRAINWAVE_CHANNELS = ["delta", "theta", "alpha", "beta", "gamma"]
+EMOTIONS = [e.value for e in EmotionCategory]
+TRAJECTORY_BINS = 4
+
+N_CHANNELS = len(FEATURE_CHANNELS) + len(REGION_CHANNELS) + len(BRAINWAVE_CHANNELS)
+# Blocks: per-channel mean and std, emotion shares, per-channel trajectory
+BLOCKS = (2 * N_CHANNELS, len(EMOTIONS), TRAJECTORY_BINS * N_CHANNELS)
+EMBEDDING_DIM = sum(BLOCKS)
+# Each block carries the same weight in the cosine, however many dimensions it has
+BLOCK_WEIGHTS = np.concatenate([np.full(n, 1.0 / math.sqrt(n), dtype=np.float32) for n in BLOCKS])
+
+
+def embed_track(features: Sequence[AudioFeatures], segments: Sequence[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Fixed-length embedding of a track from its per-chunk features and segments."""
+    if not features or len(features) != len(segments):
+        return None
+
+    series = np.array([
+        [getattr(f, name) for name in FEATURE_CHANNELS]
+        + [seg["brainRegions"][name] for name in REGION_CHANNELS]
+        + [seg["brainwaves"][name] for name in BRAINWAVE_CHANNELS]
+        for f, seg in zip(features, segments)
+    ], dtype=np.float64)
+
+    emotions = np.zeros(len(EMOTIONS))
+    for seg in segments:
+        primary = seg["emotion"]["primary"]
+        if primary in EMOTIONS:
+            emotions[EMOTIONS.index(primary)] += 1
+    emotions /= len(segments)
+
+    # Mean of each quarter of the track (short tracks repeat chunks)
+    edges = np.linspace(0, len(series), TRAJECTORY_BINS + 1)
+    trajectory = [
+        series[int(lo):max(int(lo) + 1, int(hi))].mean(axis=0)
+        for lo, hi in zip(edges[:-1], edges[1:])
+    ]
+
+    return np.concatenate([
+        series.mean(axis=0), series.std(axis=0), emotions, *trajectory,
+    ]).astype(np.float32)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _kmeans(points: np.ndarray, n_clusters: int, iterations: int = 8, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit rows; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = points[rng.choice(len(points), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(points @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, points)
+        counts = np.bincount(assign, minlength=n_clusters)
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = _normalize_rows(sums[filled])
+    return centroids
+
+
+class SimilarityIndex:
+    """
+    In-process cosine index over track embeddings.
+
+    Raw embeddings are kept alongside their standardized, weighted and
+    L2-normalized rows. The standardization (and, for approximate search, the
+    k-means clusters) is refitted whenever the library has grown by a quarter
+    since the last fit, so adds are amortized O(dim).
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        approximate: bool = None,
+        probe_lists: int = None,
+        ivf_min_tracks: int = None,
+    ):
+        self.dim = dim
+        self.approximate = approximate if approximate is not None else settings.similarity_approximate
+        self.probe_lists = probe_lists or settings.similarity_probe_lists
+        self.ivf_min_tracks = ivf_min_tracks or settings.similarity_ivf_min_tracks
+        self._keys: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._raw = np.empty((0, dim), dtype=np.float32)
+        self._unit = np.empty((0, dim), dtype=np.float32)
+        self._mean = np.zeros(dim, dtype=np.float32)
+        self._scale = np.ones(dim, dtype=np.float32)
+        self._fitted_size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._lists = np.empty(0, dtype=np.int32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    @property
+    def clustered(self) -> bool:
+        """Whether approximate queries can use the k-means clusters."""
+        return self._centroids is not None
+
+    def load(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Bulk-add (key, embedding) pairs with a single refit."""
+        with self._lock:
+            for key, embedding in items:
+                self._put(key, embedding)
+            self._refit()
+        logger.info(f"Similarity index loaded with {len(self)} tracks")
+
+    def add(self, key: str, embedding: np.ndarray) -> None:
+        """Index a track's embedding under `key`, replacing any previous one."""
+        with self._lock:
+            slot = self._put(key, embedding)
+            if len(self._keys) > self._fitted_size * 1.25:
+                self._refit()
+            else:
+                self._transform(slot, slot + 1)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return
+            # Move the last row into the freed slot
+            last = len(self._keys) - 1
+            if slot != last:
+                moved = self._keys[last]
+                self._keys[slot] = moved
+                self._slots[moved] = slot
+                self._raw[slot] = self._raw[last]
+                self._unit[slot] = self._unit[last]
+                self._lists[slot] = self._lists[last]
+            self._keys.pop()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """The raw embedding indexed under `key`, if any."""
+        with self._lock:
+            slot = self._slots.get(key)
+            return None if slot is None else self._raw[slot].copy()
+
+    def similar(self, key: str, k: int = 10, approximate: bool = None) -> List[Tuple[str, float]]:
+        """The k tracks most similar to an indexed track, as (key, cosine) pairs."""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return []
+            query = self._unit[slot][None, :]
+            return self._search(query, k + 1, approximate, exclude=[key])[0][:k]
+
+    def search(self, embeddings: np.ndarray, k: int = 10, approximate: bool = None) -> List[List[Tuple[str, float]]]:
+        """The k nearest tracks to each row of a batch of raw embeddings."""
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            return self._search(self._standardize(embeddings), k, approximate)
+
+    def _put(self, key: str, embedding: np.ndarray) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._keys)
+            if slot == len(self._raw):
+                self._grow(max(1024, 2 * slot))
+            self._keys.append(key)
+            self._slots[key] = slot
+        self._raw[slot] = embedding
+        return slot
+
+    def _grow(self, capacity: int) -> None:
+        for name in ("_raw", "_unit"):
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        lists = np.zeros(capacity, dtype=np.int32)
+        lists[:len(self._lists)] = self._lists
+        self._lists = lists
+
+    def _standardize(self, raw: np.ndarray) -> np.ndarray:
+        return _normalize_rows((raw - self._mean) / self._scale * BLOCK_WEIGHTS).astype(np.float32)
+
+    def _transform(self, start: int, end: int) -> None:
+        self._unit[start:end] = self._standardize(self._raw[start:end])
+        if self._centroids is not None:
+            self._lists[start:end] = np.argmax(self._unit[start:end] @ self._centroids.T, axis=1)
+
+    def _refit(self) -> None:
+        n = len(self._keys)
+        self._fitted_size = n
+        if n == 0:
+            return
+        raw = self._raw[:n]
+        self._mean = raw.mean(axis=0)
+        std = raw.std(axis=0)
+        self._scale = np.where(std > 1e-6, std, 1.0).astype(np.float32)
+        self._unit[:n] = self._standardize(raw)
+
+        self._centroids = None
+        if self.approximate and n >= self.ivf_min_tracks:
+            # ~sqrt(n) clusters, trained on a sample
+            n_clusters = int(math.sqrt(n))
+            sample = self._unit[:n]
+            if n > 64 * n_clusters:
+                sample = sample[np.random.default_rng(0).choice(n, 64 * n_clusters, replace=False)]
+            self._centroids = _kmeans(sample, n_clusters)
+        self._transform(0, n)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Slots in the query's nearest clusters."""
+        probe = np.zeros(len(self._centroids), dtype=bool)
+        probe[_top_k(self._centroids @ query, self.probe_lists)] = True
+        return np.flatnonzero(probe[self._lists[:len(self._keys)]])
+
+    def _search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        approximate: Optional[bool],
+        exclude: Sequence[str] = (),
+    ) -> List[List[Tuple[str, float]]]:
+        n = len(self._keys)
+        if n == 0:
+            return [[] for _ in queries]
+        if approximate is None:
+            approximate = self.approximate
+        excluded = {self._slots[key] for key in exclude if key in self._slots}
+
+        results = []
+        if approximate and self._centroids is not None:
+            for query in queries:
+                slots = self._candidates(query)
+                scores = self._unit[slots] @ query
+                top = _top_k(scores, k)
+                results.append(self._matches(slots[top], scores[top], excluded))
+        else:
+            # (n, m) keeps the product a contiguous scan over the library rows
+            scores = self._unit[:n] @ queries.T
+            for column in scores.T:
+                top = _top_k(column, k)
+                results.append(self._matches(top, column[top], excluded))
+        return results
+
+    def _matches(self, slots: np.ndarray, scores: np.ndarray, excluded: set) -> List[Tuple[str, float]]:
+        return [
+            (self._keys[slot], float(score))
+            for slot, score in zip(slots.tolist(), scores.tolist())
+            if slot not in excluded
+        ]
+
+
+# Singleton instance
+similarity_index = SimilarityIndex()
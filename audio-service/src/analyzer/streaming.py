@@ -0,0 +1,87 @@
+import logging
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+from src.analyzer.audio_processor import AudioFeatures, AudioProcessor, processor
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingAnalyzer:
+    """
+    Extracts per-chunk features from PCM blocks as they arrive.
+
+    Only the current partial chunk and a short tempo context window are kept,
+    so memory stays bounded regardless of stream length. Tempo is re-estimated
+    over the context window instead of once over the whole file.
+    """
+
+    def __init__(
+        self,
+        audio_processor: Optional[AudioProcessor] = None,
+        chunk_duration: float = 1.0,
+        tempo_window: float = 8.0,
+    ):
+        self.processor = audio_processor or processor
+        self.sr = self.processor.sr
+        self.chunk_duration = chunk_duration
+        self.chunk_samples = int(chunk_duration * self.sr)
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._context: deque = deque(maxlen=max(int(tempo_window / chunk_duration), 2))
+        self._refresh_every = max(self._context.maxlen // 2, 1)
+        self._since_tempo = 0
+        self._tempo: Optional[float] = None
+        self._offset = 0  # samples consumed
+
+    @property
+    def position(self) -> float:
+        """Seconds of audio consumed so far."""
+        return (self._offset + len(self._pending)) / self.sr
+
+    def feed(self, samples: np.ndarray) -> List[AudioFeatures]:
+        """Add decoded samples and return features for every completed chunk."""
+        self._pending = np.concatenate([self._pending, samples.astype(np.float32, copy=False)])
+
+        results = []
+        while len(self._pending) >= self.chunk_samples:
+            chunk = self._pending[:self.chunk_samples]
+            self._pending = self._pending[self.chunk_samples:]
+            results.append(self._process(chunk))
+        return results
+
+    def flush(self) -> List[AudioFeatures]:
+        """Process the trailing partial chunk at end of stream."""
+        chunk = self._pending
+        self._pending = np.zeros(0, dtype=np.float32)
+
+        # Skip if chunk is too short (same rule as process_audio)
+        if len(chunk) < self.chunk_samples // 2:
+            return []
+
+        chunk = np.pad(chunk, (0, self.chunk_samples - len(chunk)))
+        return [self._process(chunk)]
+
+    def _process(self, chunk: np.ndarray) -> AudioFeatures:
+        self._context.append(chunk)
+        self._update_tempo()
+
+        timestamp = self._offset / self.sr
+        self._offset += len(chunk)
+        return self.processor.process_chunk(chunk, timestamp, self._tempo)
+
+    def _update_tempo(self) -> None:
+        self._since_tempo += 1
+        if len(self._context) < 2:
+            # Not enough context yet - process_chunk estimates per chunk
+            return
+        if self._tempo is not None and self._since_tempo < self._refresh_every:
+            return
+
+        try:
+            self._tempo = self.processor.estimate_tempo(np.concatenate(self._context))
+            self._since_tempo = 0
+        except Exception as e:
+            logger.warning(f"Streaming tempo estimate failed: {e}")
@@ -1,4 +1,11 @@
 from .routes import router
-from .schemas import AnalyzeRequest, AnalyzeResponse, JobStatus
+from .schemas import AnalyzeRequest, AnalyzeResponse, BatchAnalyzeRequest, BatchAnalyzeResponse, JobStatus
 
-__all__ = ['router', 'AnalyzeRequest', 'AnalyzeResponse', 'JobStatus']
+__all__ = [
+    'router',
+    'AnalyzeRequest',
+    'AnalyzeResponse',
+    'BatchAnalyzeRequest',
+    'BatchAnalyzeResponse',
+    'JobStatus',
+]
@@ -1,11 +1,64 @@
 import asyncio
+import contextlib
 import logging
+import hashlib
+import re
+import time
+import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from src.api.schemas import AnalyzeRequest, AnalyzeResponse, JobStatus
-from src.extractor import extractor, ExtractionError
-from src.analyzer import processor, brain_mapper, brainwave_predictor, emotion_classifier
-from src.websocket.server import send_progress, send_chunk, send_complete, send_error
+import numpy as np
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
+from src.api.schemas import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    BatchAnalyzeRequest,
+    BatchAnalyzeResponse,
+    BatchItem,
+    JobStatus,
+    Moment,
+    MomentsResponse,
+    SimilarResponse,
+    SimilarTrack,
+)
+from src.config import settings
+from src.extractor import (
+    backend,
+    ExtractionError,
+    ExtractionResult,
+    VideoInfo,
+    VideoRejectedError,
+    StreamDecoder,
+)
+from src.analyzer import (
+    processor,
+    build_analysis,
+    build_segment,
+    emotion_histogram,
+    overall_emotion,
+    AudioFeatures,
+    SegmentAggregator,
+    StreamingAnalyzer,
+    compute_fingerprint,
+    fingerprint_index,
+    embed_track,
+    similarity_index,
+)
+from src.storage import (
+    EXPORT_FORMATS,
+    analysis_store,
+    columnize,
+    export_lines,
+    ndjson_chunks,
+    parse_condition,
+    segment_store,
+)
+from src.utils.metrics import JOB_SECONDS, JOBS_TOTAL
+from src.utils.profiler import SamplingProfiler
+from src.utils.tracing import Trace, bind, span, start_trace
+from src.utils.multipart import iter_multipart_file, get_boundary, MultipartError
+from src.websocket.server import send_progress, send_chunk, send_preview, send_complete, send_error, cleanup_job, reset_replay, expire_replay
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +67,13 @@ router = APIRouter()
 # Simple in-memory job storage (replace with Redis in production)
 jobs = {}
 
+# Client-chosen upload IDs become part of the job ID
+UPLOAD_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Job states a batch waits on when an item is being analyzed by another job
+JOB_IN_FLIGHT = ("pending", "extracting", "analyzing")
+BATCH_POLL_INTERVAL = 1.0
+
 
 def to_camel_case(snake_str: str) -> str:
     """Convert snake_case to camelCase."""
@@ -52,6 +112,15 @@ async def start_analysis(request: AnalyzeRequest, background_tasks: BackgroundTa
             websocket_url=f"ws://localhost:8000"
         )
 
+    # Analyzed before (e.g. by an earlier process)? Serve the stored analysis
+    if job_id not in jobs and await load_stored_job(job_id, request.video_id, request.youtube_url):
+        return AnalyzeResponse(
+            job_id=job_id,
+            video_id=request.video_id,
+            status="complete",
+            websocket_url=f"ws://localhost:8000"
+        )
+
     # Initialize new job
     jobs[job_id] = {
         "status": "pending",
@@ -59,9 +128,10 @@ async def start_analysis(request: AnalyzeRequest, background_tasks: BackgroundTa
         "video_id": request.video_id,
         "url": request.youtube_url
     }
+    reset_replay(job_id)
 
     # Start extraction in background
-    background_tasks.add_task(process_video, job_id, request.youtube_url, request.video_id)
+    background_tasks.add_task(process_video, job_id, request.youtube_url, request.video_id, request.profile)
 
     return AnalyzeResponse(
         job_id=job_id,
@@ -71,142 +141,741 @@ async def start_analysis(request: AnalyzeRequest, background_tasks: BackgroundTa
     )
 
 
-async def process_video(job_id: str, url: str, video_id: str):
+async def load_stored_job(job_id: str, video_id: str, url: Optional[str] = None) -> bool:
+    """Restore a completed job from the analysis store, if it has one."""
+    if analysis_store is None:
+        return False
+    loop = asyncio.get_event_loop()
+    try:
+        analysis = await loop.run_in_executor(None, analysis_store.get_analysis, video_id)
+    except Exception as e:
+        logger.warning(f"Analysis store lookup failed for {video_id}: {e}")
+        return False
+    if analysis is None:
+        return False
+
+    jobs[job_id] = {
+        "status": "complete",
+        "progress": 100,
+        "video_id": video_id,
+        "url": url,
+        "analysis": analysis,
+        "summary": analysis.get("summary"),
+    }
+    return True
+
+
+async def persist_analysis(
+    video_id: str,
+    analysis: dict,
+    features: List[AudioFeatures],
+    fingerprint=None,
+    embedding=None,
+):
+    """
+    Index a completed track for similarity, moment search and deduplication, and
+    save its features and analysis so later mapper changes can be re-derived.
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        if embedding is None and features:
+            embedding = await loop.run_in_executor(None, embed_track, features, analysis["segments"])
+        if embedding is not None:
+            await loop.run_in_executor(None, similarity_index.add, video_id, embedding)
+        await loop.run_in_executor(None, lambda: segment_store.add(video_id, *columnize(analysis["segments"])))
+        if fingerprint is not None:
+            await loop.run_in_executor(None, fingerprint_index.add, video_id, fingerprint)
+        if analysis_store is not None and features:
+            await loop.run_in_executor(
+                None, lambda: analysis_store.save(video_id, analysis, features, 1.0, embedding, fingerprint)
+            )
+    except Exception as e:
+        logger.warning(f"Failed to store analysis of {video_id}: {e}")
+
+
+async def process_video(job_id: str, url: str, video_id: str, profile: bool = False):
     """Background task to process video."""
+    started = time.perf_counter()
+    outcome = "error"
+    trace = jobs[job_id]["trace"] = Trace(job_id)
+    profiler = SamplingProfiler(trace) if profile else None
+    if profiler:
+        profiler.start()
     try:
-        # Phase 1: Extract audio
-        jobs[job_id]["status"] = "extracting"
-        jobs[job_id]["progress"] = 5
-        await send_progress(job_id, "extracting", 5, "Starting audio extraction...")
-
-        result = await extractor.extract_audio(url, video_id)
-
-        jobs[job_id]["progress"] = 20
-        jobs[job_id]["audio_path"] = result.audio_path
-        jobs[job_id]["video_info"] = {
-            "title": result.video_info.title,
-            "duration": result.video_info.duration,
-            "thumbnail_url": result.video_info.thumbnail_url
-        }
-        await send_progress(job_id, "extracting", 20, "Audio extracted successfully")
-
-        # Phase 2: Analyze audio
-        jobs[job_id]["status"] = "analyzing"
-        jobs[job_id]["progress"] = 25
-        await send_progress(job_id, "analyzing", 25, "Starting audio analysis...")
-
-        # Process audio and generate segments
-        segments = []
-        audio_path = result.audio_path
-        duration = result.video_info.duration
-
-        # Process audio in chunks
-        chunk_count = 0
-        total_chunks = int(duration)  # 1 second per chunk
-
-        for features in processor.process_audio(audio_path, chunk_duration=1.0):
-            chunk_count += 1
-
-            # Map features to brain regions, brainwaves, and emotions
-            brain_regions = brain_mapper.map(features)
-            brainwaves = brainwave_predictor.predict(features)
-            emotion = emotion_classifier.classify(features)
-
-            # Build segment data (camelCase for frontend)
-            segment = {
-                "startTime": features.timestamp,
-                "endTime": features.timestamp + 1.0,
-                "frequencies": {
-                    "bass": round(features.bass, 3),
-                    "lowMid": round(features.low_mid, 3),
-                    "mid": round(features.mid, 3),
-                    "highMid": round(features.high_mid, 3),
-                    "high": round(features.high, 3),
-                },
-                "brainRegions": {
-                    "auditoryCortex": round(brain_regions.auditory_cortex, 3),
-                    "amygdala": round(brain_regions.amygdala, 3),
-                    "hippocampus": round(brain_regions.hippocampus, 3),
-                    "nucleusAccumbens": round(brain_regions.nucleus_accumbens, 3),
-                    "motorCortex": round(brain_regions.motor_cortex, 3),
-                    "prefrontalCortex": round(brain_regions.prefrontal_cortex, 3),
-                    "basalGanglia": round(brain_regions.basal_ganglia, 3),
-                },
-                "brainwaves": {
-                    "delta": round(brainwaves.delta, 3),
-                    "theta": round(brainwaves.theta, 3),
-                    "alpha": round(brainwaves.alpha, 3),
-                    "beta": round(brainwaves.beta, 3),
-                    "gamma": round(brainwaves.gamma, 3),
-                },
-                "emotion": {
-                    "primary": emotion.primary,
-                    "confidence": round(emotion.confidence, 3),
-                },
-            }
+        with start_trace(trace):
+            # Phase 1: Extract audio
+            jobs[job_id]["status"] = "extracting"
+            jobs[job_id]["progress"] = 5
+            await send_progress(job_id, "extracting", 5, "Starting audio extraction...")
 
-            segments.append(segment)
+            # Pipelined mode: analyze while the audio is still downloading
+            if not (settings.pipelined_analysis and await analyze_pipelined(job_id, url, video_id)):
+                with span("extract", backend=backend.name):
+                    result = await backend.extract_audio(url, video_id)
+                await mark_extracted(job_id, result)
 
-            # Send chunk via WebSocket
-            await send_chunk(job_id, features.timestamp, segment)
+                # Phase 2: Analyze audio
+                await analyze_audio(job_id, video_id, result)
+        outcome = "complete"
 
-            # Update progress (25% to 90%)
-            progress = 25 + int((chunk_count / max(total_chunks, 1)) * 65)
-            jobs[job_id]["progress"] = min(progress, 90)
-
-            # Small delay to allow WebSocket events to be sent
-            await asyncio.sleep(0.01)
-
-        # Calculate overall emotion (most common primary emotion)
-        if segments:
-            emotion_counts = {}
-            for seg in segments:
-                em = seg["emotion"]["primary"]
-                emotion_counts[em] = emotion_counts.get(em, 0) + 1
-            overall_primary = max(emotion_counts, key=emotion_counts.get)
-            overall_confidence = emotion_counts[overall_primary] / len(segments)
-        else:
-            overall_primary = "calm"
-            overall_confidence = 0.5
-
-        # Build complete analysis
-        analysis = {
-            "id": job_id,
-            "video": {
-                "id": video_id,
-                "title": result.video_info.title,
-                "duration": result.video_info.duration,
-                "thumbnailUrl": result.video_info.thumbnail_url,
-            },
-            "overallEmotion": {
-                "primary": overall_primary,
-                "confidence": round(overall_confidence, 3),
-            },
-            "segments": segments,
-            "analyzedAt": datetime.utcnow().isoformat() + "Z",
-        }
-
-        # Mark as complete
-        jobs[job_id]["status"] = "complete"
-        jobs[job_id]["progress"] = 100
-        jobs[job_id]["analysis"] = analysis
-
-        await send_progress(job_id, "complete", 100, "Analysis complete!")
-        await send_complete(job_id, analysis)
-
-        logger.info(f"Job {job_id} completed with {len(segments)} segments")
+    except VideoRejectedError as e:
+        outcome = "rejected"
+        await fail_job(job_id, "VIDEO_REJECTED", str(e))
 
     except ExtractionError as e:
-        jobs[job_id]["status"] = "error"
-        jobs[job_id]["error"] = str(e)
-        await send_error(job_id, "EXTRACTION_ERROR", str(e))
-        logger.error(f"Job {job_id} extraction error: {e}")
+        outcome = "extraction_error"
+        await fail_job(job_id, "EXTRACTION_ERROR", str(e))
 
     except Exception as e:
-        jobs[job_id]["status"] = "error"
-        jobs[job_id]["error"] = f"Unexpected error: {str(e)}"
-        await send_error(job_id, "ANALYSIS_ERROR", str(e))
-        logger.exception(f"Job {job_id} unexpected error: {e}")
+        await fail_job(job_id, "ANALYSIS_ERROR", str(e), unexpected=True)
+
+    finally:
+        JOB_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        JOBS_TOTAL.inc(outcome=outcome)
+        trace.root.attrs["outcome"] = outcome
+        if profiler:
+            trace.profile_path = await asyncio.get_event_loop().run_in_executor(None, profiler.stop)
+        asyncio.get_event_loop().call_later(settings.trace_detail_ttl, trace.compact)
+
+
+async def analyze_pipelined(job_id: str, url: str, video_id: str) -> bool:
+    """
+    Stream and decode the audio with ffmpeg, analyzing chunks as they arrive.
+
+    Returns False (so the caller falls back to a full download) when the
+    stream cannot be resolved or decoded before any audio was produced.
+    """
+    try:
+        with span("resolve_stream", backend=backend.name):
+            source = await backend.get_stream(url, video_id)
+    except VideoRejectedError:
+        raise
+    except ExtractionError as e:
+        logger.warning(f"Job {job_id} stream resolve failed, falling back to download: {e}")
+        return False
+
+    jobs[job_id]["video_info"] = {
+        "title": source.video_info.title,
+        "duration": source.video_info.duration,
+        "thumbnail_url": source.video_info.thumbnail_url
+    }
+    jobs[job_id]["truncated"] = source.truncated
+    jobs[job_id]["progress"] = 20
+    await send_progress(job_id, "extracting", 20, "Streaming audio...")
+
+    decoder = StreamDecoder(
+        source=source.url,
+        headers=source.headers,
+        max_duration=settings.max_audio_duration,
+    )
+    try:
+        await decoder.start()
+        await analyze_stream(job_id, video_id, decoder, source.video_info)
+        return True
+    except ExtractionError as e:
+        if decoder.samples_decoded:
+            raise
+        logger.warning(f"Job {job_id} stream decode failed, falling back to download: {e}")
+        return False
+    finally:
+        decoder.close()
+
+
+async def mark_extracted(job_id: str, result: ExtractionResult):
+    """Record extraction output on the job and notify subscribers."""
+    jobs[job_id]["progress"] = 20
+    jobs[job_id]["audio_path"] = result.audio_path
+    jobs[job_id]["video_info"] = {
+        "title": result.video_info.title,
+        "duration": result.video_info.duration,
+        "thumbnail_url": result.video_info.thumbnail_url
+    }
+    jobs[job_id]["truncated"] = result.truncated
+    await send_progress(job_id, "extracting", 20, "Audio extracted successfully")
+
+
+async def fail_job(job_id: str, code: str, message: str, unexpected: bool = False):
+    """Mark a job as failed and notify subscribers."""
+    jobs[job_id]["status"] = "error"
+    jobs[job_id].pop("features", None)
+    if unexpected:
+        jobs[job_id]["error"] = f"Unexpected error: {message}"
+        logger.exception(f"Job {job_id} unexpected error: {message}")
+    else:
+        jobs[job_id]["error"] = message
+        logger.error(f"Job {job_id} extraction error: {message}")
+    await send_error(job_id, code, message)
+
+
+async def analyze_audio(job_id: str, video_id: str, result: ExtractionResult) -> dict:
+    """Analyze an extracted audio file, streaming chunks to subscribers."""
+    jobs[job_id]["status"] = "analyzing"
+    jobs[job_id]["progress"] = 25
+    await send_progress(job_id, "analyzing", 25, "Starting audio analysis...")
+
+    # Process audio and generate segments
+    segments = []
+    aggregator = SegmentAggregator()
+    audio_path = result.audio_path
+    duration = result.video_info.duration
+
+    loop = asyncio.get_event_loop()
+    y, _ = await loop.run_in_executor(None, bind(processor.load_audio), audio_path)
+
+    # Same audio already analyzed under another video ID? Reuse it
+    fingerprint = None
+    if settings.dedup_enabled:
+        with span("fingerprint"):
+            fingerprint = await loop.run_in_executor(None, compute_fingerprint, y, processor.sr)
+        duplicate = await find_duplicate(fingerprint, video_id)
+        if duplicate:
+            return await complete_from_duplicate(job_id, video_id, result.video_info, duplicate, fingerprint)
+
+    # Coarse pass first, so clients get a timeline before the detailed one
+    await send_coarse_preview(job_id, y)
+
+    # Process audio in chunks
+    # 1 second per chunk; audio past the duration cap is never analyzed
+    total_chunks = int(min(duration, settings.max_audio_duration))
+
+    # Feature extraction (beat tracking first) is CPU-bound: step it in the
+    # executor so other jobs' events keep flowing meanwhile
+    chunks = processor.process_samples(y, chunk_duration=1.0)
+    next_chunk = bind(lambda: next(chunks, None))
+    while (features := await loop.run_in_executor(None, next_chunk)) is not None:
+        await emit_segment(job_id, features, segments, aggregator, total_chunks)
+
+    return await complete_job(job_id, video_id, result.video_info, segments, aggregator, fingerprint)
+
+
+async def analyze_stream(
+    job_id: str,
+    video_id: str,
+    decoder: StreamDecoder,
+    video_info: VideoInfo,
+    producer: Optional[asyncio.Task] = None,
+) -> dict:
+    """
+    Analyze audio while it is still being decoded, streaming chunks to subscribers.
+
+    `producer` is the task feeding the decoder, if any; it is awaited before the
+    job completes so that input errors fail the job instead of truncating it.
+    """
+    jobs[job_id]["status"] = "analyzing"
+    jobs[job_id]["progress"] = 25
+    await send_progress(job_id, "analyzing", 25, "Analyzing audio as it arrives...")
+
+    segments = []
+    aggregator = SegmentAggregator()
+    total_chunks = int(min(video_info.duration, settings.max_audio_duration))
+    analyzer = StreamingAnalyzer(processor, chunk_duration=1.0)
+    loop = asyncio.get_event_loop()
+
+    # The first seconds are kept to fingerprint the track for deduplication
+    head = []
+    head_samples = int(settings.fingerprint_seconds * processor.sr) if settings.dedup_enabled else 0
+    fingerprint = None
+
+    # The coarse preview covers the first seconds, sent as soon as they are decoded
+    preview_head = []
+    preview_samples = int(settings.preview_stream_seconds * processor.sr)
+    preview_buffered = 0
+
+    async for block in decoder.blocks():
+        if head_samples and fingerprint is None:
+            head.append(block)
+            if sum(len(b) for b in head) >= head_samples:
+                with span("fingerprint"):
+                    fingerprint = await loop.run_in_executor(
+                        None, compute_fingerprint, np.concatenate(head), processor.sr
+                    )
+                head = []
+                duplicate = await find_duplicate(fingerprint, video_id)
+                if duplicate:
+                    # Stop fetching/decoding: the rest of the work is already done
+                    decoder.close()
+                    await decoder.wait()
+                    if producer is not None:
+                        await producer
+                    return await complete_from_duplicate(job_id, video_id, video_info, duplicate, fingerprint)
+
+        if preview_samples and preview_head is not None:
+            preview_head.append(block)
+            preview_buffered += len(block)
+            if preview_buffered >= preview_samples:
+                await send_coarse_preview(job_id, np.concatenate(preview_head))
+                preview_head = None
+
+        # Feature extraction is CPU-bound; keep the loop free to pump the decoder
+        for features in await loop.run_in_executor(None, bind(analyzer.feed), block):
+            await emit_segment(job_id, features, segments, aggregator, total_chunks)
+
+    if preview_head:
+        # Track shorter than the preview window
+        await send_coarse_preview(job_id, np.concatenate(preview_head))
+
+    for features in analyzer.flush():
+        await emit_segment(job_id, features, segments, aggregator, total_chunks)
+
+    if producer is not None:
+        await producer
+
+    # Uploads (and streams without a known duration) are only found to be
+    # longer than the cap once decoding stops at it
+    jobs[job_id]["truncated"] = jobs[job_id].get("truncated") or decoder.capped
+
+    if not video_info.duration:
+        video_info.duration = int(round(decoder.duration))
+
+    if head:
+        # Track shorter than the fingerprint window
+        with span("fingerprint"):
+            fingerprint = await loop.run_in_executor(None, compute_fingerprint, np.concatenate(head), processor.sr)
+
+    return await complete_job(job_id, video_id, video_info, segments, aggregator, fingerprint)
+
+
+async def find_duplicate(fingerprint, video_id: str) -> Optional[dict]:
+    """Return the completed analysis of an acoustically identical track, if any."""
+    loop = asyncio.get_event_loop()
+    match = await loop.run_in_executor(None, lambda: fingerprint_index.lookup(fingerprint, exclude=video_id))
+    if not match:
+        return None
+
+    source = jobs.get(f"job_{match[0]}", {})
+    if source.get("status") == "complete" and source.get("analysis"):
+        return source["analysis"]
+    if analysis_store is None:
+        return None
+    # Analyzed before a restart: the fingerprint index is rebuilt from the store
+    try:
+        return await loop.run_in_executor(None, analysis_store.get_analysis, match[0])
+    except Exception as e:
+        logger.warning(f"Analysis store lookup failed for {match[0]}: {e}")
+        return None
+
+
+async def complete_from_duplicate(
+    job_id: str,
+    video_id: str,
+    video_info: VideoInfo,
+    source: dict,
+    fingerprint,
+) -> dict:
+    """Complete a job by re-keying a previously computed analysis of the same audio."""
+    source_id = source["video"]["id"]
+    logger.info(f"Job {job_id} matches {source_id}, reusing its analysis")
+
+    # Segments are never mutated after completion, so they can be shared
+    analysis = {
+        **source,
+        "id": job_id,
+        "overallEmotion": overall_emotion(source["summary"]["emotionHistogram"]),
+        "video": {
+            "id": video_id,
+            "title": video_info.title,
+            "duration": video_info.duration or source["video"]["duration"],
+            "thumbnailUrl": video_info.thumbnail_url,
+        },
+        "dedupedFrom": source_id,
+    }
+
+    # Features of the chunks analyzed before the match was found
+    jobs[job_id].pop("features", None)
+    jobs[job_id]["status"] = "complete"
+    jobs[job_id]["progress"] = 100
+    jobs[job_id]["analysis"] = analysis
+    jobs[job_id]["summary"] = analysis.get("summary")
+    jobs[job_id]["deduped_from"] = source_id
+
+    await send_progress(job_id, "complete", 100, "Analysis complete (matched a previously analyzed track)")
+    await send_complete(job_id, analysis)
+
+    # Stored and indexed like any other track, from the source's features
+    loop = asyncio.get_event_loop()
+    features = []
+    if analysis_store is not None:
+        try:
+            track = await loop.run_in_executor(None, analysis_store.load_track, source_id)
+            features = track.features if track else []
+        except Exception as e:
+            logger.warning(f"Analysis store lookup failed for {source_id}: {e}")
+    embedding = None if features else similarity_index.get(source_id)
+    await persist_analysis(video_id, analysis, features, fingerprint, embedding)
+    return analysis
+
+
+async def send_coarse_preview(job_id: str, y):
+    """
+    Run the fast coarse pass over `y` and send its timeline and overall emotion.
+
+    `y` is the whole track for downloaded audio, or its first
+    preview_stream_seconds when analyzing a stream.
+    """
+    resolution = settings.preview_resolution
+    try:
+        loop = asyncio.get_event_loop()
+        coarse = await loop.run_in_executor(None, bind(processor.preview), y, resolution)
+    except Exception as e:
+        logger.warning(f"Job {job_id} preview failed: {e}")
+        return
+
+    duration = len(y) / processor.sr
+    timeline = []
+    for features in coarse:
+        segment = build_segment(features, chunk_duration=resolution)
+        segment["endTime"] = round(min(segment["endTime"], duration), 3)
+        timeline.append(segment)
+
+    preview = {
+        "resolution": resolution,
+        "timeline": timeline,
+        "overallEmotion": overall_emotion(emotion_histogram(timeline)),
+    }
+    jobs[job_id]["preview"] = preview
+    await send_preview(job_id, resolution, timeline, preview["overallEmotion"])
+
+
+async def emit_segment(
+    job_id: str,
+    features: AudioFeatures,
+    segments: list,
+    aggregator: SegmentAggregator,
+    total_chunks: int,
+):
+    """Build a segment from chunk features, record it and send it to subscribers."""
+    with span("segment", timestamp=features.timestamp):
+        # Map features to brain regions, brainwaves, and emotions
+        segment = build_segment(features, chunk_duration=1.0)
+        segments.append(segment)
+        aggregator.update(segment, features)
+        jobs[job_id].setdefault("features", []).append(features)
+
+        # Send chunk via WebSocket
+        with span("emit"):
+            await send_chunk(job_id, features.timestamp, segment)
+
+    # Update progress (25% to 90%), when the total length is known
+    if total_chunks:
+        progress = 25 + int((len(segments) / total_chunks) * 65)
+        jobs[job_id]["progress"] = min(progress, 90)
+
+    # Periodically share the running summary
+    if len(segments) % settings.summary_interval == 0:
+        summary = aggregator.snapshot()
+        jobs[job_id]["summary"] = summary
+        await send_progress(
+            job_id,
+            "analyzing",
+            jobs[job_id]["progress"],
+            f"Analyzed {len(segments)}s of audio",
+            summary=summary,
+        )
+
+
+async def complete_job(
+    job_id: str,
+    video_id: str,
+    video_info: VideoInfo,
+    segments: list,
+    aggregator: SegmentAggregator,
+    fingerprint=None,
+) -> dict:
+    """Build the final analysis from the streamed segments and mark the job complete."""
+    summary = aggregator.snapshot()
+    # Build complete analysis
+    video = {
+        "id": video_id,
+        "title": video_info.title,
+        "duration": video_info.duration,
+        "thumbnailUrl": video_info.thumbnail_url,
+    }
+    analysis = build_analysis(job_id, video, jobs[job_id].get("truncated", False), segments, summary)
+    features = jobs[job_id].pop("features", [])
+
+    # Mark as complete
+    jobs[job_id]["status"] = "complete"
+    jobs[job_id]["progress"] = 100
+    jobs[job_id]["analysis"] = analysis
+    jobs[job_id]["summary"] = summary
+
+    await send_progress(job_id, "complete", 100, "Analysis complete!", summary=summary)
+    await send_complete(job_id, analysis)
+
+    logger.info(f"Job {job_id} completed with {len(segments)} segments")
+    await persist_analysis(video_id, analysis, features, fingerprint)
+    return analysis
+
+
+@router.post("/upload", response_model=AnalyzeResponse)
+async def upload_audio(request: Request, upload_id: Optional[str] = None, title: Optional[str] = None):
+    """
+    Analyze an uploaded audio file while the upload is still streaming in.
+
+    The body is either the raw audio (optionally with chunked transfer
+    encoding) or multipart/form-data with a single file part. Subscribe to
+    job_{upload_id} before uploading to receive chunk events as they are made.
+    """
+    upload_id = upload_id or uuid.uuid4().hex[:12]
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload_id")
+
+    job_id = f"job_{upload_id}"
+    if job_id in jobs and jobs[job_id].get("status") in ["pending", "extracting", "analyzing"]:
+        raise HTTPException(status_code=409, detail="Upload already in progress")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        try:
+            body = iter_multipart_file(request.stream(), get_boundary(content_type))
+        except MultipartError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        body = request.stream()
+
+    jobs[job_id] = {
+        "status": "extracting",
+        "progress": 5,
+        "video_id": upload_id,
+        "url": None,
+    }
+    reset_replay(job_id)
+    video_info = VideoInfo(id=upload_id, title=title or "Uploaded audio", duration=0, thumbnail_url="")
+
+    decoder = StreamDecoder(max_duration=settings.max_audio_duration)
+
+    async def feed_decoder():
+        received = 0
+        try:
+            async for data in body:
+                received += len(data)
+                if received > settings.max_upload_bytes:
+                    decoder.close()
+                    raise UploadTooLargeError(
+                        f"Upload too large (max: {settings.max_upload_bytes} bytes)"
+                    )
+                await decoder.write(data)
+        finally:
+            await decoder.close_input()
+
+    feeder = None
+    try:
+        await decoder.start()
+        feeder = asyncio.create_task(feed_decoder())
+        await analyze_stream(job_id, upload_id, decoder, video_info, producer=feeder)
+
+    except UploadTooLargeError as e:
+        await fail_job(job_id, "UPLOAD_TOO_LARGE", str(e))
+        raise HTTPException(status_code=413, detail=str(e))
+
+    except (ExtractionError, MultipartError) as e:
+        await fail_job(job_id, "EXTRACTION_ERROR", str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        await fail_job(job_id, "ANALYSIS_ERROR", str(e), unexpected=True)
+        raise HTTPException(status_code=500, detail="Analysis failed")
+
+    finally:
+        # Analysis failed before awaiting the feeder: stop reading the body
+        if feeder is not None:
+            feeder.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await feeder
+        decoder.close()
+
+    return AnalyzeResponse(
+        job_id=job_id,
+        video_id=upload_id,
+        status=jobs[job_id]["status"],
+        websocket_url=f"ws://localhost:8000"
+    )
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds max_upload_bytes."""
+    pass
+
+
+@router.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def start_batch_analysis(request: BatchAnalyzeRequest, background_tasks: BackgroundTasks):
+    """Start analysis of a list of videos or a whole playlist as one job."""
+    # Resolve metadata for every item up front, in a single pass
+    if request.playlist_url:
+        try:
+            entries = await backend.get_playlist_entries(request.playlist_url)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to resolve playlist: {str(e)}")
+    else:
+        entries = await resolve_video_infos(list(dict.fromkeys(request.video_ids)))
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="No videos to analyze")
+    if len(entries) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many videos: {len(entries)} (max: {settings.max_batch_size})"
+        )
+
+    digest = hashlib.sha1(",".join(entry.id for entry in entries).encode()).hexdigest()[:12]
+    batch_id = f"batch_{digest}"
+
+    if batch_id in jobs and jobs[batch_id].get("status") in ["pending", "extracting", "analyzing", "complete"]:
+        return _batch_response(batch_id)
+
+    items = []
+    for entry in entries:
+        job_id = f"job_{entry.id}"
+        # Videos already analyzed (or in flight elsewhere) are reused, not redone
+        if job_id not in jobs or jobs[job_id].get("status") == "error":
+            jobs[job_id] = {
+                "status": "pending",
+                "progress": 0,
+                "video_id": entry.id,
+                "url": f"https://www.youtube.com/watch?v={entry.id}",
+                "batch_id": batch_id,
+            }
+            reset_replay(job_id)
+        items.append({"job_id": job_id, "video_id": entry.id, "title": entry.title or None})
+
+    jobs[batch_id] = {
+        "status": "pending",
+        "progress": 0,
+        "items": items,
+    }
+
+    background_tasks.add_task(process_batch, batch_id, entries)
+
+    return _batch_response(batch_id)
+
+
+async def resolve_video_infos(video_ids: List[str]) -> List[VideoInfo]:
+    """
+    Metadata (title, duration) of each video, fetched concurrently.
+
+    Videos whose metadata cannot be fetched keep an empty placeholder; their
+    extraction reports the actual error.
+    """
+    semaphore = asyncio.Semaphore(settings.batch_info_concurrency)
+
+    async def resolve(video_id: str) -> VideoInfo:
+        async with semaphore:
+            try:
+                return await backend.get_video_info(f"https://www.youtube.com/watch?v={video_id}", video_id)
+            except Exception as e:
+                logger.warning(f"Failed to fetch info for {video_id}: {e}")
+                return VideoInfo(id=video_id, title="", duration=0, thumbnail_url="")
+
+    return list(await asyncio.gather(*(resolve(video_id) for video_id in video_ids)))
+
+
+def _batch_response(batch_id: str) -> BatchAnalyzeResponse:
+    batch = jobs[batch_id]
+    return BatchAnalyzeResponse(
+        job_id=batch_id,
+        status=batch.get("status", "pending"),
+        items=[
+            BatchItem(**item, status=jobs.get(item["job_id"], {}).get("status", "pending"))
+            for item in batch["items"]
+        ],
+        websocket_url=f"ws://localhost:8000"
+    )
+
+
+async def process_batch(batch_id: str, entries: List[VideoInfo]):
+    """
+    Background task to process a batch of videos.
+
+    Downloads run ahead of analysis through a bounded queue, so item N+1 is
+    fetched while item N is being analyzed. Aggregate progress is reported on
+    the batch job; each item still streams its own chunks on job_{video_id}.
+    Items already in flight under another job are awaited once the batch's own
+    items are done (so two batches sharing videos cannot wait on each other).
+    """
+    total = len(entries)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(settings.batch_prefetch, 1))
+
+    async def download_all():
+        for entry in entries:
+            job_id = f"job_{entry.id}"
+            result = None
+            try:
+                job = jobs[job_id]
+                if job.get("batch_id") != batch_id or job.get("status") != "pending":
+                    # Owned by another request or already analyzed
+                    continue
+                job["status"] = "extracting"
+                job["progress"] = 5
+                await send_progress(job_id, "extracting", 5, "Starting audio extraction...")
+                result = await backend.extract_audio(job["url"], entry.id)
+                await mark_extracted(job_id, result)
+            except VideoRejectedError as e:
+                await fail_job(job_id, "VIDEO_REJECTED", str(e))
+            except ExtractionError as e:
+                await fail_job(job_id, "EXTRACTION_ERROR", str(e))
+            except Exception as e:
+                if job_id in jobs:
+                    await fail_job(job_id, "ANALYSIS_ERROR", str(e), unexpected=True)
+                else:
+                    logger.warning(f"Batch {batch_id} item {job_id} was deleted: {e}")
+            finally:
+                # Every item is handed over, unless the batch is being torn down
+                if not asyncio.current_task().cancelling():
+                    await queue.put((entry, result))
+
+    done = 0
+    failed = 0
+
+    async def item_done(job_id: str):
+        nonlocal done, failed
+        if jobs.get(job_id, {}).get("status") != "complete":
+            failed += 1
+        done += 1
+
+        progress = int(done / total * 100)
+        jobs[batch_id]["progress"] = progress
+        await send_progress(
+            batch_id,
+            "analyzing" if done < total else "complete",
+            progress,
+            f"Processed {done}/{total} videos ({failed} failed)",
+        )
+
+    jobs[batch_id]["status"] = "analyzing"
+    await send_progress(batch_id, "analyzing", 0, f"Starting batch of {total} videos...")
+
+    downloader = asyncio.create_task(download_all())
+    in_flight = []
+
+    try:
+        for _ in range(total):
+            entry, result = await queue.get()
+            job_id = f"job_{entry.id}"
+
+            if result is not None:
+                try:
+                    await analyze_audio(job_id, entry.id, result)
+                except Exception as e:
+                    await fail_job(job_id, "ANALYSIS_ERROR", str(e), unexpected=True)
+            elif jobs.get(job_id, {}).get("status") in JOB_IN_FLIGHT:
+                in_flight.append(job_id)
+                continue
+
+            await item_done(job_id)
+
+        for job_id in in_flight:
+            while jobs.get(job_id, {}).get("status") in JOB_IN_FLIGHT:
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+            await item_done(job_id)
+    except Exception as e:
+        await fail_job(batch_id, "ANALYSIS_ERROR", str(e), unexpected=True)
+        return
+    finally:
+        downloader.cancel()
+
+    jobs[batch_id]["status"] = "complete"
+    expire_replay(batch_id)
+    logger.info(f"Batch {batch_id} completed: {done - failed}/{total} analyzed")
 
 
 @router.get("/job/{job_id}", response_model=JobStatus)
@@ -224,10 +893,23 @@ async def get_job_status(job_id: str):
     )
 
 
+@router.get("/job/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """Get the span tree (per-stage totals only, once compacted) and profile path recorded for a job."""
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    trace = jobs[job_id].get("trace")
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace recorded for this job")
+
+    return trace.to_dict()
+
+
 @router.get("/job/{job_id}/analysis")
 async def get_job_analysis(job_id: str):
     """Get the analysis data for a completed job."""
-    if job_id not in jobs:
+    if job_id not in jobs and not await load_stored_job(job_id, job_id.removeprefix("job_")):
         raise HTTPException(status_code=404, detail="Job not found")
 
     job = jobs[job_id]
@@ -241,9 +923,106 @@ async def get_job_analysis(job_id: str):
     return analysis
 
 
+@router.get("/similar/{video_id}", response_model=SimilarResponse)
+async def get_similar(
+    video_id: str,
+    k: int = Query(10, ge=1, le=100),
+    approximate: Optional[bool] = None,
+):
+    """Get the analyzed tracks that feel most like this one."""
+    if video_id not in similarity_index:
+        raise HTTPException(status_code=404, detail="Track not analyzed")
+
+    if approximate is None:
+        approximate = similarity_index.approximate
+    # Small libraries are always scanned exactly
+    approximate = approximate and similarity_index.clustered
+    loop = asyncio.get_event_loop()
+    matches = await loop.run_in_executor(None, similarity_index.similar, video_id, k, approximate)
+
+    videos = {}
+    if analysis_store is not None:
+        videos = await loop.run_in_executor(None, analysis_store.videos, [key for key, _ in matches])
+    return SimilarResponse(
+        video_id=video_id,
+        approximate=approximate,
+        results=[
+            SimilarTrack(
+                video_id=key,
+                score=round(score, 4),
+                title=videos.get(key, {}).get("title"),
+                thumbnail_url=videos.get(key, {}).get("thumbnailUrl"),
+            )
+            for key, score in matches
+        ],
+    )
+
+
+@router.get("/moments", response_model=MomentsResponse)
+async def search_moments(
+    where: List[str] = Query([], description="Conditions such as nucleusAccumbens>0.8 (all must hold)"),
+    emotion: List[str] = Query([], description="Primary emotions to match (any of)"),
+    video_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """Find moments (runs of adjacent segments) matching conditions across all analyzed tracks."""
+    try:
+        conditions = [parse_condition(expression) for expression in where]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    loop = asyncio.get_event_loop()
+    try:
+        moments, next_cursor = await loop.run_in_executor(
+            None, lambda: segment_store.query(conditions, emotion, video_id, limit, cursor)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    videos = {}
+    if analysis_store is not None:
+        videos = await loop.run_in_executor(
+            None, analysis_store.videos, list({moment["video_id"] for moment in moments})
+        )
+    return MomentsResponse(
+        moments=[Moment(**moment, title=videos.get(moment["video_id"], {}).get("title")) for moment in moments],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/export")
+async def export_library(
+    format: str = Query("analyses", description=f"One of: {', '.join(EXPORT_FORMATS)}"),
+    video_id: List[str] = Query([], description="Only these tracks"),
+    emotion: Optional[str] = Query(None, description="Only tracks with this overall emotion"),
+    since: Optional[datetime] = Query(None, description="Only analyses derived since"),
+):
+    """Stream every stored analysis (or one flat row per segment) as NDJSON."""
+    if analysis_store is None:
+        raise HTTPException(status_code=503, detail="Analysis store is disabled")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+
+    pieces = export_lines(analysis_store, format, video_id or None, emotion, since.timestamp() if since else None)
+    # A sync generator: Starlette iterates it in a worker thread
+    return StreamingResponse(
+        ndjson_chunks(pieces),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{format}.ndjson"'},
+    )
+
+
 @router.delete("/job/{job_id}")
 async def delete_job(job_id: str):
     """Delete a job to allow re-analysis."""
+    similarity_index.remove(job_id.removeprefix("job_"))
+    segment_store.remove(job_id.removeprefix("job_"))
+    fingerprint_index.remove(job_id.removeprefix("job_"))
     if job_id in jobs:
         del jobs[job_id]
+        await cleanup_job(job_id)
+    if analysis_store is not None:
+        # Otherwise the stored analysis would be served again
+        analysis_store.delete(job_id.removeprefix("job_"))
     return {"status": "deleted", "job_id": job_id}
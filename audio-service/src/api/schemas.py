@@ -1,10 +1,16 @@
-from typing import Optional, List, Dict
-from pydantic import BaseModel
+from typing import Annotated, Optional, List, Dict
+from pydantic import BaseModel, Field, model_validator
+
+from src.extractor.base import VIDEO_ID_PATTERN
+
+VideoId = Annotated[str, Field(pattern=VIDEO_ID_PATTERN.pattern)]
 
 
 class AnalyzeRequest(BaseModel):
-    video_id: str
+    video_id: VideoId
     youtube_url: str
+    # Sample this job with the profiler (folded stacks under temp_dir/profiles)
+    profile: bool = False
 
 
 class AnalyzeResponse(BaseModel):
@@ -14,6 +20,58 @@ class AnalyzeResponse(BaseModel):
     websocket_url: str
 
 
+class BatchAnalyzeRequest(BaseModel):
+    video_ids: Optional[List[VideoId]] = None
+    playlist_url: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_source(self) -> "BatchAnalyzeRequest":
+        if bool(self.video_ids) == bool(self.playlist_url):
+            raise ValueError("Provide either video_ids or playlist_url")
+        return self
+
+
+class BatchItem(BaseModel):
+    job_id: str
+    video_id: str
+    title: Optional[str] = None
+    status: str
+
+
+class BatchAnalyzeResponse(BaseModel):
+    job_id: str
+    status: str
+    items: List[BatchItem]
+    websocket_url: str
+
+
+class SimilarTrack(BaseModel):
+    video_id: str
+    score: float  # Cosine similarity of the track embeddings
+    title: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+
+
+class SimilarResponse(BaseModel):
+    video_id: str
+    approximate: bool
+    results: List[SimilarTrack]
+
+
+class Moment(BaseModel):
+    video_id: str
+    start_time: float
+    end_time: float
+    segments: int  # Adjacent matching segments merged into this moment
+    title: Optional[str] = None
+
+
+class MomentsResponse(BaseModel):
+    moments: List[Moment]
+    # Pass as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
 class JobStatus(BaseModel):
     job_id: str
     status: str
@@ -18,11 +18,111 @@ class Settings(BaseSettings):
     # Audio processing
     temp_dir: str = "/tmp/audio"
     max_audio_duration: int = 600  # 10 minutes max
+    # Analyze only the first max_audio_duration seconds of longer videos
+    # (fetching just that range) instead of rejecting them
+    truncate_long_audio: bool = True
     cleanup_interval: int = 300  # 5 minutes
 
+    # yt-dlp: warm sessions kept per kind, and cache dir for EJS/player JS
+    # (defaults to <temp_dir>/.yt-dlp-cache)
+    ytdlp_pool_size: int = 2
+    ytdlp_cache_dir: str = ""
+
+    # Where audio comes from: "youtube", "local" (files named <video_id>.<ext>
+    # in media_dir) or "http" (a media host such as src.extractor.fixture_server)
+    extractor_backend: str = "youtube"
+    media_dir: str = ""
+    media_server_url: str = "http://127.0.0.1:8765"
+
+    # Seconds to keep preflight metadata (and resolved stream URLs)
+    metadata_cache_ttl: int = 600
+
+    # Decode and analyze the audio stream while it downloads, instead of
+    # waiting for the full file (falls back to a full download on failure)
+    pipelined_analysis: bool = True
+
+    # Reuse analyses of acoustically identical tracks (re-uploads, lyric videos)
+    dedup_enabled: bool = True
+    fingerprint_seconds: float = 15.0
+    fingerprint_max_ber: float = 0.3  # unrelated audio scores ~0.5
+
+    # Batch analysis
+    max_batch_size: int = 50
+    batch_prefetch: int = 1  # downloads allowed to run ahead of analysis
+    batch_info_concurrency: int = 8  # metadata lookups in flight when a batch starts
+
+    # Direct uploads
+    max_upload_bytes: int = 100 * 1024 * 1024  # 100 MB
+
     # Sample rate for analysis
     sample_rate: int = 22050
 
+    # Send a progress message with the running summary every N segments
+    summary_interval: int = 10
+
+    # Pub/sub bus shared by all workers for Socket.IO emits ("" = single
+    # process; sqlite:///path, redis://... or amqp://..., see websocket/bus.py)
+    message_bus_url: str = ""
+
+    # Chunks kept per job for late subscribers and reconnects, and for how
+    # long (seconds) after the job completes or fails
+    replay_buffer_size: int = 900
+    replay_buffer_ttl: float = 300.0
+
+    # Slow-client handling: a client with more than the high watermark of
+    # packets queued is throttled (coalesced progress, batched chunks) until
+    # its queue drains below the low watermark; it is disconnected with a
+    # resume token if its outbox exceeds outbox_max_chunks or it stays
+    # throttled for slow_client_timeout seconds
+    backpressure_high_watermark: int = 64
+    backpressure_low_watermark: int = 8
+    outbox_max_chunks: int = 300
+    slow_client_timeout: float = 60.0
+    resume_token_ttl: int = 300
+
+    # Per-client HTTP budget in request units per minute (routes are weighted,
+    # see middleware/rate_limit.py); at most rate_limit_max_clients clients are
+    # tracked. rate_limit_shared keeps the counters in shared memory so every
+    # worker on the host enforces one budget.
+    rate_limit_per_minute: int = 10
+    rate_limit_max_clients: int = 10000
+    rate_limit_exempt_paths: str = "/health,/ready,/metrics"
+    rate_limit_shared: bool = False
+    rate_limit_shm_name: str = "neuro_acoustic_rate_limit"
+
+    # Run the analysis hot path once at startup so librosa's numba kernels are
+    # compiled before /ready reports ready; compiled kernels are cached in
+    # numba_cache_dir (defaults to <temp_dir>/.numba-cache), which can be a
+    # volume shared across restarts
+    warm_up_analysis: bool = True
+    numba_cache_dir: str = ""
+
+    # Persist per-track feature tables and derived analyses (SQLite under
+    # data_dir, default <temp_dir>/data) so completed analyses survive restarts
+    # and mapper changes are re-derived without re-analyzing audio
+    analysis_store_enabled: bool = True
+    data_dir: str = ""
+
+    # Track similarity (GET /api/similar/{video_id}): exact cosine scan, or
+    # (approximate) only the similarity_probe_lists nearest of ~sqrt(n) k-means
+    # clusters once the library has similarity_ivf_min_tracks tracks; smaller
+    # libraries are always scanned exactly
+    similarity_approximate: bool = True
+    similarity_probe_lists: int = 8
+    similarity_ivf_min_tracks: int = 10000
+
+    # Per-job trace spans kept (GET /api/job/{id}/trace), how long a finished
+    # job keeps its span tree before only per-stage totals remain, and the
+    # sampling interval of the opt-in per-job profiler (AnalyzeRequest.profile)
+    trace_max_spans: int = 10000
+    trace_detail_ttl: float = 600.0
+    profile_interval: float = 0.005
+
+    # Coarse preview pass (seconds per preview segment). Streamed analyses
+    # send it once the first preview_stream_seconds are decoded (0 disables)
+    preview_resolution: float = 10.0
+    preview_stream_seconds: float = 30.0
+
     @property
     def allowed_origins_list(self) -> List[str]:
         """Parse comma-separated origins into a list."""
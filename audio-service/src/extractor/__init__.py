@@ -1,9 +1,31 @@
-from .youtube import YouTubeExtractor, ExtractionResult, VideoInfo, ExtractionError, extractor
+from .base import (
+    ExtractorBackend,
+    ExtractionResult,
+    StreamSource,
+    VideoInfo,
+    ExtractionError,
+    VideoRejectedError,
+    VIDEO_ID_PATTERN,
+)
+from .youtube import YouTubeExtractor, extractor
+from .local import LocalDirectoryBackend
+from .http_media import HTTPMediaBackend
+from .backends import create_backend, backend
+from .decoder import StreamDecoder
 
 __all__ = [
+    'ExtractorBackend',
     'YouTubeExtractor',
+    'LocalDirectoryBackend',
+    'HTTPMediaBackend',
     'ExtractionResult',
+    'StreamSource',
     'VideoInfo',
     'ExtractionError',
-    'extractor'
+    'VideoRejectedError',
+    'VIDEO_ID_PATTERN',
+    'extractor',
+    'create_backend',
+    'backend',
+    'StreamDecoder',
 ]
@@ -0,0 +1,43 @@
+import logging
+from typing import Callable, Dict
+
+from src.config import settings
+from src.extractor.base import ExtractorBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _youtube() -> ExtractorBackend:
+    from src.extractor.youtube import extractor
+    return extractor
+
+
+def _local() -> ExtractorBackend:
+    from src.extractor.local import LocalDirectoryBackend
+    return LocalDirectoryBackend()
+
+
+def _http() -> ExtractorBackend:
+    from src.extractor.http_media import HTTPMediaBackend
+    return HTTPMediaBackend()
+
+
+BACKENDS: Dict[str, Callable[[], ExtractorBackend]] = {
+    'youtube': _youtube,
+    'local': _local,
+    'http': _http,
+}
+
+
+def create_backend(name: str) -> ExtractorBackend:
+    """Instantiate the extractor backend registered under `name`."""
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown extractor backend: {name!r} (choose from {', '.join(BACKENDS)})")
+    logger.info(f"Using extractor backend: {name}")
+    return factory()
+
+
+# Singleton instance
+backend = create_backend(settings.extractor_backend)
@@ -0,0 +1,115 @@
+import logging
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Video IDs name files and URL paths, so they are restricted to one safe segment
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+@dataclass
+class VideoInfo:
+    id: str
+    title: str
+    duration: int  # seconds
+    thumbnail_url: str
+    is_live: bool = False
+
+
+@dataclass
+class ExtractionResult:
+    audio_path: str
+    video_info: VideoInfo
+    truncated: bool = False  # only the first max_audio_duration seconds were fetched
+
+
+@dataclass
+class StreamSource:
+    url: str
+    headers: Dict[str, str]
+    video_info: VideoInfo
+    truncated: bool = False
+
+
+class ExtractionError(Exception):
+    """Custom exception for extraction errors."""
+    pass
+
+
+class VideoRejectedError(ExtractionError):
+    """Raised when a video is refused before any audio is fetched."""
+    pass
+
+
+class ExtractorBackend(ABC):
+    """
+    Source of audio for analysis jobs.
+
+    `extract_audio` is required; backends that can hand out a URL ffmpeg can
+    read progressively also implement `get_stream`, which enables pipelined
+    analysis. Unsupported operations raise ExtractionError, so callers fall
+    back the same way they do for a failed extraction.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def get_video_info(self, url: str, video_id: Optional[str] = None) -> VideoInfo:
+        """Get video information without fetching the audio."""
+
+    @abstractmethod
+    async def extract_audio(self, url: str, video_id: str) -> ExtractionResult:
+        """Fetch the audio to a local file."""
+
+    async def get_stream(self, url: str, video_id: str) -> StreamSource:
+        """Resolve a progressively decodable audio URL."""
+        raise ExtractionError(f"The {self.name} backend does not support streaming")
+
+    async def get_playlist_entries(self, url: str) -> List[VideoInfo]:
+        """Resolve every entry of a playlist."""
+        raise ExtractionError(f"The {self.name} backend does not support playlists")
+
+    def warm_up(self) -> None:
+        """Prepare the backend (blocking; run at startup)."""
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+    def cleanup(self, audio_path: str) -> None:
+        """Remove a file produced by extract_audio, if the backend owns it."""
+
+    @staticmethod
+    def check_video_id(video_id: str) -> None:
+        """
+        Reject video IDs that could escape the backend's directory or URL path.
+
+        Raises:
+            VideoRejectedError: If the ID is not a plain identifier
+        """
+        if not isinstance(video_id, str) or not VIDEO_ID_PATTERN.fullmatch(video_id):
+            raise VideoRejectedError(f"Invalid video ID: {video_id!r}")
+
+    @staticmethod
+    def is_truncated(video_info: VideoInfo) -> bool:
+        """Whether only the first max_audio_duration seconds of a video are analyzed."""
+        return video_info.duration > settings.max_audio_duration
+
+    def check_duration(self, video_info: VideoInfo) -> bool:
+        """
+        Apply the duration limit, returning whether the audio will be truncated.
+
+        Raises:
+            VideoRejectedError: If the video is too long and truncation is off
+        """
+        truncated = self.is_truncated(video_info)
+        if truncated and not settings.truncate_long_audio:
+            raise VideoRejectedError(
+                f"Video too long: {video_info.duration}s "
+                f"(max: {settings.max_audio_duration}s)"
+            )
+        return truncated
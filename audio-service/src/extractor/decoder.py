@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.extractor.base import ExtractionError
+
+logger = logging.getLogger(__name__)
+
+
+class StreamDecoder:
+    """
+    Decodes an audio stream to mono float32 PCM incrementally using ffmpeg.
+
+    The source is either ffmpeg's stdin ("pipe:0", fed with write()) or any
+    input ffmpeg can open itself, such as a media URL. Decoded samples are read
+    back in small blocks, so only a bounded amount of audio is buffered.
+    """
+
+    def __init__(
+        self,
+        source: str = "pipe:0",
+        sample_rate: int = None,
+        max_duration: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.source = source
+        self.sr = sample_rate or settings.sample_rate
+        self.max_duration = max_duration
+        self.headers = headers or {}
+        self.samples_decoded = 0
+        self._killed = False
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._input_open = source == "pipe:0"
+
+    async def start(self) -> None:
+        """Spawn the ffmpeg process."""
+        args = ['ffmpeg', '-hide_banner', '-loglevel', 'error']
+        if not self._input_open:
+            args.append('-nostdin')
+        if self.headers:
+            args += ['-headers', ''.join(f"{k}: {v}\r\n" for k, v in self.headers.items())]
+        args += ['-i', self.source, '-vn', '-ac', '1', '-ar', str(self.sr)]
+        if self.max_duration:
+            args += ['-t', str(self.max_duration)]
+        args += ['-f', 'f32le', 'pipe:1']
+
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE if self._input_open else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise ExtractionError("ffmpeg is not installed")
+
+    async def write(self, data: bytes) -> None:
+        """Feed encoded bytes to the decoder, waiting while its pipe is full."""
+        if not self._input_open or not data:
+            return
+        try:
+            self._proc.stdin.write(data)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg stopped reading (duration cap reached or bad input)
+            self._input_open = False
+
+    async def close_input(self) -> None:
+        """Signal end of input."""
+        if not self._input_open:
+            return
+        self._input_open = False
+        try:
+            self._proc.stdin.close()
+            await self._proc.stdin.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    async def blocks(self, block_duration: float = 0.5) -> AsyncIterator[np.ndarray]:
+        """Yield decoded PCM blocks as they become available."""
+        block_bytes = int(self.sr * block_duration) * 4
+
+        while True:
+            try:
+                data = await self._proc.stdout.readexactly(block_bytes)
+            except asyncio.IncompleteReadError as e:
+                data = e.partial[:len(e.partial) - len(e.partial) % 4]
+                if data:
+                    self.samples_decoded += len(data) // 4
+                    yield np.frombuffer(data, dtype='<f4')
+                break
+
+            self.samples_decoded += block_bytes // 4
+            yield np.frombuffer(data, dtype='<f4')
+
+        await self.wait()
+
+    async def wait(self) -> None:
+        """
+        Wait for ffmpeg to exit (after EOF or close()), raising if it failed.
+
+        A nonzero exit is only expected when close() killed ffmpeg or the
+        duration cap was reached; otherwise the audio decoded so far is not the
+        whole track, so it must not be stored as one.
+        """
+        # Discard any output left unread so the pipes are released
+        await self._proc.stdout.read()
+        stderr = await self._proc.stderr.read()
+        returncode = await self._proc.wait()
+        if returncode != 0 and not (self._killed or self.capped):
+            message = stderr.decode(errors='replace').strip().splitlines()
+            raise ExtractionError(f"Failed to decode audio: {message[-1] if message else returncode}")
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio decoded so far."""
+        return self.samples_decoded / self.sr
+
+    @property
+    def capped(self) -> bool:
+        """Whether decoding stopped at max_duration."""
+        return bool(self.max_duration) and self.samples_decoded >= int(self.max_duration * self.sr)
+
+    def close(self) -> None:
+        """Kill the ffmpeg process if it is still running."""
+        if self._input_open and self._proc:
+            self._input_open = False
+            self._proc.stdin.close()
+        if self._proc and self._proc.returncode is None:
+            try:
+                self._proc.kill()
+                self._killed = True
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,154 @@
+"""
+Local HTTP stand-in for a media host, serving fixture audio files.
+
+Responses are delayed by a fixed latency and throttled to a bandwidth, so
+the extract -> analyze -> emit pipeline can be benchmarked and load-tested
+offline under realistic network conditions. Pair with the "http" extractor
+backend (settings.media_server_url).
+
+Endpoints:
+    GET /info/<video_id>   JSON metadata: id, title, duration, ext
+    GET /media/<video_id>  The audio bytes (supports "Range: bytes=N-")
+
+Usage:
+    python -m src.extractor.fixture_server --dir fixtures/ --latency 0.2 --bandwidth 500000
+"""
+import argparse
+import functools
+import json
+import logging
+import mimetypes
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import librosa
+
+from src.extractor.local import find_media_file
+
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-')
+
+
+@functools.lru_cache(maxsize=None)
+def media_duration(path: str) -> float:
+    return librosa.get_duration(path=path)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server instance."""
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in ('info', 'media'):
+            self.send_error(404)
+            return
+
+        path = find_media_file(self.server.media_dir, parts[1])
+        if path is None:
+            self.send_error(404, "Video unavailable")
+            return
+
+        if parts[0] == 'info':
+            self._send_info(parts[1], path)
+        else:
+            self._send_media(path)
+
+    def _send_info(self, video_id: str, path: str):
+        body = json.dumps({
+            'id': video_id,
+            'title': os.path.splitext(os.path.basename(path))[0],
+            'duration': media_duration(path),
+            'ext': os.path.splitext(path)[1],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_media(self, path: str):
+        size = os.path.getsize(path)
+        start = 0
+        match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+        if match and int(match.group(1)) < size:
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(size - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        chunk_size = self.server.chunk_size
+        bandwidth = self.server.bandwidth
+        started = time.monotonic()
+        sent = 0
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    self.wfile.write(data)
+                    sent += len(data)
+                    if bandwidth:
+                        # Sleep until the average rate is back under the limit
+                        ahead = sent / bandwidth - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading (e.g. a duration-capped decoder)
+            pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        media_dir: str,
+        latency: float = 0.0,
+        bandwidth: int = 0,
+        chunk_size: int = 16 * 1024,
+    ):
+        super().__init__(address, FixtureHandler)
+        self.media_dir = media_dir
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes per second, 0 = unlimited
+        self.chunk_size = chunk_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fixture audio with simulated latency and bandwidth")
+    parser.add_argument('--dir', required=True, help="Directory of <video_id>.<ext> audio files")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument('--bandwidth', type=int, default=0, help="Bytes per second per request (0 = unlimited)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FixtureServer((args.host, args.port), args.dir, args.latency, args.bandwidth)
+    logger.info(f"Serving {args.dir} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
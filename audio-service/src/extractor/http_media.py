@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from src.config import settings
+from src.extractor.base import (
+    ExtractionError,
+    ExtractionResult,
+    ExtractorBackend,
+    StreamSource,
+    VideoInfo,
+    VideoRejectedError,
+)
+from src.utils.metrics import EXTRACTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# When a video is longer than the duration cap, only the share of its bytes
+# covering the cap (plus headroom for headers and bitrate variation) is
+# downloaded. Containers that may keep their index at the end of the file
+# are always downloaded whole.
+TRUNCATION_HEADROOM = 1.1
+TRUNCATION_SLACK_BYTES = 256 * 1024
+WHOLE_FILE_EXTENSIONS = ('.m4a', '.mp4', '.mov')
+
+
+class HTTPMediaBackend(ExtractorBackend):
+    """
+    Fetches audio from a plain HTTP media host, such as the fixture server
+    (src.extractor.fixture_server), using its /info and /media endpoints.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: Optional[str] = None, output_dir: Optional[str] = None, timeout: float = 30.0):
+        self.base_url = (base_url or settings.media_server_url).rstrip('/')
+        self.output_dir = output_dir or settings.temp_dir
+        self.timeout = timeout
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _media_url(self, video_id: str) -> str:
+        return f"{self.base_url}/media/{video_id}"
+
+    def _fetch_info(self, video_id: str) -> dict:
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/info/{video_id}", timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise VideoRejectedError(f"Video unavailable: {video_id}")
+            raise ExtractionError(f"Failed to fetch video info: {str(e)}")
+        except OSError as e:
+            raise ExtractionError(f"Failed to fetch video info: {str(e)}")
+
+    async def _info(self, video_id: str) -> dict:
+        self.check_video_id(video_id)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._fetch_info, video_id)
+
+    @staticmethod
+    def _video_info(info: dict) -> VideoInfo:
+        return VideoInfo(
+            id=info['id'],
+            title=info.get('title', 'Unknown'),
+            duration=int(round(info.get('duration') or 0)),
+            thumbnail_url=info.get('thumbnail_url', ''),
+        )
+
+    async def get_video_info(self, url: str, video_id: Optional[str] = None) -> VideoInfo:
+        return self._video_info(await self._info(video_id))
+
+    async def extract_audio(self, url: str, video_id: str) -> ExtractionResult:
+        info = await self._info(video_id)
+        video_info = self._video_info(info)
+        truncated = self.check_duration(video_info)
+        final_path = os.path.join(self.output_dir, f"{video_id}{info.get('ext', '')}")
+
+        def _download():
+            with EXTRACTION_SECONDS.time(stage="download"), urllib.request.urlopen(self._media_url(video_id), timeout=self.timeout) as response, \
+                    open(final_path, 'wb') as f:
+                limit = self._byte_limit(info, response.headers.get('Content-Length')) if truncated else None
+                if limit is None:
+                    shutil.copyfileobj(response, f, 64 * 1024)
+                    return
+                while limit > 0:
+                    block = response.read(min(64 * 1024, limit))
+                    if not block:
+                        break
+                    f.write(block)
+                    limit -= len(block)
+
+        logger.info(f"Downloading {self._media_url(video_id)}")
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, _download)
+        except OSError as e:
+            self.cleanup(final_path)
+            raise ExtractionError(f"Failed to download audio: {str(e)}")
+
+        return ExtractionResult(audio_path=final_path, video_info=video_info, truncated=truncated)
+
+    @staticmethod
+    def _byte_limit(info: dict, content_length: Optional[str]) -> Optional[int]:
+        """Bytes to download to cover max_audio_duration, or None for the whole file."""
+        duration = info.get('duration') or 0
+        if not content_length or not duration or info.get('ext', '').lower() in WHOLE_FILE_EXTENSIONS:
+            return None
+        share = settings.max_audio_duration / duration * TRUNCATION_HEADROOM
+        return int(int(content_length) * min(share, 1.0)) + TRUNCATION_SLACK_BYTES
+
+    async def get_stream(self, url: str, video_id: str) -> StreamSource:
+        video_info = self._video_info(await self._info(video_id))
+        return StreamSource(
+            url=self._media_url(video_id),
+            headers={},
+            video_info=video_info,
+            truncated=self.check_duration(video_info),
+        )
+
+    def cleanup(self, audio_path: str) -> None:
+        """Remove a downloaded audio file."""
+        try:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+        except OSError as e:
+            logger.warning(f"Cleanup failed for {audio_path}: {e}")
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from src.config import settings
+from src.extractor.base import (
+    ExtractionError,
+    ExtractionResult,
+    ExtractorBackend,
+    StreamSource,
+    VideoInfo,
+    VideoRejectedError,
+)
+from src.utils.lazy import LazyModule
+
+librosa = LazyModule('librosa')
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.webm', '.opus')
+
+
+def find_media_file(media_dir: str, video_id: str) -> Optional[str]:
+    """Return the audio file named after `video_id` in `media_dir`, if any."""
+    for ext in AUDIO_EXTENSIONS:
+        path = os.path.join(media_dir, f"{video_id}{ext}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class LocalDirectoryBackend(ExtractorBackend):
+    """
+    Serves audio from a local directory instead of YouTube.
+
+    A video ID maps to `<media_dir>/<video_id>.<ext>`, so the full pipeline
+    can be exercised offline with fixture files. Files are analyzed in place
+    and never deleted.
+    """
+
+    name = "local"
+
+    def __init__(self, media_dir: Optional[str] = None):
+        self.media_dir = media_dir or settings.media_dir
+        if not self.media_dir or not os.path.isdir(self.media_dir):
+            raise ValueError(f"Media directory not found: {self.media_dir!r}")
+
+    def _path(self, video_id: str) -> str:
+        self.check_video_id(video_id)
+        path = find_media_file(self.media_dir, video_id)
+        if path is None:
+            raise VideoRejectedError(f"Video unavailable: no media file for {video_id}")
+        return path
+
+    async def get_video_info(self, url: str, video_id: Optional[str] = None) -> VideoInfo:
+        path = self._path(video_id)
+        loop = asyncio.get_event_loop()
+        try:
+            duration = await loop.run_in_executor(None, lambda: librosa.get_duration(path=path))
+        except Exception as e:
+            raise ExtractionError(f"Failed to read {path}: {str(e)}")
+
+        return VideoInfo(
+            id=video_id,
+            title=os.path.splitext(os.path.basename(path))[0],
+            duration=int(round(duration)),
+            thumbnail_url='',
+        )
+
+    async def extract_audio(self, url: str, video_id: str) -> ExtractionResult:
+        video_info = await self.get_video_info(url, video_id)
+        return ExtractionResult(
+            audio_path=self._path(video_id),
+            video_info=video_info,
+            truncated=self.check_duration(video_info),
+        )
+
+    async def get_stream(self, url: str, video_id: str) -> StreamSource:
+        video_info = await self.get_video_info(url, video_id)
+        return StreamSource(
+            url=self._path(video_id),
+            headers={},
+            video_info=video_info,
+            truncated=self.check_duration(video_info),
+        )
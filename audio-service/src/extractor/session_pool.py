@@ -0,0 +1,75 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from src.utils.lazy import LazyModule
+
+yt_dlp = LazyModule('yt_dlp')
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, bool]
+
+
+class YoutubeDLPool:
+    """
+    Pool of warm yt_dlp.YoutubeDL sessions, keyed by (kind, use_cookies).
+
+    A YoutubeDL instance is expensive to build (option parsing, extractor and
+    cookie jar setup) and keeps useful state between calls, such as solved
+    player JS. Sessions are not thread-safe, so each one is checked out by a
+    single executor thread at a time and returned afterwards.
+    """
+
+    def __init__(self, opts_factory: Callable[[str, bool], dict], size: int = 2):
+        self._opts_factory = opts_factory
+        self.size = size
+        self._idle: Dict[SessionKey, queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key: SessionKey) -> queue.LifoQueue:
+        with self._lock:
+            return self._idle.setdefault(key, queue.LifoQueue())
+
+    def _create(self, key: SessionKey) -> 'yt_dlp.YoutubeDL':
+        kind, use_cookies = key
+        logger.info(f"Creating yt-dlp session: {kind} (cookies={use_cookies})")
+        return yt_dlp.YoutubeDL(self._opts_factory(kind, use_cookies))
+
+    @contextmanager
+    def session(self, kind: str, use_cookies: bool = True) -> Iterator['yt_dlp.YoutubeDL']:
+        """Check out a session, creating one if none is idle."""
+        key = (kind, use_cookies)
+        idle = self._queue(key)
+        try:
+            ydl = idle.get_nowait()
+        except queue.Empty:
+            ydl = self._create(key)
+
+        try:
+            yield ydl
+        finally:
+            if idle.qsize() < self.size:
+                idle.put(ydl)
+            else:
+                ydl.close()
+
+    def warm(self, kind: str, use_cookies: bool = True) -> None:
+        """Pre-create one idle session of the given kind."""
+        idle = self._queue((kind, use_cookies))
+        if idle.qsize() < self.size:
+            idle.put(self._create((kind, use_cookies)))
+
+    def close(self) -> None:
+        """Close every idle session."""
+        with self._lock:
+            queues = list(self._idle.values())
+            self._idle = {}
+        for idle in queues:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
@@ -1,19 +1,46 @@
 import os
 import asyncio
+import functools
 import logging
 import shutil
 import subprocess
-from typing import Optional
-from dataclasses import dataclass
-import yt_dlp
+import threading
+import time
+from typing import Callable, List, Optional, Tuple, TypeVar
 
 from src.config import settings
+from src.extractor.base import (
+    ExtractionError,
+    ExtractionResult,
+    ExtractorBackend,
+    StreamSource,
+    VideoInfo,
+    VideoRejectedError,
+)
+from src.extractor.session_pool import YoutubeDLPool
+from src.utils.cache import TTLCache
+from src.utils.lazy import LazyModule
+from src.utils.metrics import EXTRACTION_SECONDS
+
+yt_dlp = LazyModule('yt_dlp')
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
 
+# When the current thread's download finished, so extraction time can be
+# split into download and transcode (the FFmpegExtractAudio postprocessor)
+_download_marks = threading.local()
+
+
+def _mark_download_finished(progress: dict) -> None:
+    if progress.get('status') == 'finished':
+        _download_marks.finished = time.perf_counter()
+
+
+@functools.lru_cache(maxsize=None)
 def find_node_path() -> str | None:
-    """Find the Node.js binary path."""
+    """Find the Node.js binary path (resolved once per process)."""
     # Check common locations
     common_paths = [
         '/usr/bin/node',
@@ -46,27 +73,95 @@ def find_node_path() -> str | None:
     return None
 
 
-@dataclass
-class VideoInfo:
-    id: str
-    title: str
-    duration: int  # seconds
-    thumbnail_url: str
+# yt-dlp error fragments meaning the video itself cannot be analyzed
+UNAVAILABLE_MARKERS = (
+    'unavailable', 'private video', 'removed', 'not available',
+    'members-only', 'live event will begin', 'premieres in',
+)
+
+
+def _video_info_from(info: dict, video_id: str = '') -> VideoInfo:
+    return VideoInfo(
+        id=info.get('id', video_id),
+        title=info.get('title', 'Unknown'),
+        duration=info.get('duration') or 0,
+        thumbnail_url=info.get('thumbnail', ''),
+        is_live=bool(info.get('is_live')) or info.get('live_status') in ('is_live', 'is_upcoming'),
+    )
+
 
+def _stream_source_from(info: dict, video_info: VideoInfo, cookiejar=None) -> Optional[StreamSource]:
+    """
+    Pick the selected format's direct URL and request headers, if any.
 
-@dataclass
-class ExtractionResult:
-    audio_path: str
-    video_info: VideoInfo
+    The Cookie header is built from the session's cookie jar for that URL:
+    yt-dlp's `cookies` field is Set-Cookie style (with Domain=/Path=
+    attributes) and cannot be sent as is.
+    """
+    fmt = info if info.get('url') else (info.get('requested_formats') or [{}])[0]
+    if not fmt.get('url'):
+        return None
+
+    headers = dict(fmt.get('http_headers') or info.get('http_headers') or {})
+    headers.pop('Cookie', None)
+    cookie_header = cookiejar.get_cookie_header(fmt['url']) if cookiejar is not None else None
+    if cookie_header:
+        headers['Cookie'] = cookie_header
 
+    return StreamSource(url=fmt['url'], headers=headers, video_info=video_info)
 
-class YouTubeExtractor:
+
+class YouTubeExtractor(ExtractorBackend):
     """Extracts audio from YouTube videos using yt-dlp."""
 
+    name = "youtube"
+
     def __init__(self, output_dir: Optional[str] = None):
         self.output_dir = output_dir or settings.temp_dir
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # Persistent yt-dlp cache, so downloaded EJS solver components and
+        # preprocessed player JS are reused across sessions and restarts
+        self.cache_dir = settings.ytdlp_cache_dir or os.path.join(self.output_dir, '.yt-dlp-cache')
+
+        self._cookies_file: Optional[str] = None
+        self._cookies_resolved = False
+        self._sessions = YoutubeDLPool(self._get_session_opts, size=settings.ytdlp_pool_size)
+
+        # Probe results (metadata + stream URL) shared by preflight, repeat
+        # requests and the analysis pipeline
+        self._metadata_cache: TTLCache[Tuple[VideoInfo, Optional[StreamSource]]] = TTLCache(
+            ttl=settings.metadata_cache_ttl
+        )
+
+    def warm_up(self) -> None:
+        """Resolve configuration and pre-create sessions (blocking; run at startup)."""
+        find_node_path()
+        self._get_cookies_file()
+        for kind in ('stream', 'download'):
+            self._sessions.warm(kind, use_cookies=True)
+        logger.info("yt-dlp sessions warmed up")
+
+    def close(self) -> None:
+        """Close pooled yt-dlp sessions."""
+        self._sessions.close()
+
+    def _get_session_opts(self, kind: str, use_cookies: bool) -> dict:
+        """Options for each kind of pooled session."""
+        if kind == 'download':
+            # outtmpl is set per download on the checked-out session
+            opts = self._get_ydl_opts(os.path.join(self.output_dir, '%(id)s'), use_cookies=use_cookies)
+            opts['progress_hooks'] = [_mark_download_finished]
+            return opts
+        if kind == 'stream':
+            opts = self._get_base_opts(use_cookies=use_cookies)
+            opts['format'] = 'ba/b/worst'
+            return opts
+        # playlist
+        opts = self._get_info_opts(use_cookies=use_cookies)
+        opts['extract_flat'] = 'in_playlist'
+        return opts
+
     def _get_base_opts(self, use_cookies: bool = True) -> dict:
         """Get base yt-dlp options.
 
@@ -81,6 +176,7 @@ class YouTubeExtractor:
             # This is required to solve YouTube's JavaScript challenges
             # Format is a LIST (default=[])
             'remote_components': ['ejs:github'],
+            'cachedir': self.cache_dir,
         }
 
         # Explicitly tell yt-dlp where Node.js is located
@@ -126,7 +222,13 @@ class YouTubeExtractor:
         return opts
 
     def _get_cookies_file(self) -> str | None:
-        """Get cookies file path, creating from env var if needed."""
+        """Get cookies file path, creating from env var on first use."""
+        if not self._cookies_resolved:
+            self._cookies_file = self._resolve_cookies_file()
+            self._cookies_resolved = True
+        return self._cookies_file
+
+    def _resolve_cookies_file(self) -> str | None:
         # Option 1: Direct file path
         cookies_file = os.environ.get('YOUTUBE_COOKIES_FILE')
         if cookies_file and os.path.exists(cookies_file):
@@ -168,28 +270,121 @@ class YouTubeExtractor:
         })
         return opts
 
-    def _get_info_opts(self) -> dict:
+    def _get_info_opts(self, use_cookies: bool = True) -> dict:
         """Get yt-dlp options for info extraction only."""
-        opts = self._get_base_opts()
+        opts = self._get_base_opts(use_cookies=use_cookies)
         opts.update({
             'extract_flat': True,
         })
         return opts
 
-    async def get_video_info(self, url: str) -> VideoInfo:
+    async def _probe(self, url: str, video_id: Optional[str] = None) -> Tuple[VideoInfo, Optional[StreamSource]]:
+        """Resolve metadata and the best audio stream URL in one request (TTL-cached)."""
+        key = video_id or url
+        cached = self._metadata_cache.get(key)
+        if cached:
+            return cached
+
+        def _extract(use_cookies: bool = True):
+            with self._sessions.session('stream', use_cookies) as ydl:
+                info = ydl.extract_info(url, download=False)
+                video_info = _video_info_from(info, video_id or '')
+                return video_info, _stream_source_from(info, video_info, ydl.cookiejar)
+
+        result = await self._run_with_client_fallback(_extract)
+        self._metadata_cache.set(key, result)
+        return result
+
+    async def get_video_info(self, url: str, video_id: Optional[str] = None) -> VideoInfo:
         """Get video information without downloading."""
-        def _extract_info():
-            with yt_dlp.YoutubeDL(self._get_info_opts()) as ydl:
+        video_info, _ = await self._probe(url, video_id)
+        return video_info
+
+    async def preflight(self, url: str, video_id: str) -> VideoInfo:
+        """
+        Check a video can be analyzed before fetching any audio.
+
+        Raises:
+            VideoRejectedError: If the video is unavailable, live or too long
+            ExtractionError: If the metadata could not be fetched
+        """
+        try:
+            video_info = await self.get_video_info(url, video_id)
+        except yt_dlp.DownloadError as e:
+            error_msg = str(e).lower()
+            if any(marker in error_msg for marker in UNAVAILABLE_MARKERS):
+                raise VideoRejectedError(f"Video unavailable: {str(e)}")
+            raise ExtractionError(f"Failed to fetch video info: {str(e)}")
+
+        if video_info.is_live:
+            raise VideoRejectedError("Live streams cannot be analyzed")
+
+        self.check_duration(video_info)
+        return video_info
+
+    async def get_playlist_entries(self, url: str) -> List[VideoInfo]:
+        """Resolve every entry of a playlist in a single flat extraction pass."""
+        def _extract_entries():
+            with self._sessions.session('playlist') as ydl:
                 info = ydl.extract_info(url, download=False)
-                return VideoInfo(
-                    id=info.get('id', ''),
-                    title=info.get('title', 'Unknown'),
-                    duration=info.get('duration', 0),
-                    thumbnail_url=info.get('thumbnail', '')
-                )
+                entries = info.get('entries') or [info]
+                return [
+                    VideoInfo(
+                        id=entry.get('id', ''),
+                        title=entry.get('title') or 'Unknown',
+                        duration=int(entry.get('duration') or 0),
+                        thumbnail_url=entry.get('thumbnail') or ''
+                    )
+                    for entry in entries
+                    if entry and entry.get('id')
+                ]
 
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _extract_info)
+        return await loop.run_in_executor(None, _extract_entries)
+
+    async def _run_with_client_fallback(self, func: Callable[[bool], T]) -> T:
+        """Run a blocking yt-dlp call in the executor, retrying without cookies on format errors."""
+        loop = asyncio.get_event_loop()
+
+        # Try WITH cookies first (tv/web clients + Node.js for JS challenges)
+        # Fall back to android_vr without cookies if that fails
+        try:
+            logger.info("Attempting extraction with cookies (tv/web clients)...")
+            return await loop.run_in_executor(None, lambda: func(True))
+        except yt_dlp.DownloadError as e:
+            error_msg = str(e).lower()
+            # If format/JS issue, try android_vr without cookies as last resort
+            if 'format' in error_msg or 'not available' in error_msg:
+                logger.warning("Format error, retrying with android_vr (no cookies)...")
+                return await loop.run_in_executor(None, lambda: func(False))
+            raise
+
+    async def get_stream(self, url: str, video_id: str) -> StreamSource:
+        """
+        Resolve a directly streamable audio URL without downloading anything.
+
+        The returned source can be decoded progressively (see StreamDecoder),
+        letting analysis start while the audio is still being fetched.
+
+        Long videos are not rejected when truncate_long_audio is set; the
+        decoder's max_duration then stops reading after the cap.
+
+        Raises:
+            ExtractionError: If no streamable format is available
+        """
+        logger.info(f"Resolving stream for video: {video_id}")
+        video_info = await self.preflight(url, video_id)
+
+        # Served from the metadata cache populated by preflight
+        _, source = await self._probe(url, video_id)
+        if source is None:
+            raise ExtractionError("No streamable audio format found")
+        return StreamSource(
+            url=source.url,
+            headers=source.headers,
+            video_info=source.video_info,
+            truncated=self.is_truncated(video_info),
+        )
 
     async def extract_audio(self, url: str, video_id: str) -> ExtractionResult:
         """
@@ -199,55 +394,52 @@ class YouTubeExtractor:
             url: YouTube video URL
             video_id: Video ID for naming the output file
 
+        Videos longer than max_audio_duration are either rejected up front
+        or, with truncate_long_audio, downloaded only up to the cap.
+
         Returns:
             ExtractionResult with audio path and video info
 
         Raises:
             ExtractionError: If extraction fails
         """
+        self.check_video_id(video_id)
         output_template = os.path.join(self.output_dir, f"{video_id}")
         final_path = f"{output_template}.mp3"
 
         def _download(use_cookies: bool = True):
-            opts = self._get_ydl_opts(output_template, use_cookies=use_cookies)
-
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-
-                return VideoInfo(
-                    id=info.get('id', video_id),
-                    title=info.get('title', 'Unknown'),
-                    duration=info.get('duration', 0),
-                    thumbnail_url=info.get('thumbnail', '')
+            with self._sessions.session('download', use_cookies) as ydl:
+                ydl.params['outtmpl']['default'] = output_template
+                # Only fetch the part of a long video that will be analyzed
+                ydl.params['download_ranges'] = (
+                    yt_dlp.utils.download_range_func(None, [(0, settings.max_audio_duration)])
+                    if truncated else None
                 )
+                _download_marks.finished = None
+                started = time.perf_counter()
+                info = ydl.extract_info(url, download=True)
+                ended = time.perf_counter()
+                downloaded = _download_marks.finished or ended
+                EXTRACTION_SECONDS.observe(downloaded - started, stage="download")
+                EXTRACTION_SECONDS.observe(ended - downloaded, stage="transcode")
+                return _video_info_from(info, video_id)
 
         try:
-            logger.info(f"Starting extraction for video: {video_id}")
+            # Reject unusable videos before spending bandwidth on them
+            truncated = self.is_truncated(await self.preflight(url, video_id))
 
-            loop = asyncio.get_event_loop()
+            logger.info(f"Starting extraction for video: {video_id}")
 
-            # Try WITH cookies first (tv/web clients + Node.js for JS challenges)
-            # Fall back to android_vr without cookies if that fails
-            try:
-                logger.info("Attempting download with cookies (tv/web clients)...")
-                video_info = await loop.run_in_executor(None, lambda: _download(use_cookies=True))
-            except yt_dlp.DownloadError as e:
-                error_msg = str(e).lower()
-                # If format/JS issue, try android_vr without cookies as last resort
-                if 'format' in error_msg or 'not available' in error_msg:
-                    logger.warning("Format error, retrying with android_vr (no cookies)...")
-                    video_info = await loop.run_in_executor(None, lambda: _download(use_cookies=False))
-                else:
-                    raise
+            video_info = await self._run_with_client_fallback(_download)
 
             # Verify file exists
             if not os.path.exists(final_path):
                 raise ExtractionError(f"Audio file not created: {final_path}")
 
             # Check duration limit
-            if video_info.duration > settings.max_audio_duration:
+            if self.is_truncated(video_info) and not truncated:
                 os.remove(final_path)
-                raise ExtractionError(
+                raise VideoRejectedError(
                     f"Video too long: {video_info.duration}s "
                     f"(max: {settings.max_audio_duration}s)"
                 )
@@ -256,7 +448,8 @@ class YouTubeExtractor:
 
             return ExtractionResult(
                 audio_path=final_path,
-                video_info=video_info
+                video_info=video_info,
+                truncated=truncated,
             )
 
         except yt_dlp.DownloadError as e:
@@ -278,10 +471,5 @@ class YouTubeExtractor:
             logger.warning(f"Cleanup failed for {audio_path}: {e}")
 
 
-class ExtractionError(Exception):
-    """Custom exception for extraction errors."""
-    pass
-
-
 # Singleton instance
 extractor = YouTubeExtractor()
@@ -1,16 +1,32 @@
 import os
+import time
+import asyncio
+import logging
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 from dotenv import load_dotenv
 
-from src.api.routes import router
+from src.analyzer import processor
+from src.api.routes import router, jobs
 from src.config import settings
-from src.websocket.server import sio
+from src.extractor import backend
+from src.websocket.server import sio, flow
 from src.middleware.rate_limit import rate_limit_middleware
+from src.analyzer import fingerprint_index, similarity_index
+from src.storage import analysis_store, segment_store
+from src.utils.metrics import Gauge, registry
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# librosa (and with it numba) is imported lazily, so this still applies
+os.environ.setdefault(
+    'NUMBA_CACHE_DIR', settings.numba_cache_dir or os.path.join(settings.temp_dir, '.numba-cache')
+)
+
 # Create FastAPI app
 app = FastAPI(
     title="Neuro-Acoustic Audio Service",
@@ -36,10 +52,129 @@ app.include_router(router, prefix="/api")
 # Mount Socket.IO
 socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 
+
+async def warm_up_extractor():
+    """Prepare the extractor backend (e.g. open yt-dlp sessions) once, up front."""
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, backend.warm_up)
+    except Exception as e:
+        logger.warning(f"Extractor warm-up failed: {e}")
+
+
+async def warm_up_analyzer():
+    """Import the audio stack and compile its JIT kernels before the first job."""
+    loop = asyncio.get_event_loop()
+    started = time.perf_counter()
+    try:
+        await loop.run_in_executor(None, processor.warm_up)
+        logger.info(f"Analyzer warmed up in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.warning(f"Analyzer warm-up failed: {e}")
+
+
+async def load_library():
+    """Bring stored analyses up to the current mapper version (features are reused), then load the search and deduplication indexes."""
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, analysis_store.rederive_stale)
+    except Exception as e:
+        logger.warning(f"Re-deriving stored analyses failed: {e}")
+    try:
+        await loop.run_in_executor(None, lambda: similarity_index.load(analysis_store.embeddings()))
+        await loop.run_in_executor(None, lambda: segment_store.load(analysis_store.segment_columns()))
+        await loop.run_in_executor(None, lambda: fingerprint_index.load(analysis_store.fingerprints()))
+    except Exception as e:
+        logger.warning(f"Loading the search indexes failed: {e}")
+
+
+async def warm_up():
+    tasks = [warm_up_extractor()]
+    if settings.warm_up_analysis:
+        tasks.append(warm_up_analyzer())
+    if analysis_store is not None:
+        tasks.append(load_library())
+    await asyncio.gather(*tasks)
+    app.state.ready = True
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Warm up in the background: /health answers right away, /ready once done
+    app.state.ready = False
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def close_extractor():
+    backend.close()
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "audio-service"}
 
+@app.get("/ready")
+async def readiness_check():
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+def _count_jobs(*statuses: str) -> int:
+    return sum(1 for job in list(jobs.values()) if job.get("status") in statuses)
+
+
+# Walking temp_dir is slow on a busy worker: it is done in the executor at
+# most once per interval, and scrapes in between report the last total
+TEMP_DIR_SAMPLE_SECONDS = 15.0
+_temp_dir_sampled_at = 0.0
+
+
+def _temp_dir_bytes() -> int:
+    total = 0
+    for root, _, files in os.walk(settings.temp_dir):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # removed while walking
+    return total
+
+
+# Service state, sampled at scrape time
+registry.register(Gauge("audio_jobs_active", "Jobs extracting or analyzing",
+                        function=lambda: _count_jobs("extracting", "analyzing")))
+registry.register(Gauge("audio_jobs_queued", "Jobs accepted but not started",
+                        function=lambda: _count_jobs("pending")))
+registry.register(Gauge("audio_jobs_stored", "Entries in the in-memory jobs dict",
+                        function=lambda: len(jobs)))
+registry.register(Gauge("audio_similarity_tracks", "Tracks in the similarity index",
+                        function=lambda: len(similarity_index)))
+registry.register(Gauge("audio_segments_indexed", "Segments in the moment search store",
+                        function=lambda: len(segment_store)))
+registry.register(Gauge("socketio_connections", "Socket.IO clients connected to this worker",
+                        function=lambda: len(flow.clients)))
+TEMP_DIR_BYTES = registry.register(Gauge("audio_temp_dir_bytes", "Bytes used under the temp directory"))
+
+
+async def _sample_temp_dir() -> None:
+    global _temp_dir_sampled_at
+    now = time.monotonic()
+    if now - _temp_dir_sampled_at < TEMP_DIR_SAMPLE_SECONDS:
+        return
+    _temp_dir_sampled_at = now
+    loop = asyncio.get_event_loop()
+    TEMP_DIR_BYTES.set(await loop.run_in_executor(None, _temp_dir_bytes))
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    await _sample_temp_dir()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {"message": "Neuro-Acoustic Audio Service", "docs": "/docs"}
@@ -1,41 +1,250 @@
+"""
+Per-client rate limiting.
+
+Each client gets a sliding-window counter: the request cost spent in the
+current and the previous fixed one-minute window. The previous window counts
+in proportion to how much of it still overlaps the last 60 seconds, which
+approximates a true sliding window. Unlike a per-request timestamp log, a
+client's state is three numbers and each check does O(1) work.
+
+Client entries are LRU-evicted past `max_clients`, so memory stays fixed
+regardless of how many addresses have been seen. A client that gets evicted
+simply starts over with a fresh budget.
+
+Routes are charged by weight (ROUTE_COSTS). Starting an analysis costs a full
+request and polling a job costs a fraction, while health and readiness probes
+are exempt. With settings.rate_limit_shared enabled, the counters live in a
+shared-memory table so every worker on the host enforces the same budget.
+"""
+import fcntl
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterable, List, Optional, Tuple
+
 from fastapi import Request
 from fastapi.responses import JSONResponse
-import time
-from collections import defaultdict
-from typing import Dict, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 60.0
+
+# (method, path prefix, cost); the first match wins, unmatched requests cost 1
+ROUTE_COSTS: List[Tuple[str, str, float]] = [
+    ("POST", "/api/analyze/batch", 5.0),
+    ("POST", "/api/analyze", 1.0),
+    ("POST", "/api/upload", 1.0),
+    ("GET", "/api/job/", 0.1),
+    ("DELETE", "/api/job/", 0.1),
+]
+
+# (window index, cost spent in that window, cost spent in the window before)
+State = Tuple[int, float, float]
+
+
+class MemoryStore:
+    """Per-process counters in an LRU-bounded OrderedDict."""
+
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._data: "OrderedDict[str, State]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield
+
+    def get(self, key: str) -> Optional[State]:
+        state = self._data.get(key)
+        if state is not None:
+            self._data.move_to_end(key)
+        return state
+
+    def set(self, key: str, state: State) -> None:
+        self._data[key] = state
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_clients:
+            self._data.popitem(last=False)
+
+
+class SharedMemoryStore:
+    """
+    Counters in a fixed-size shared-memory hash table, shared by all workers.
+
+    Each slot holds (key hash, window, current, previous, last used). A key
+    is looked up in PROBE consecutive slots from its hash. When those are
+    all taken by other keys, the least recently used one is replaced. Access
+    is serialized across processes with an flock on a file next to the
+    segment. The segment is left in place when workers exit so restarted
+    workers keep the counters.
+    """
+
+    SLOT = struct.Struct('<Qqddd')
+    PROBE = 8
+
+    def __init__(self, name: str, max_clients: int, lock_dir: str):
+        self.slots = max_clients
+        size = self.SLOT.size * self.slots
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._shm.buf[:size] = bytes(size)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.size < size:
+                raise ValueError(f"Shared rate limit table {name} is smaller than {size} bytes")
+        # Outlive any one worker: the tracker would unlink the segment when
+        # the process that registered it exits
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        os.makedirs(lock_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(lock_dir, f"{name}.lock"), 'a+')
+        self._thread_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(1 for i in range(self.slots) if self._read(i)[0])
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _read(self, index: int) -> Tuple[int, int, float, float, float]:
+        return self.SLOT.unpack_from(self._shm.buf, index * self.SLOT.size)
+
+    def _write(self, index: int, key_hash: int, state: State) -> None:
+        self.SLOT.pack_into(self._shm.buf, index * self.SLOT.size, key_hash, *state, time.time())
+
+    def _probe(self, key_hash: int) -> Iterable[int]:
+        start = key_hash % self.slots
+        return ((start + i) % self.slots for i in range(min(self.PROBE, self.slots)))
+
+    def get(self, key: str) -> Optional[State]:
+        key_hash = self._hash(key)
+        for index in self._probe(key_hash):
+            slot_hash, window, current, previous, _ = self._read(index)
+            if slot_hash == key_hash:
+                return window, current, previous
+        return None
+
+    def set(self, key: str, state: State) -> None:
+        key_hash = self._hash(key)
+        victim, oldest = None, math.inf
+        for index in self._probe(key_hash):
+            slot_hash, _, _, _, last_used = self._read(index)
+            if slot_hash in (key_hash, 0):
+                victim = index
+                break
+            if last_used < oldest:
+                victim, oldest = index, last_used
+        self._write(victim, key_hash, state)
+
+    def close(self) -> None:
+        self._shm.close()
+        self._lock_file.close()
 
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 10):
+    def __init__(
+        self,
+        requests_per_minute: int = 10,
+        max_clients: int = 10000,
+        exempt_paths: Iterable[str] = (),
+        store=None,
+    ):
         self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, list] = defaultdict(list)
+        self.exempt_paths = frozenset(exempt_paths)
+        self.store = store if store is not None else MemoryStore(max_clients)
+
+    def cost(self, method: str, path: str) -> float:
+        """Budget a request consumes (0 for exempt paths)."""
+        if path in self.exempt_paths:
+            return 0.0
+        for route_method, prefix, cost in ROUTE_COSTS:
+            if method == route_method and path.startswith(prefix):
+                return cost
+        return 1.0
 
-    def is_allowed(self, client_ip: str) -> Tuple[bool, int]:
-        now = time.time()
-        minute_ago = now - 60
+    def is_allowed(self, client_ip: str, cost: float = 1.0, now: Optional[float] = None) -> Tuple[bool, int]:
+        """Charge `cost`; returns (True, remaining) or (False, retry-after seconds)."""
+        now = time.time() if now is None else now
+        window = int(now // WINDOW)
+        elapsed = (now % WINDOW) / WINDOW
+        limit = self.requests_per_minute
 
-        # Clean old requests
-        self.requests[client_ip] = [
-            t for t in self.requests[client_ip] if t > minute_ago
-        ]
+        with self.store.locked():
+            state = self.store.get(client_ip)
+            if state is None or state[0] < window - 1:
+                current, previous = 0.0, 0.0
+            elif state[0] == window - 1:
+                current, previous = 0.0, state[1]
+            else:
+                current, previous = state[1], state[2]
 
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            oldest = min(self.requests[client_ip])
-            retry_after = int(60 - (now - oldest))
-            return False, max(retry_after, 1)
+            used = previous * (1 - elapsed) + current
+            if used + cost > limit:
+                return False, self._retry_after(current, previous, elapsed, cost, limit)
 
-        self.requests[client_ip].append(now)
-        remaining = self.requests_per_minute - len(self.requests[client_ip])
-        return True, remaining
+            self.store.set(client_ip, (window, current + cost, previous))
+        return True, int(limit - used - cost)
 
+    @staticmethod
+    def _retry_after(current: float, previous: float, elapsed: float, cost: float, limit: float) -> int:
+        if previous > 0 and current + cost <= limit:
+            # Wait for enough of the previous window to slide out
+            fraction = 1 - (limit - current - cost) / previous
+            seconds = (fraction - elapsed) * WINDOW
+        else:
+            seconds = (1 - elapsed) * WINDOW
+        return max(math.ceil(round(seconds, 6)), 1)
 
-rate_limiter = RateLimiter(requests_per_minute=10)
+
+def create_rate_limiter() -> RateLimiter:
+    exempt = [p.strip() for p in settings.rate_limit_exempt_paths.split(",") if p.strip()]
+    store = None
+    if settings.rate_limit_shared:
+        store = SharedMemoryStore(
+            settings.rate_limit_shm_name, settings.rate_limit_max_clients, settings.temp_dir,
+        )
+        logger.info(f"Rate limit counters shared through {settings.rate_limit_shm_name}")
+    return RateLimiter(
+        requests_per_minute=settings.rate_limit_per_minute,
+        max_clients=settings.rate_limit_max_clients,
+        exempt_paths=exempt,
+        store=store,
+    )
+
+
+rate_limiter = create_rate_limiter()
 
 
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
+    cost = rate_limiter.cost(request.method, request.url.path)
+    if not cost:
+        return await call_next(request)
 
-    allowed, value = rate_limiter.is_allowed(client_ip)
+    client_ip = request.client.host if request.client else "unknown"
+    allowed, value = rate_limiter.is_allowed(client_ip, cost)
 
     if not allowed:
         return JSONResponse(
@@ -0,0 +1,9 @@
+from .analyses import AnalysisStore, StoredTrack, analysis_store, create_analysis_store
+from .segments import Condition, SegmentStore, columnize, parse_condition, segment_store
+from .export import EXPORT_FORMATS, export_lines, ndjson_chunks
+
+__all__ = [
+    'AnalysisStore', 'StoredTrack', 'analysis_store', 'create_analysis_store',
+    'Condition', 'SegmentStore', 'columnize', 'parse_condition', 'segment_store',
+    'EXPORT_FORMATS', 'export_lines', 'ndjson_chunks',
+]
@@ -0,0 +1,60 @@
+"""
+Analysis store maintenance:
+    python -m src.storage [rederive]        re-derive stale analyses
+    python -m src.storage export [options]  export the library as NDJSON
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+
+from src.analyzer import MAPPER_VERSION
+from src.storage import analysis_store
+from src.storage.export import EXPORT_FORMATS, export_lines, ndjson_chunks
+
+
+def rederive(args) -> int:
+    stale = analysis_store.stale()
+    print(f"{len(stale)} analyses older than mapper v{MAPPER_VERSION}")
+    print(f"Re-derived {analysis_store.rederive_stale()}")
+    return 0
+
+
+def export(args) -> int:
+    stale = len(analysis_store.stale())
+    if stale:
+        print(f"Skipping {stale} stale analyses (run `python -m src.storage` first)", file=sys.stderr)
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    pieces = export_lines(analysis_store, args.format, args.video_id, args.emotion, since)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in ndjson_chunks(pieces):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.storage", description="Analysis store maintenance")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("rederive", help="Re-derive analyses older than the current mapper version")
+    export_parser = commands.add_parser("export", help="Export stored analyses as NDJSON")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default="analyses",
+                               help="Whole analyses, or one flat row per segment")
+    export_parser.add_argument('--video-id', action='append', help="Only these tracks (repeatable)")
+    export_parser.add_argument('--emotion', help="Only tracks with this overall emotion")
+    export_parser.add_argument('--since', help="Only analyses derived since this ISO time")
+    export_parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    if analysis_store is None:
+        print("The analysis store is disabled (ANALYSIS_STORE_ENABLED=false)", file=sys.stderr)
+        return 1
+    return export(args) if args.command == "export" else rederive(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
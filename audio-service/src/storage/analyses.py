@@ -0,0 +1,393 @@
+"""
+Persistent two-tier store of analyses.
+
+Tier 1 is the raw per-chunk AudioFeatures table of each track, tagged with
+FEATURE_VERSION. It only changes when audio is analyzed again.
+
+Tier 2 is the derived analysis document (segments, summary), tagged with
+MAPPER_VERSION. Derived analyses are cheap to rebuild, so when the mappers
+change (MAPPER_VERSION bump), stale analyses are re-derived from the stored
+features, without touching audio. Tracks whose features were extracted under
+another FEATURE_VERSION cannot be re-derived and are analyzed again on request.
+
+Each analysis also has a similarity embedding (src.analyzer.similarity) and
+its segments in column form (src.storage.segments), rebuilt with it and loaded
+into the similarity index and segment store at startup. Acoustic
+fingerprints depend on the audio only; they are kept with the features and
+rebuild the deduplication index at startup.
+
+Stale analyses are re-derived at startup, or on demand:
+    python -m src.storage
+and the library is exported with `python -m src.storage export` (see export.py).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.analyzer import (
+    AudioFeatures,
+    EMBEDDING_VERSION,
+    FEATURE_VERSION,
+    FINGERPRINT_VERSION,
+    MAPPER_VERSION,
+    build_analysis,
+    derive_segments,
+    embed_track,
+)
+from src.config import settings
+from src.storage.segments import SEGMENT_COLUMNS, columnize
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = [f.name for f in fields(AudioFeatures)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    video_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    video TEXT NOT NULL,
+    truncated INTEGER NOT NULL,
+    chunk_duration REAL NOT NULL,
+    feature_version INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    features BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    video_id TEXT PRIMARY KEY,
+    mapper_version INTEGER NOT NULL,
+    analysis TEXT NOT NULL,
+    derived_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    video_id TEXT PRIMARY KEY,
+    mapper_version INTEGER NOT NULL,
+    embedding_version INTEGER NOT NULL,
+    embedding BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segment_columns (
+    video_id TEXT PRIMARY KEY,
+    mapper_version INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    segment_values BLOB NOT NULL,
+    emotions BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    video_id TEXT PRIMARY KEY,
+    fingerprint_version INTEGER NOT NULL,
+    fingerprint BLOB NOT NULL
+);
+"""
+
+
+@dataclass
+class StoredTrack:
+    video_id: str
+    job_id: str
+    video: Dict[str, Any]
+    truncated: bool
+    chunk_duration: float
+    features: List[AudioFeatures]
+
+
+def pack_features(features: List[AudioFeatures]) -> bytes:
+    matrix = np.array([[getattr(f, c) for c in FEATURE_COLUMNS] for f in features], dtype=np.float64)
+    return matrix.tobytes()
+
+
+def unpack_features(blob: bytes, columns: List[str]) -> List[AudioFeatures]:
+    matrix = np.frombuffer(blob, dtype=np.float64).reshape(-1, len(columns))
+    return [AudioFeatures(**dict(zip(columns, map(float, row)))) for row in matrix]
+
+
+class AnalysisStore:
+    """SQLite-backed feature tables and derived analyses, keyed by video ID."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def save(
+        self,
+        video_id: str,
+        analysis: Dict[str, Any],
+        features: List[AudioFeatures],
+        chunk_duration: float = 1.0,
+        embedding: Optional[np.ndarray] = None,
+        fingerprint: Optional[np.ndarray] = None,
+    ) -> Optional[np.ndarray]:
+        """Store a track's features (and fingerprint) and the analysis derived from them; returns its embedding."""
+        if embedding is None:
+            embedding = embed_track(features, analysis["segments"])
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        video_id, analysis["id"], json.dumps(analysis["video"]), int(analysis["truncated"]),
+                        chunk_duration, FEATURE_VERSION, json.dumps(FEATURE_COLUMNS),
+                        pack_features(features), now,
+                    ),
+                )
+                if fingerprint is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                        (video_id, FINGERPRINT_VERSION, fingerprint.astype(np.uint32).tobytes()),
+                    )
+                self._save_analysis(video_id, analysis, embedding, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return embedding
+
+    def _save_analysis(
+        self, video_id: str, analysis: Dict[str, Any], embedding: Optional[np.ndarray], now: float
+    ) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)",
+            (video_id, MAPPER_VERSION, json.dumps(analysis), now),
+        )
+        if embedding is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (video_id, MAPPER_VERSION, EMBEDDING_VERSION, embedding.astype(np.float32).tobytes()),
+            )
+        matrix, emotions = columnize(analysis["segments"])
+        self._conn.execute(
+            "INSERT OR REPLACE INTO segment_columns VALUES (?, ?, ?, ?, ?)",
+            (video_id, MAPPER_VERSION, json.dumps(SEGMENT_COLUMNS), matrix.tobytes(), emotions.tobytes()),
+        )
+
+    def load_track(self, video_id: str) -> Optional[StoredTrack]:
+        """Stored features of a track, if extracted under the current FEATURE_VERSION."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, video, truncated, chunk_duration, feature_version, columns, features "
+                "FROM tracks WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, video, truncated, chunk_duration, feature_version, columns, blob = row
+        columns = json.loads(columns)
+        if feature_version != FEATURE_VERSION or set(columns) != set(FEATURE_COLUMNS):
+            return None
+        return StoredTrack(
+            video_id=video_id,
+            job_id=job_id,
+            video=json.loads(video),
+            truncated=bool(truncated),
+            chunk_duration=chunk_duration,
+            features=unpack_features(blob, columns),
+        )
+
+    def get_analysis(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """The current analysis of a track, re-deriving it if the mappers changed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mapper_version, analysis FROM analyses WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if row is not None and row[0] == MAPPER_VERSION:
+            return json.loads(row[1])
+        return self.rederive(video_id)
+
+    def rederive(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Rebuild a track's analysis from its stored features with the current mappers."""
+        track = self.load_track(video_id)
+        if track is None:
+            return None
+        segments, aggregator = derive_segments(track.features, track.chunk_duration)
+        analysis = build_analysis(track.job_id, track.video, track.truncated, segments, aggregator.snapshot())
+        embedding = embed_track(track.features, segments)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._save_analysis(video_id, analysis, embedding, time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return analysis
+
+    def stale(self) -> List[str]:
+        """Tracks with current features whose analysis, embedding or segment columns are out of date."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.video_id FROM tracks t "
+                "LEFT JOIN analyses a ON a.video_id = t.video_id "
+                "LEFT JOIN embeddings e ON e.video_id = t.video_id "
+                "LEFT JOIN segment_columns s ON s.video_id = t.video_id "
+                "WHERE t.feature_version = ? AND (a.mapper_version IS NULL OR a.mapper_version != ? "
+                "OR e.mapper_version IS NULL OR e.mapper_version != ? OR e.embedding_version != ? "
+                "OR s.mapper_version IS NULL OR s.mapper_version != ? OR s.columns != ?)",
+                (
+                    FEATURE_VERSION, MAPPER_VERSION, MAPPER_VERSION, EMBEDDING_VERSION,
+                    MAPPER_VERSION, json.dumps(SEGMENT_COLUMNS),
+                ),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def rederive_stale(self) -> int:
+        """Re-derive every stale analysis; returns how many were rebuilt."""
+        started = time.perf_counter()
+        count = 0
+        for video_id in self.stale():
+            try:
+                if self.rederive(video_id) is not None:
+                    count += 1
+            except Exception as e:
+                logger.warning(f"Re-deriving {video_id} failed: {e}")
+        if count:
+            logger.info(
+                f"Re-derived {count} analyses (mapper v{MAPPER_VERSION}) "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        return count
+
+    def embeddings(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """(video ID, embedding) of every track with a current embedding."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, embedding FROM embeddings WHERE mapper_version = ? AND embedding_version = ?",
+                (MAPPER_VERSION, EMBEDDING_VERSION),
+            ).fetchall()
+        for video_id, blob in rows:
+            yield video_id, np.frombuffer(blob, dtype=np.float32)
+
+    def fingerprints(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """(video ID, fingerprint) of every track with a current fingerprint."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, fingerprint FROM fingerprints WHERE fingerprint_version = ?",
+                (FINGERPRINT_VERSION,),
+            ).fetchall()
+        for video_id, blob in rows:
+            yield video_id, np.frombuffer(blob, dtype=np.uint32)
+
+    def segment_columns(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """(video ID, segment column matrix, emotion codes) of every track, for the segment store."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, segment_values, emotions FROM segment_columns "
+                "WHERE mapper_version = ? AND columns = ?",
+                (MAPPER_VERSION, json.dumps(SEGMENT_COLUMNS)),
+            ).fetchall()
+        for video_id, values, emotions in rows:
+            matrix = np.frombuffer(values, dtype=np.float32).reshape(-1, len(SEGMENT_COLUMNS))
+            yield video_id, matrix, np.frombuffer(emotions, dtype=np.uint8)
+
+    def _export_rows(
+        self,
+        select: str,
+        select_params: List[Any],
+        video_ids: Optional[List[str]],
+        emotion: Optional[str],
+        since: Optional[float],
+        batch_size: int,
+    ) -> Iterator[tuple]:
+        """
+        Stream the rows of `select` (joined to current analyses as `a`) in
+        batches, on a separate read-only connection so writers aren't blocked.
+        """
+        where, params = ["a.mapper_version = ?"], [*select_params, MAPPER_VERSION]
+        if video_ids:
+            where.append(f"a.video_id IN ({','.join('?' * len(video_ids))})")
+            params.extend(video_ids)
+        if emotion:
+            where.append("json_extract(a.analysis, '$.overallEmotion.primary') = ?")
+            params.append(emotion)
+        if since is not None:
+            where.append("a.derived_at >= ?")
+            params.append(since)
+
+        # A streaming response resumes the generator on whichever worker thread
+        # is free; only one consumer ever uses this connection
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10.0, check_same_thread=False)
+        try:
+            cursor = conn.execute(f"{select} WHERE {' AND '.join(where)} ORDER BY a.video_id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def iter_analyses(
+        self,
+        video_ids: Optional[List[str]] = None,
+        emotion: Optional[str] = None,
+        since: Optional[float] = None,
+        batch_size: int = 256,
+    ) -> Iterator[Tuple[str, str]]:
+        """(video ID, analysis JSON text) of current analyses, optionally filtered by overall emotion or derivation time."""
+        return self._export_rows(
+            "SELECT a.video_id, a.analysis FROM analyses a", [], video_ids, emotion, since, batch_size
+        )
+
+    def iter_segment_columns(
+        self,
+        video_ids: Optional[List[str]] = None,
+        emotion: Optional[str] = None,
+        since: Optional[float] = None,
+        batch_size: int = 256,
+    ) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """Like iter_analyses, but each track's segments in column form (see segment_columns)."""
+        rows = self._export_rows(
+            "SELECT a.video_id, s.segment_values, s.emotions FROM analyses a "
+            "JOIN segment_columns s ON s.video_id = a.video_id AND s.mapper_version = a.mapper_version "
+            "AND s.columns = ?",
+            [json.dumps(SEGMENT_COLUMNS)], video_ids, emotion, since, batch_size,
+        )
+        for video_id, values, emotions in rows:
+            matrix = np.frombuffer(values, dtype=np.float32).reshape(-1, len(SEGMENT_COLUMNS))
+            yield video_id, matrix, np.frombuffer(emotions, dtype=np.uint8)
+
+    def videos(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored video metadata (title, duration, thumbnail) by video ID."""
+        if not video_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT video_id, video FROM tracks WHERE video_id IN ({','.join('?' * len(video_ids))})",
+                video_ids,
+            ).fetchall()
+        return {video_id: json.loads(video) for video_id, video in rows}
+
+    def delete(self, video_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tracks WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM analyses WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM embeddings WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM segment_columns WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM fingerprints WHERE video_id = ?", (video_id,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def create_analysis_store() -> Optional[AnalysisStore]:
+    if not settings.analysis_store_enabled:
+        return None
+    data_dir = settings.data_dir or os.path.join(settings.temp_dir, "data")
+    return AnalysisStore(os.path.join(data_dir, "analyses.db"))
+
+
+analysis_store = create_analysis_store()
+
@@ -0,0 +1,78 @@
+"""
+Bulk export of the analysis library as NDJSON.
+
+Two formats:
+- analyses: one stored analysis document per line, written as stored
+  (no parse and re-serialize)
+- segments: one flat row per segment (video_id, times, bands, brain regions,
+  brainwaves, emotion), formatted straight from the stored segment columns
+
+Rows are read from the store in batches and lines are joined into large
+chunks, so memory stays flat however big the library is. Served by
+GET /api/export and by `python -m src.storage export`.
+"""
+import json
+from typing import Dict, Iterator, List, Optional
+
+from src.storage.analyses import AnalysisStore
+from src.storage.segments import EMOTIONS, SEGMENT_COLUMNS, UNKNOWN_EMOTION
+
+EXPORT_FORMATS = ("analyses", "segments")
+CHUNK_BYTES = 256 * 1024
+
+ROW_KEYS = [f',"{name}":' for name in SEGMENT_COLUMNS]
+# Row endings by emotion code
+ROW_ENDINGS = [f',"emotion":"{name}"}}\n' for name in EMOTIONS + [""] * (UNKNOWN_EMOTION + 1 - len(EMOTIONS))]
+
+
+def analysis_lines(store: AnalysisStore, **filters) -> Iterator[str]:
+    for _, analysis in store.iter_analyses(**filters):
+        yield analysis + "\n"
+
+
+def segment_lines(store: AnalysisStore, **filters) -> Iterator[str]:
+    # Formatting floats dominates; stored values sit on a 0.001 grid, so
+    # caching the text of each distinct value pays off
+    texts: Dict[float, str] = {}
+    for video_id, matrix, emotions in store.iter_segment_columns(**filters):
+        prefix = '{"video_id":' + json.dumps(video_id)
+        lines = []
+        for row, code in zip(matrix.tolist(), emotions.tolist()):
+            parts = [prefix]
+            for key, value in zip(ROW_KEYS, row):
+                text = texts.get(value)
+                if text is None:
+                    text = texts[value] = "%.6g" % value
+                parts.append(key)
+                parts.append(text)
+            parts.append(ROW_ENDINGS[code])
+            lines.append("".join(parts))
+        yield "".join(lines)
+
+
+def export_lines(
+    store: AnalysisStore,
+    format: str = "analyses",
+    video_ids: Optional[List[str]] = None,
+    emotion: Optional[str] = None,
+    since: Optional[float] = None,
+) -> Iterator[str]:
+    """NDJSON text of the (filtered) library, in pieces of one or more lines."""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    lines = analysis_lines if format == "analyses" else segment_lines
+    return lines(store, video_ids=video_ids, emotion=emotion, since=since)
+
+
+def ndjson_chunks(pieces: Iterator[str], chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Join NDJSON pieces into chunks of about `chunk_bytes`."""
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
@@ -0,0 +1,357 @@
+"""
+Columnar store of every analyzed segment, for moment search.
+
+Segments of all tracks are appended to one set of column arrays (times,
+frequency bands, brain regions, brainwaves, emotion confidence), track after
+track, in blocks of BLOCK_ROWS rows. Each block keeps the min/max of every
+column, and each emotion keeps a posting list of its rows, so a query such as
+"nucleusAccumbens > 0.8 and emotion is uplifting" skips the blocks that cannot
+match and only evaluates the rows of the requested emotions. Matching rows
+that are adjacent in the same track are merged into one moment.
+"""
+import logging
+import operator
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.analyzer.emotion_classifier import EmotionCategory
+
+logger = logging.getLogger(__name__)
+
+BLOCK_ROWS = 4096
+# Most blocks evaluated per vectorized step of a query (steps start at one
+# block and double, so a page that fills early stays cheap)
+SCAN_BLOCKS = 64
+
+# Segment dict group -> columns (see build_segment)
+COLUMN_GROUPS = {
+    "frequencies": ["bass", "lowMid", "mid", "highMid", "high"],
+    "brainRegions": [
+        "auditoryCortex", "amygdala", "hippocampus", "nucleusAccumbens",
+        "motorCortex", "prefrontalCortex", "basalGanglia",
+    ],
+    "brainwaves": ["delta", "theta", "alpha", "beta", "gamma"],
+    "emotion": ["confidence"],
+}
+SEGMENT_COLUMNS = ["startTime", "endTime"] + [name for names in COLUMN_GROUPS.values() for name in names]
+COLUMN_INDEX = {name: i for i, name in enumerate(SEGMENT_COLUMNS)}
+# Columns that can be filtered on (segment times are not)
+QUERY_COLUMNS = SEGMENT_COLUMNS[2:]
+EMOTIONS = [e.value for e in EmotionCategory]
+UNKNOWN_EMOTION = 255
+
+OPERATORS: Dict[str, Callable] = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+CONDITION_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|>|<)\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*$")
+
+
+@dataclass
+class Condition:
+    column: str
+    op: str
+    value: float
+
+    def block_may_match(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Blocks whose [min, max] range can contain a matching value."""
+        if self.op in (">", ">="):
+            return OPERATORS[self.op](high, self.value)
+        return OPERATORS[self.op](low, self.value)
+
+    def matches(self, values: np.ndarray) -> np.ndarray:
+        return OPERATORS[self.op](values, self.value)
+
+
+def parse_condition(expression: str) -> Condition:
+    """Parse "column>value" (also >=, <, <=) against the segment columns."""
+    match = CONDITION_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Invalid condition: {expression!r} (expected e.g. nucleusAccumbens>0.8)")
+    column, op, value = match.groups()
+    if column not in QUERY_COLUMNS:
+        raise ValueError(f"Unknown column: {column!r}")
+    return Condition(column, op, float(value))
+
+
+def columnize(segments: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """A track's segments as a (segments x SEGMENT_COLUMNS) float32 matrix and emotion codes."""
+    matrix = np.array([
+        [seg["startTime"], seg["endTime"]]
+        + [seg[group][name] for group, names in COLUMN_GROUPS.items() for name in names]
+        for seg in segments
+    ], dtype=np.float32).reshape(-1, len(SEGMENT_COLUMNS))
+    emotions = np.array([
+        EMOTIONS.index(seg["emotion"]["primary"]) if seg["emotion"]["primary"] in EMOTIONS else UNKNOWN_EMOTION
+        for seg in segments
+    ], dtype=np.uint8)
+    return matrix, emotions
+
+
+def _grown(array: np.ndarray, size: int, axis: int = 0) -> np.ndarray:
+    """`array` with room for at least `size` entries along `axis` (doubling)."""
+    if array.shape[axis] >= size:
+        return array
+    shape = list(array.shape)
+    shape[axis] = max(size, 2 * array.shape[axis], 1024)
+    grown = np.zeros(shape, dtype=array.dtype)
+    index = [slice(None)] * array.ndim
+    index[axis] = slice(0, array.shape[axis])
+    grown[tuple(index)] = array
+    return grown
+
+
+class SegmentStore:
+    """
+    In-memory columnar segment table with block statistics and emotion postings.
+
+    Tracks are identified internally by codes that increase with insertion, so
+    rows stay sorted by (track code, time) and a cursor (code, offset) remains
+    valid across inserts, deletes and compaction. Codes are assigned as tracks
+    are loaded, so cursors are only meaningful to the process that issued them.
+    """
+
+    def __init__(self):
+        self._size = 0
+        self._columns = np.zeros((len(SEGMENT_COLUMNS), 0), dtype=np.float32)
+        self._emotions = np.zeros(0, dtype=np.uint8)
+        self._tracks = np.zeros(0, dtype=np.int64)
+        self._block_min = np.zeros((0, len(SEGMENT_COLUMNS)), dtype=np.float32)
+        self._block_max = np.zeros((0, len(SEGMENT_COLUMNS)), dtype=np.float32)
+        self._postings = [np.zeros(0, dtype=np.int64) for _ in EMOTIONS]
+        self._posting_sizes = [0] * len(EMOTIONS)
+        self._keys: List[str] = []  # code -> video ID
+        self._codes: Dict[str, int] = {}  # video ID -> code of its live rows
+        self._alive = np.zeros(0, dtype=bool)  # per code
+        self._dead_rows = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size - self._dead_rows
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._codes
+
+    def load(self, items: Iterable[Tuple[str, np.ndarray, np.ndarray]]) -> None:
+        """Bulk-add (video ID, column matrix, emotion codes) per track."""
+        count = 0
+        with self._lock:
+            first = self._size
+            for video_id, matrix, emotions in items:
+                self._add(video_id, matrix, emotions, update_blocks=False)
+                count += 1
+            if self._size > first:
+                self._update_blocks(first // BLOCK_ROWS, (self._size - 1) // BLOCK_ROWS)
+            self._maybe_compact()
+        logger.info(f"Segment store loaded with {len(self)} segments of {count} tracks")
+
+    def add(self, video_id: str, matrix: np.ndarray, emotions: np.ndarray) -> None:
+        """Append a track's segments, replacing any previous ones."""
+        with self._lock:
+            self._add(video_id, matrix, emotions)
+            self._maybe_compact()
+
+    def _add(self, video_id: str, matrix: np.ndarray, emotions: np.ndarray, update_blocks: bool = True) -> None:
+        if video_id in self._codes:
+            self._remove(video_id)
+        code = len(self._keys)
+        self._keys.append(video_id)
+        self._codes[video_id] = code
+        self._alive = _grown(self._alive, code + 1)
+        self._alive[code] = True
+        self._append(code, matrix, emotions, update_blocks)
+
+    def remove(self, video_id: str) -> None:
+        with self._lock:
+            self._remove(video_id)
+            self._maybe_compact()
+
+    def _remove(self, video_id: str) -> None:
+        code = self._codes.pop(video_id, None)
+        if code is None:
+            return
+        self._alive[code] = False
+        start, end = self._track_rows(code)
+        self._dead_rows += end - start
+
+    def _append(self, code: int, matrix: np.ndarray, emotions: np.ndarray, update_blocks: bool = True) -> None:
+        start, count = self._size, len(matrix)
+        if count == 0:
+            return
+        end = start + count
+        self._columns = _grown(self._columns, end, axis=1)
+        self._emotions = _grown(self._emotions, end)
+        self._tracks = _grown(self._tracks, end)
+        self._columns[:, start:end] = matrix.T
+        self._emotions[start:end] = emotions
+        self._tracks[start:end] = code
+        self._size = end
+
+        for e in np.unique(emotions).tolist():
+            if e == UNKNOWN_EMOTION:
+                continue
+            rows = start + np.flatnonzero(emotions == e)
+            size = self._posting_sizes[e]
+            self._postings[e] = _grown(self._postings[e], size + len(rows))
+            self._postings[e][size:size + len(rows)] = rows
+            self._posting_sizes[e] = size + len(rows)
+
+        if update_blocks:
+            self._update_blocks(start // BLOCK_ROWS, (end - 1) // BLOCK_ROWS)
+
+    def _update_blocks(self, first: int, last: int) -> None:
+        self._block_min = _grown(self._block_min, last + 1)
+        self._block_max = _grown(self._block_max, last + 1)
+        for block in range(first, last + 1):
+            columns = self._columns[:, block * BLOCK_ROWS:min((block + 1) * BLOCK_ROWS, self._size)]
+            self._block_min[block] = columns.min(axis=1)
+            self._block_max[block] = columns.max(axis=1)
+
+    def _maybe_compact(self) -> None:
+        # Compact once most rows are dead
+        if self._dead_rows > max(BLOCK_ROWS, self._size // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop the rows of removed tracks and rebuild block statistics and postings."""
+        n = self._size
+        keep = self._alive[self._tracks[:n]]
+        size = int(keep.sum())
+        self._columns[:, :size] = self._columns[:, :n][:, keep]
+        self._emotions[:size] = self._emotions[:n][keep]
+        self._tracks[:size] = self._tracks[:n][keep]
+        self._size = size
+        self._dead_rows = 0
+
+        if size:
+            self._update_blocks(0, (size - 1) // BLOCK_ROWS)
+        order = np.argsort(self._emotions[:size], kind="stable")
+        codes = self._emotions[:size][order]
+        for e in range(len(EMOTIONS)):
+            rows = order[np.searchsorted(codes, e, side="left"):np.searchsorted(codes, e, side="right")]
+            self._postings[e] = rows.astype(np.int64)
+            self._posting_sizes[e] = len(rows)
+        logger.info(f"Segment store compacted: {n} -> {size} rows")
+
+    def _track_rows(self, code: int) -> Tuple[int, int]:
+        tracks = self._tracks[:self._size]
+        return (
+            int(np.searchsorted(tracks, code, side="left")),
+            int(np.searchsorted(tracks, code, side="right")),
+        )
+
+    def _cursor_row(self, cursor: Optional[str]) -> int:
+        if not cursor:
+            return 0
+        try:
+            code, offset = (int(part) for part in cursor.split(":"))
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        start, end = self._track_rows(code)
+        return min(start + offset, end) if end > start else start
+
+    def _cursor(self, row: int) -> str:
+        code = int(self._tracks[row])
+        return f"{code}:{row - self._track_rows(code)[0]}"
+
+    def query(
+        self,
+        conditions: Sequence[Condition] = (),
+        emotions: Sequence[str] = (),
+        video_id: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Moments (runs of adjacent matching segments) in track order, and the
+        cursor of the next page (None on the last page).
+        """
+        emotion_codes = [EMOTIONS.index(e) for e in emotions if e in EMOTIONS]
+        if emotions and not emotion_codes:
+            return [], None
+
+        with self._lock:
+            start, end = self._cursor_row(cursor), self._size
+            if video_id is not None:
+                code = self._codes.get(video_id)
+                if code is None:
+                    return [], None
+                track_start, track_end = self._track_rows(code)
+                start, end = max(start, track_start), track_end
+            if start >= end:
+                return [], None
+
+            # Prune blocks by min/max statistics and emotion postings
+            blocks = np.arange(start // BLOCK_ROWS, (end - 1) // BLOCK_ROWS + 1)
+            keep = np.ones(len(blocks), dtype=bool)
+            for condition in conditions:
+                column = COLUMN_INDEX[condition.column]
+                keep &= condition.block_may_match(self._block_min[blocks, column], self._block_max[blocks, column])
+
+            runs: List[List[int]] = []  # [first row, last row]
+            for lo, hi in self._scan_ranges(blocks[keep], start, end):
+                rows = self._candidate_rows(lo, hi, emotion_codes)
+                mask = self._alive[self._tracks[rows]]
+                for condition in conditions:
+                    mask &= condition.matches(self._columns[COLUMN_INDEX[condition.column], rows])
+                hits = lo + np.flatnonzero(mask) if isinstance(rows, slice) else rows[mask]
+                self._merge_runs(runs, hits, limit + 1)
+                if len(runs) > limit:
+                    break
+
+            next_cursor = self._cursor(runs[limit][0]) if len(runs) > limit else None
+            return [self._moment(first, last) for first, last in runs[:limit]], next_cursor
+
+    def _scan_ranges(self, blocks: np.ndarray, start: int, end: int) -> Iterable[Tuple[int, int]]:
+        """Row ranges covering runs of consecutive blocks, in growing steps."""
+        if len(blocks) == 0:
+            return
+        step = 1
+        breaks = np.flatnonzero(np.diff(blocks) != 1) + 1
+        for run in np.split(blocks, breaks):
+            i = 0
+            while i < len(run):
+                chunk = run[i:i + step]
+                yield max(int(chunk[0]) * BLOCK_ROWS, start), min((int(chunk[-1]) + 1) * BLOCK_ROWS, end)
+                i += step
+                step = min(2 * step, SCAN_BLOCKS)
+
+    def _candidate_rows(self, lo: int, hi: int, emotion_codes: Sequence[int]) -> Union[slice, np.ndarray]:
+        """Rows in [lo, hi) with one of the emotions, from the postings (a slice when unfiltered)."""
+        if not emotion_codes:
+            return slice(lo, hi)
+        parts = []
+        for e in emotion_codes:
+            postings = self._postings[e][:self._posting_sizes[e]]
+            parts.append(postings[np.searchsorted(postings, lo):np.searchsorted(postings, hi)])
+        rows = np.concatenate(parts)
+        return np.sort(rows) if len(parts) > 1 else rows
+
+    def _merge_runs(self, runs: List[List[int]], hits: np.ndarray, wanted: int) -> None:
+        """Extend `runs` (up to `wanted`) with sorted matching rows, merging adjacent rows of one track."""
+        if len(hits) == 0:
+            return
+        tracks = self._tracks[hits]
+        breaks = np.flatnonzero((np.diff(hits) != 1) | (np.diff(tracks) != 0)) + 1
+        # One extra, as the first may extend the previous run
+        keep = wanted - len(runs) + 1
+        firsts = np.concatenate(([0], breaks))[:keep]
+        lasts = np.concatenate((breaks - 1, [len(hits) - 1]))[:keep]
+        for first, last in zip(hits[firsts].tolist(), hits[lasts].tolist()):
+            if runs and runs[-1][1] == first - 1 and self._tracks[first] == self._tracks[first - 1]:
+                runs[-1][1] = last
+            else:
+                runs.append([first, last])
+
+    def _moment(self, first: int, last: int) -> Dict[str, Any]:
+        return {
+            "video_id": self._keys[int(self._tracks[first])],
+            "start_time": round(float(self._columns[COLUMN_INDEX["startTime"], first]), 3),
+            "end_time": round(float(self._columns[COLUMN_INDEX["endTime"], last]), 3),
+            "segments": last - first + 1,
+        }
+
+
+# Singleton instance
+segment_store = SegmentStore()
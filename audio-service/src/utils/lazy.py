@@ -0,0 +1,32 @@
+import importlib
+import threading
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a heavy module (librosa, scipy.signal, yt_dlp) that imports
+    it on first attribute access, keeping it off the startup path.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        # Name-mangled so they can't shadow the module's own attributes
+        self.__module: Optional[ModuleType] = None
+        self.__lock = threading.Lock()
+
+    def __resolve(self) -> ModuleType:
+        if self.__module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__module = importlib.import_module(self.__name__)
+        return self.__module
+
+    def __getattr__(self, attr: str):
+        # Only reached for attributes not set on the proxy itself
+        return getattr(self.__resolve(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__module is not None else "not loaded"
+        return f"<LazyModule {self.__name__!r} ({state})>"
@@ -0,0 +1,69 @@
+from typing import AsyncIterator
+
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart body cannot be parsed."""
+    pass
+
+
+def get_boundary(content_type: str) -> str:
+    """Extract the boundary parameter from a multipart Content-Type header."""
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            return value.strip('"')
+    raise MultipartError("Missing multipart boundary")
+
+
+async def iter_multipart_file(stream: AsyncIterator[bytes], boundary: str) -> AsyncIterator[bytes]:
+    """
+    Yield the content of the first file part of a multipart/form-data stream.
+
+    Data is passed through as it arrives; at most one delimiter's worth of
+    bytes is held back, so memory does not grow with the upload size.
+    """
+    delimiter = b"\r\n--" + boundary.encode()
+    buffer = b"\r\n"  # lets the opening boundary match the delimiter form
+    state = "preamble"
+
+    async for data in stream:
+        buffer += data
+
+        while True:
+            if state == "preamble":
+                idx = buffer.find(delimiter)
+                if idx == -1:
+                    buffer = buffer[-len(delimiter):]
+                    break
+                buffer = buffer[idx + len(delimiter):]
+                state = "headers"
+
+            if state == "headers":
+                end = buffer.find(b"\r\n\r\n")
+                if end == -1:
+                    if len(buffer) > MAX_HEADER_BYTES:
+                        raise MultipartError("Part headers too large")
+                    break
+                headers = buffer[:end].lower()
+                buffer = buffer[end + 4:]
+                # Skip plain form fields until the file part
+                state = "body" if b"filename=" in headers else "preamble"
+                continue
+
+            if state == "body":
+                idx = buffer.find(delimiter)
+                if idx != -1:
+                    if idx:
+                        yield buffer[:idx]
+                    return
+                keep = len(delimiter) - 1
+                if len(buffer) > keep:
+                    yield buffer[:-keep]
+                    buffer = buffer[-keep:]
+                break
+
+    if state == "body":
+        raise MultipartError("Unexpected end of multipart body")
+    raise MultipartError("No file part in multipart body")
@@ -0,0 +1,76 @@
+"""
+Opt-in sampling profiler for a single job.
+
+A background thread periodically captures the stacks of the threads that are
+inside the job's trace spans (see Trace.active_threads), and counts identical
+stacks. The result is written in the folded format ("frame;frame;frame count"
+per line), which flamegraph.pl, speedscope and inferno read directly.
+
+The event loop thread stays inside the job's root span for the whole job, so
+its samples can include other jobs' work while several run concurrently.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+from src.config import settings
+from src.utils.tracing import Trace
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame: Optional[FrameType]) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self, trace: Trace, interval: Optional[float] = None):
+        self.trace = trace
+        self.interval = interval or settings.profile_interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.trace.job_id}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            threads = list(self.trace.active_threads)
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_fold(frame)] += 1
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the folded stacks; returns the file path."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if not self.samples:
+            return None
+
+        directory = os.path.join(settings.temp_dir, "profiles")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.trace.job_id}-{int(time.time())}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profile for {self.trace.job_id}: {sum(self.samples.values())} samples in {path}")
+        return path
@@ -0,0 +1,170 @@
+"""
+Per-job trace spans.
+
+A Trace is a tree of timed spans (extract, decode, per-chunk features, emit)
+for one job. The span being recorded is tracked in a context variable, so
+nested `span()` blocks attach to their parent and code outside any job's
+trace pays almost nothing. Tasks inherit the context; for executor calls,
+wrap the function with `bind()` (run_in_executor does not copy the context).
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.config import settings
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace: "Trace"
+    start: float  # perf_counter
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    end: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        origin = self.trace.root.start
+        end = self.end if self.end is not None else time.perf_counter()
+        data = {
+            "name": self.name,
+            "start": round(self.start - origin, 6),
+            "duration": round(end - self.start, 6),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Trace:
+    """Span tree of one job, capped at max_spans (later spans are counted, not kept)."""
+
+    def __init__(self, job_id: str, max_spans: Optional[int] = None):
+        self.job_id = job_id
+        self.started_at = datetime.utcnow().isoformat() + "Z"
+        self.max_spans = max_spans or settings.trace_max_spans
+        self.span_count = 1
+        self.dropped = 0
+        self.root = Span(name="job", trace=self, start=time.perf_counter())
+        self.profile_path: Optional[str] = None
+        # Per-stage totals, once the span tree has been dropped
+        self.summary: Optional[Dict[str, Dict[str, Any]]] = None
+        # Threads currently inside one of this trace's spans (ident -> depth),
+        # which is what the profiler samples
+        self.active_threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.active_threads[ident] = self.active_threads.get(ident, 0) + 1
+
+    def _exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self.active_threads.get(ident, 0) - 1
+            if depth > 0:
+                self.active_threads[ident] = depth
+            else:
+                self.active_threads.pop(ident, None)
+
+    def _add(self, parent: Span, span: Span) -> bool:
+        with self._lock:
+            if self.span_count >= self.max_spans:
+                self.dropped += 1
+                return False
+            self.span_count += 1
+        parent.children.append(span)
+        return True
+
+    def stages(self) -> Dict[str, Dict[str, Any]]:
+        """Count, total and longest duration of the recorded spans, by name."""
+        totals: Dict[str, List[float]] = {}
+        now = time.perf_counter()
+        pending = list(self.root.children)
+        while pending:
+            current = pending.pop()
+            duration = (current.end if current.end is not None else now) - current.start
+            stats = totals.setdefault(current.name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            pending.extend(current.children)
+        return {
+            name: {"count": count, "total": round(total, 6), "max": round(longest, 6)}
+            for name, (count, total, longest) in sorted(totals.items())
+        }
+
+    def compact(self) -> None:
+        """Keep only the per-stage totals, releasing the span tree."""
+        if self.summary is None:
+            self.summary = self.stages()
+            self.root.children = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "span_count": self.span_count,
+            "dropped_spans": self.dropped,
+            "profile": self.profile_path,
+            "compacted": self.summary is not None,
+            "stages": self.summary if self.summary is not None else self.stages(),
+            "root": self.root.to_dict(),
+        }
+
+
+@contextmanager
+def start_trace(trace: Trace) -> Iterator[Trace]:
+    """Record the enclosed block as the trace's root span."""
+    token = _current.set(trace.root)
+    trace._enter_thread()
+    try:
+        yield trace
+    finally:
+        trace.root.end = time.perf_counter()
+        trace._exit_thread()
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span, if any."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    trace = parent.trace
+    child = Span(name=name, trace=trace, start=time.perf_counter(), attrs=attrs)
+    if not trace._add(parent, child):
+        yield None
+        return
+
+    token = _current.set(child)
+    trace._enter_thread()
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        trace._exit_thread()
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current.get()
+    return current.trace if current is not None else None
+
+
+def bind(func: Callable) -> Callable:
+    """Carry the caller's trace context into an executor thread."""
+    return functools.partial(contextvars.copy_context().run, func)
@@ -1,9 +1,12 @@
-from .server import sio, send_progress, send_chunk, send_complete, send_error, cleanup_job
+from .server import sio, send_progress, send_chunk, send_preview, send_complete, send_error, cleanup_job, reset_replay, expire_replay
 from .messages import (
     MessageType,
     ConnectedMessage,
     ProgressMessage,
     ChunkMessage,
+    PreviewMessage,
+    CatchupMessage,
+    ResumeMessage,
     CompleteMessage,
     ErrorMessage,
 )
@@ -12,13 +15,19 @@ __all__ = [
     'sio',
     'send_progress',
     'send_chunk',
+    'send_preview',
     'send_complete',
     'send_error',
     'cleanup_job',
+    'reset_replay',
+    'expire_replay',
     'MessageType',
     'ConnectedMessage',
     'ProgressMessage',
     'ChunkMessage',
+    'PreviewMessage',
+    'CatchupMessage',
+    'ResumeMessage',
     'CompleteMessage',
     'ErrorMessage',
 ]
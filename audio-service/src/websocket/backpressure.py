@@ -0,0 +1,183 @@
+"""
+Per-client flow control for job event streams.
+
+Room emits hand every packet to each client's engine.io queue, which is
+unbounded, so a slow consumer (e.g. a mobile link) only grows server
+memory. It never slows the producer. A periodic monitor watches those
+queue depths:
+
+- A client whose queue passes the high watermark is throttled. Room emits
+  skip it, and its job events go to a bounded outbox instead. Progress is
+  coalesced to the latest value per job.
+- Once its queue drains below the low watermark, pending chunks are flushed
+  as one 'catchup' batch per job (with the latest progress), followed by
+  any other events. The client is promoted back to live once nothing more
+  is pending.
+- A client that stays behind is evicted. That happens when its outbox
+  exceeds outbox_max_chunks or it stays throttled longer than
+  slow_client_timeout. It is sent a 'resume' token and then disconnected.
+  Reconnecting with auth {"resume": token} re-subscribes it to its jobs and
+  replays what it missed (see the replay buffer).
+
+Flow control applies to the clients connected to this worker. With a
+message bus, every worker diverts job events at delivery, for its own
+clients (see bus.py).
+"""
+import asyncio
+import logging
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import socketio
+
+from src.config import settings
+from src.utils.cache import TTLCache
+from src.websocket.encoding import encode
+from src.websocket.messages import CatchupMessage, ResumeMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Outbox:
+    """Events held back for a throttled client."""
+    chunks: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    progress: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    other: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    chunk_count: int = 0
+
+    def add(self, job_id: str, event: str, data: Dict[str, Any]) -> None:
+        if event == 'progress':
+            self.progress[job_id] = data  # only the latest value matters
+        elif event == 'chunk':
+            self.chunks.setdefault(job_id, []).append(data)
+            self.chunk_count += 1
+        else:
+            self.other.append((event, data))
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks or self.progress or self.other)
+
+
+@dataclass
+class ClientState:
+    encoding: str
+    throttled_since: Optional[float] = None
+    outbox: Outbox = field(default_factory=Outbox)
+    # Last chunk seq per job known to have left the engine.io queue, and the
+    # snapshot that becomes confirmed once the queue is next seen empty
+    confirmed: Dict[str, int] = field(default_factory=dict)
+    handed: Dict[str, int] = field(default_factory=dict)
+
+
+class FlowController:
+    """Tracks per-client queue depth and diverts events away from slow clients."""
+
+    def __init__(
+        self,
+        sio: socketio.AsyncServer,
+        jobs_of: Callable[[str], List[str]],
+        last_seq: Callable[[str], int],
+        interval: float = 0.25,
+    ):
+        self.sio = sio
+        self.jobs_of = jobs_of
+        self.last_seq = last_seq
+        self.interval = interval
+        self.clients: Dict[str, ClientState] = {}
+        self.throttled: Set[str] = set()
+        self.resume_tokens: TTLCache[Dict[str, int]] = TTLCache(ttl=settings.resume_token_ttl)
+        self._task = None
+
+    def register(self, sid: str, encoding: str) -> None:
+        self.clients[sid] = ClientState(encoding=encoding)
+        if self._task is None:
+            self._task = self.sio.start_background_task(self._monitor)
+
+    def unregister(self, sid: str) -> None:
+        self.clients.pop(sid, None)
+        self.throttled.discard(sid)
+
+    def divert(self, job_id: str, event: str, data: Dict[str, Any], encoding: Optional[str] = None) -> List[str]:
+        """Queue an event for throttled subscribers of a job (using `encoding`); returns their sids to skip."""
+        skipped = []
+        for sid in self.throttled:
+            state = self.clients[sid]
+            if (encoding is None or state.encoding == encoding) and job_id in self.jobs_of(sid):
+                state.outbox.add(job_id, event, data)
+                skipped.append(sid)
+        return skipped
+
+    def redeem(self, token: str) -> Optional[Dict[str, int]]:
+        """Jobs and last delivered seqs for a resume token (single use)."""
+        return self.resume_tokens.pop(token)
+
+    def _queue_depth(self, sid: str) -> Optional[int]:
+        eio_sid = self.sio.manager.eio_sid_from_sid(sid, '/')
+        socket = self.sio.eio.sockets.get(eio_sid) if eio_sid else None
+        return socket.queue.qsize() if socket else None
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            for sid, state in list(self.clients.items()):
+                depth = self._queue_depth(sid)
+                if depth is None:
+                    continue
+                try:
+                    await self._check(sid, state, depth, now)
+                except Exception as e:
+                    logger.warning(f"Flow control failed for {sid}: {e}")
+
+    async def _check(self, sid: str, state: ClientState, depth: int, now: float):
+        if depth == 0:
+            state.confirmed = dict(state.handed)
+        if sid not in self.throttled:
+            # Everything emitted so far has been handed to the client's queue
+            state.handed = {job_id: self.last_seq(job_id) for job_id in self.jobs_of(sid)}
+            if depth > settings.backpressure_high_watermark:
+                logger.info(f"Client {sid} is slow ({depth} packets queued), throttling")
+                state.throttled_since = now
+                self.throttled.add(sid)
+            return
+
+        if (state.outbox.chunk_count > settings.outbox_max_chunks
+                or now - state.throttled_since > settings.slow_client_timeout):
+            await self._evict(sid, state)
+        elif depth <= settings.backpressure_low_watermark:
+            if state.outbox:
+                await self._flush(sid, state)
+            else:
+                logger.info(f"Client {sid} caught up, resuming live events")
+                self.throttled.discard(sid)
+                state.throttled_since = None
+
+    async def _flush(self, sid: str, state: ClientState):
+        outbox, state.outbox = state.outbox, Outbox()
+        for job_id in set(outbox.chunks) | set(outbox.progress):
+            chunks = outbox.chunks.get(job_id, [])
+            if chunks:
+                state.handed[job_id] = chunks[-1]['seq']
+            msg = CatchupMessage(
+                job_id=job_id,
+                chunks=chunks,
+                last_seq=self.last_seq(job_id),
+                progress=outbox.progress.get(job_id),
+            )
+            await self.sio.emit('catchup', encode(msg.to_dict(), state.encoding), to=sid)
+        for event, data in outbox.other:
+            await self.sio.emit(event, encode(data, state.encoding), to=sid)
+
+    async def _evict(self, sid: str, state: ClientState):
+        token = secrets.token_urlsafe(16)
+        jobs = {job_id: state.confirmed.get(job_id, 0) for job_id in self.jobs_of(sid)}
+        self.resume_tokens.set(token, jobs)
+        self.unregister(sid)
+
+        logger.info(f"Disconnecting slow client {sid} with a resume token")
+        await self.sio.emit('resume', ResumeMessage(token=token, jobs=jobs).to_dict(), to=sid)
+        # Disconnecting waits for the queued packets to drain; don't hold up the monitor
+        self.sio.start_background_task(self.sio.disconnect, sid)
@@ -0,0 +1,174 @@
+"""
+Message bus for Socket.IO emits across workers.
+
+With more than one uvicorn worker (or pod), a client is connected to one
+worker while its job may run on another. A pub/sub client manager forwards
+every emit to all workers, and each delivers it to its own participants.
+
+settings.message_bus_url selects the manager:
+    ""                      in-process only (single worker, the default)
+    sqlite:///bus.db        SQLite table polled by every worker on the host
+                            (sqlite:////abs/path.db for an absolute path)
+    redis://host:6379/0     Redis pub/sub (requires the redis package)
+    amqp://user@host//      RabbitMQ (requires the aio_pika package)
+
+Only emits are shared. Job state and replay buffers stay in the worker
+that runs the job, so a catch-up only has data on that worker (elsewhere it
+is reported as missed, see send_catchup).
+
+Job events travel the bus unencoded, as JobEvent. Each worker encodes them
+when delivering to its own clients and diverts those its flow controller has
+throttled (see backpressure.py).
+"""
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import socketio
+from socketio.async_manager import AsyncManager
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from src.websocket.encoding import encode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobEvent:
+    """Payload of a job event emitted to the room of one wire encoding."""
+    job_id: str
+    encoding: str
+    data: Dict[str, Any]
+
+
+class JobEventManager(AsyncManager):
+    """
+    In-process client manager that delivers JobEvents through flow control.
+
+    Also the delivery stage of the pub/sub managers below: they hand every
+    emit they receive (including their own) to this class's emit.
+    """
+
+    flow = None  # FlowController of this worker, set by the server
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, **kwargs):
+        if isinstance(data, JobEvent):
+            if self.flow is not None and self.flow.throttled:
+                skip_sid = self.flow.divert(data.job_id, event, data.data, data.encoding)
+            data = encode(data.data, data.encoding)
+        return await super().emit(
+            event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, **kwargs
+        )
+
+
+class AsyncSQLiteManager(AsyncPubSubManager, JobEventManager):
+    """
+    Pub/sub client manager backed by a SQLite table.
+
+    Published messages are appended as rows; every worker polls for rows
+    newer than the last one it saw. Rows older than `retention` seconds are
+    pruned by publishers. Meant for several workers on one host, with no
+    broker to run.
+    """
+
+    name = 'asyncsqlite'
+
+    def __init__(
+        self,
+        url: str = 'sqlite:////tmp/socketio-bus.db',
+        channel: str = 'socketio',
+        write_only: bool = False,
+        logger=None,
+        poll_interval: float = 0.02,
+        retention: float = 60.0,
+    ):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._last_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+            'created REAL NOT NULL, payload BLOB NOT NULL)'
+        )
+        return conn
+
+    def _insert(self, payload: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO messages (channel, created, payload) VALUES (?, ?, ?)',
+                (self.channel, now, payload),
+            )
+            if now - self._last_prune > self.retention:
+                self._conn.execute('DELETE FROM messages WHERE created < ?', (now - self.retention,))
+                self._last_prune = now
+
+    def _fetch(self, after: int):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT id, payload FROM messages WHERE channel = ? AND id > ? ORDER BY id',
+                (self.channel, after),
+            ).fetchall()
+
+    def _latest_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(id) FROM messages').fetchone()
+        return row[0] or 0
+
+    async def _publish(self, data):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._insert, pickle.dumps(data))
+
+    async def _listen(self):
+        loop = asyncio.get_event_loop()
+        # Only messages published from now on
+        last_id = await loop.run_in_executor(None, self._latest_id)
+        while True:
+            rows = await loop.run_in_executor(None, self._fetch, last_id)
+            for row_id, payload in rows:
+                last_id = row_id
+                yield payload
+            if not rows:
+                await asyncio.sleep(self.poll_interval)
+
+
+class RedisManager(socketio.AsyncRedisManager, JobEventManager):
+    pass
+
+
+class AioPikaManager(socketio.AsyncAioPikaManager, JobEventManager):
+    pass
+
+
+def create_client_manager(url: str) -> socketio.AsyncManager:
+    """Build the client manager for `url` ("" for in-process only)."""
+    if not url:
+        return JobEventManager()
+    if url.startswith('sqlite:'):
+        manager = AsyncSQLiteManager(url)
+    elif url.startswith(('redis://', 'rediss://')):
+        manager = RedisManager(url)
+    elif url.startswith('amqp'):
+        manager = AioPikaManager(url)
+    else:
+        raise ValueError(f"Unsupported message bus URL: {url}")
+    logger.info(f"Socket.IO message bus: {manager.name}")
+    return manager
@@ -0,0 +1,92 @@
+"""
+Wire encodings for job events.
+
+Clients choose an encoding when connecting, via the `encoding` query
+parameter or auth field: "json" (default) or "msgpack". MessagePack clients
+receive job events as one binary argument. In those payloads each segment's
+numeric values are packed into a little-endian float32 array, ordered as in
+SEGMENT_LAYOUT, which the server sends with the 'connected' message.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+# Order of the packed float32 segment values ("group.key")
+SEGMENT_GROUPS = {
+    "frequencies": ("bass", "lowMid", "mid", "highMid", "high"),
+    "brainRegions": (
+        "auditoryCortex", "amygdala", "hippocampus", "nucleusAccumbens",
+        "motorCortex", "prefrontalCortex", "basalGanglia",
+    ),
+    "brainwaves": ("delta", "theta", "alpha", "beta", "gamma"),
+}
+SEGMENT_LAYOUT: List[str] = [f"{group}.{key}" for group, keys in SEGMENT_GROUPS.items() for key in keys]
+
+
+def available_encodings() -> List[str]:
+    return [JSON, MSGPACK] if msgpack is not None else [JSON]
+
+
+def negotiate(environ: Dict[str, Any], auth: Optional[Dict[str, Any]] = None) -> str:
+    """Pick the encoding a connecting client asked for, falling back to JSON."""
+    requested = (auth or {}).get("encoding") if isinstance(auth, dict) else None
+    if not requested:
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        requested = (query.get("encoding") or [JSON])[0]
+    if requested not in available_encodings():
+        if requested != JSON:
+            logger.info(f"Unsupported encoding requested: {requested}, using JSON")
+        return JSON
+    return requested
+
+
+def job_room(job_id: str, encoding: str = JSON) -> str:
+    """Room for a job's subscribers using `encoding` (JSON clients use the bare job_id)."""
+    return job_id if encoding == JSON else f"{job_id}:{encoding}"
+
+
+def pack_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a segment's numeric groups by one packed float32 array."""
+    values = [segment[group][key] for group, keys in SEGMENT_GROUPS.items() for key in keys]
+    return {
+        "startTime": segment["startTime"],
+        "endTime": segment["endTime"],
+        "values": np.asarray(values, dtype='<f4').tobytes(),
+        "emotion": segment["emotion"],
+    }
+
+
+def _pack_chunk(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    return {**chunk, "segment": pack_segment(chunk["segment"])}
+
+
+def pack_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact the segment-carrying messages; others pass through unchanged."""
+    kind = data.get("type")
+    if kind == "chunk":
+        return _pack_chunk(data)
+    if kind == "catchup":
+        return {**data, "chunks": [_pack_chunk(chunk) for chunk in data["chunks"]]}
+    if kind == "complete":
+        analysis = data["analysis"]
+        return {**data, "analysis": {**analysis, "segments": [pack_segment(s) for s in analysis["segments"]]}}
+    return data
+
+
+def encode(data: Dict[str, Any], encoding: str) -> Any:
+    """Encode an event payload for the wire."""
+    if encoding == MSGPACK:
+        return msgpack.packb(pack_payload(data), use_bin_type=True)
+    return data
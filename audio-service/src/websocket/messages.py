@@ -1,5 +1,4 @@
-from typing import Dict, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional
 from enum import Enum
 
 
@@ -7,54 +6,148 @@ class MessageType(str, Enum):
     CONNECTED = "connected"
     PROGRESS = "progress"
     CHUNK = "chunk"
+    PREVIEW = "preview"
+    CATCHUP = "catchup"
+    RESUME = "resume"
     COMPLETE = "complete"
     ERROR = "error"
 
 
-@dataclass
+# Messages are built once per emit, so they are slotted and build their dicts
+# directly; payloads (segments, analyses) are referenced, not copied.
+
+
 class ConnectedMessage:
-    type: str = MessageType.CONNECTED.value
-    job_id: str = ""
+    __slots__ = ('job_id', 'encoding', 'segment_layout')
+    type = MessageType.CONNECTED.value
+
+    def __init__(self, job_id: str = "", encoding: str = "json", segment_layout: Optional[List[str]] = None):
+        self.job_id = job_id
+        self.encoding = encoding
+        self.segment_layout = segment_layout
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        data = {"type": self.type, "job_id": self.job_id, "encoding": self.encoding}
+        if self.segment_layout is not None:
+            data["segment_layout"] = self.segment_layout
+        return data
 
 
-@dataclass
 class ProgressMessage:
-    status: str
-    progress: int
-    message: str
-    type: str = MessageType.PROGRESS.value
+    __slots__ = ('status', 'progress', 'message', 'summary')
+    type = MessageType.PROGRESS.value
+
+    def __init__(self, status: str, progress: int, message: str, summary: Optional[Dict[str, Any]] = None):
+        self.status = status
+        self.progress = progress
+        self.message = message
+        self.summary = summary
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        data = {
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "type": self.type,
+        }
+        if self.summary is not None:
+            data["summary"] = self.summary
+        return data
 
 
-@dataclass
 class ChunkMessage:
-    timestamp: float
-    segment: Dict[str, Any]
-    type: str = MessageType.CHUNK.value
+    __slots__ = ('timestamp', 'segment', 'seq')
+    type = MessageType.CHUNK.value
+
+    def __init__(self, timestamp: float, segment: Dict[str, Any], seq: int = 0):
+        self.timestamp = timestamp
+        self.segment = segment
+        self.seq = seq  # per-job sequence number, starting at 1
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {"timestamp": self.timestamp, "segment": self.segment, "seq": self.seq, "type": self.type}
+
+
+class PreviewMessage:
+    """Coarse timeline sent ahead of the detailed per-second chunks."""
+    __slots__ = ('resolution', 'timeline', 'overall_emotion')
+    type = MessageType.PREVIEW.value
+
+    def __init__(self, resolution: float, timeline: List[Dict[str, Any]], overall_emotion: Dict[str, Any]):
+        self.resolution = resolution
+        self.timeline = timeline
+        self.overall_emotion = overall_emotion
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "resolution": self.resolution,
+            "timeline": self.timeline,
+            "overall_emotion": self.overall_emotion,
+            "type": self.type,
+        }
+
+
+class CatchupMessage:
+    """Buffered chunks a (re)subscribing client missed, sent before live events."""
+    __slots__ = ('job_id', 'chunks', 'last_seq', 'missed', 'progress')
+    type = MessageType.CATCHUP.value
+
+    def __init__(
+        self,
+        job_id: str,
+        chunks: List[Dict[str, Any]],
+        last_seq: int,
+        missed: bool = False,
+        progress: Optional[Dict[str, Any]] = None,
+    ):
+        self.job_id = job_id
+        self.chunks = chunks
+        self.last_seq = last_seq
+        self.missed = missed  # older chunks were evicted; refetch the analysis to fill the gap
+        self.progress = progress
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "chunks": self.chunks,
+            "last_seq": self.last_seq,
+            "missed": self.missed,
+            "progress": self.progress,
+            "type": self.type,
+        }
+
+
+class ResumeMessage:
+    """Sent to a slow client before it is disconnected; reconnect with auth {"resume": token}."""
+    __slots__ = ('token', 'jobs')
+    type = MessageType.RESUME.value
+
+    def __init__(self, token: str, jobs: Dict[str, int]):
+        self.token = token
+        self.jobs = jobs  # job_id -> last delivered chunk seq
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"token": self.token, "jobs": self.jobs, "type": self.type}
 
 
-@dataclass
 class CompleteMessage:
-    analysis: Dict[str, Any]
-    type: str = MessageType.COMPLETE.value
+    __slots__ = ('analysis',)
+    type = MessageType.COMPLETE.value
+
+    def __init__(self, analysis: Dict[str, Any]):
+        self.analysis = analysis
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {"analysis": self.analysis, "type": self.type}
 
 
-@dataclass
 class ErrorMessage:
-    code: str
-    message: str
-    type: str = MessageType.ERROR.value
+    __slots__ = ('code', 'message')
+    type = MessageType.ERROR.value
+
+    def __init__(self, code: str, message: str):
+        self.code = code
+        self.message = message
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {"code": self.code, "message": self.message, "type": self.type}
@@ -1,12 +1,29 @@
+import asyncio
 import logging
-from typing import Dict, Set
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
 import socketio
 
 from src.config import settings
+from src.utils.metrics import EMIT_SECONDS
+from src.websocket.backpressure import FlowController
+from src.websocket.bus import JobEvent, create_client_manager
+from src.websocket.encoding import (
+    JSON,
+    MSGPACK,
+    SEGMENT_LAYOUT,
+    available_encodings,
+    encode,
+    job_room,
+    negotiate,
+)
 from src.websocket.messages import (
     ConnectedMessage,
     ProgressMessage,
     ChunkMessage,
+    PreviewMessage,
+    CatchupMessage,
     CompleteMessage,
     ErrorMessage,
 )
@@ -16,41 +33,76 @@ logger = logging.getLogger(__name__)
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=create_client_manager(settings.message_bus_url),
     cors_allowed_origins=settings.allowed_origins_list,
     logger=True,
     engineio_logger=True,
 )
 
-# Track client subscriptions: job_id -> set of session_ids
-job_subscribers: Dict[str, Set[str]] = {}
 
-# Track client jobs: session_id -> job_id
-client_jobs: Dict[str, str] = {}
+@dataclass
+class ReplayBuffer:
+    """Most recent chunk messages of a job, for clients that subscribe late."""
+    chunks: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=settings.replay_buffer_size))
+    last_seq: int = 0
+    progress: Optional[Dict[str, Any]] = None
+
+
+# Replay state per job_id
+replay_buffers: Dict[str, ReplayBuffer] = {}
+
+
+# Each job is a Socket.IO room per wire encoding (see job_room). A room emit
+# encodes the packet once and sends it to every participant concurrently, and
+# the server drops a client from all its rooms on disconnect. A client may
+# join several jobs.
 
 
 @sio.event
-async def connect(sid, environ):
-    """Handle client connection."""
-    logger.info(f"Client connected: {sid}")
-    await sio.emit('connected', ConnectedMessage(job_id="").to_dict(), to=sid)
+async def connect(sid, environ, auth=None):
+    """Handle client connection, negotiating the wire encoding."""
+    encoding = negotiate(environ, auth)
+    await sio.save_session(sid, {'encoding': encoding})
+    logger.info(f"Client connected: {sid} ({encoding})")
+
+    msg = ConnectedMessage(
+        job_id="",
+        encoding=encoding,
+        segment_layout=SEGMENT_LAYOUT if encoding == MSGPACK else None,
+    )
+    await sio.emit('connected', msg.to_dict(), to=sid)
+    flow.register(sid, encoding)
+
+    # Slow client reconnecting after being disconnected: restore its jobs
+    token = auth.get('resume') if isinstance(auth, dict) else None
+    resumed = flow.redeem(token) if token else None
+    for job_id, since_seq in (resumed or {}).items():
+        await sio.enter_room(sid, job_room(job_id, encoding))
+        await send_catchup(sid, job_id, since_seq)
+
+
+async def client_encoding(sid: str) -> str:
+    session = await sio.get_session(sid)
+    return session.get('encoding', JSON)
 
 
 @sio.event
 async def disconnect(sid):
     """Handle client disconnection."""
     logger.info(f"Client disconnected: {sid}")
-
-    # Remove from job subscribers
-    if sid in client_jobs:
-        job_id = client_jobs[sid]
-        if job_id in job_subscribers:
-            job_subscribers[job_id].discard(sid)
-        del client_jobs[sid]
+    flow.unregister(sid)
 
 
 @sio.event
 async def subscribe(sid, data):
-    """Client subscribes to a job's updates."""
+    """
+    Client subscribes to a job's updates (in addition to any it already follows).
+
+    With `since_seq`, chunks after that sequence number still in the replay
+    buffer are sent first as one 'catchup' message (since_seq=0 for all).
+    A chunk may arrive both live and in the catch-up batch; clients should
+    ignore chunks whose seq they have already seen.
+    """
     job_id = data.get('job_id')
     if not job_id:
         await sio.emit('error', ErrorMessage(
@@ -59,70 +111,144 @@ async def subscribe(sid, data):
         ).to_dict(), to=sid)
         return
 
-    # Add to subscribers
-    if job_id not in job_subscribers:
-        job_subscribers[job_id] = set()
-
-    job_subscribers[job_id].add(sid)
-    client_jobs[sid] = job_id
+    await sio.enter_room(sid, job_room(job_id, await client_encoding(sid)))
 
     logger.info(f"Client {sid} subscribed to job {job_id}")
 
-    await sio.emit('subscribed', {'job_id': job_id}, to=sid)
+    await sio.emit('subscribed', {'job_id': job_id, 'jobs': subscribed_jobs(sid)}, to=sid)
+
+    since_seq = data.get('since_seq')
+    if since_seq is not None:
+        await send_catchup(sid, job_id, int(since_seq))
+
+
+async def send_catchup(sid: str, job_id: str, since_seq: int):
+    """
+    Send one client the buffered chunks after since_seq.
+
+    With a message bus, a job this worker has no buffer for may be running
+    (or have run) on another worker, so the client is told it missed chunks
+    and should refetch the analysis.
+    """
+    buffer = replay_buffers.get(job_id)
+    if buffer is None:
+        buffer = ReplayBuffer()
+        missed = bool(settings.message_bus_url)
+    else:
+        first_seq = buffer.chunks[0]['seq'] if buffer.chunks else buffer.last_seq + 1
+        missed = since_seq + 1 < first_seq
+    msg = CatchupMessage(
+        job_id=job_id,
+        chunks=[chunk for chunk in buffer.chunks if chunk['seq'] > since_seq],
+        last_seq=buffer.last_seq,
+        missed=missed,
+        progress=buffer.progress,
+    )
+    await sio.emit('catchup', encode(msg.to_dict(), await client_encoding(sid)), to=sid)
 
 
 @sio.event
 async def unsubscribe(sid, data):
     """Client unsubscribes from a job."""
     job_id = data.get('job_id')
-    if job_id and job_id in job_subscribers:
-        job_subscribers[job_id].discard(sid)
+    if job_id:
+        await sio.leave_room(sid, job_room(job_id, await client_encoding(sid)))
 
-    if sid in client_jobs:
-        del client_jobs[sid]
 
+def subscribed_jobs(sid: str) -> List[str]:
+    """Jobs a client currently follows."""
+    suffix = f":{MSGPACK}"
+    return [
+        room[:-len(suffix)] if room.endswith(suffix) else room
+        for room in sio.rooms(sid) if room != sid
+    ]
 
-async def broadcast_to_job(job_id: str, event: str, data: dict):
-    """Broadcast message to all subscribers of a job."""
-    if job_id not in job_subscribers:
-        return
 
-    for sid in job_subscribers[job_id].copy():
-        try:
-            await sio.emit(event, data, to=sid)
-        except Exception as e:
-            logger.warning(f"Failed to send to {sid}: {e}")
-            job_subscribers[job_id].discard(sid)
+def last_seq(job_id: str) -> int:
+    buffer = replay_buffers.get(job_id)
+    return buffer.last_seq if buffer else 0
 
 
-async def send_progress(job_id: str, status: str, progress: int, message: str):
-    """Send progress update to job subscribers."""
-    msg = ProgressMessage(status=status, progress=progress, message=message)
-    await broadcast_to_job(job_id, 'progress', msg.to_dict())
+# Slow-consumer handling for clients on this worker, applied as job events are delivered
+flow = FlowController(sio, jobs_of=subscribed_jobs, last_seq=last_seq)
+sio.manager.flow = flow
+
+
+async def broadcast_to_job(job_id: str, event: str, data: dict):
+    """
+    Broadcast message to all subscribers of a job, encoding it once per wire
+    encoding on each worker. Throttled (slow) subscribers get it through their
+    outbox instead.
+    """
+    with EMIT_SECONDS.time(event=event):
+        results = await asyncio.gather(*(
+            sio.emit(event, JobEvent(job_id, encoding, data), room=job_room(job_id, encoding))
+            for encoding in available_encodings()
+        ), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to send {event} for job {job_id}: {result}")
+
+
+async def send_progress(job_id: str, status: str, progress: int, message: str, summary: Optional[dict] = None):
+    """Send progress update (optionally with the running summary) to job subscribers."""
+    msg = ProgressMessage(status=status, progress=progress, message=message, summary=summary)
+    data = msg.to_dict()
+    replay_buffers.setdefault(job_id, ReplayBuffer()).progress = data
+    await broadcast_to_job(job_id, 'progress', data)
 
 
 async def send_chunk(job_id: str, timestamp: float, segment: dict):
     """Send analysis chunk to job subscribers."""
-    msg = ChunkMessage(timestamp=timestamp, segment=segment)
-    await broadcast_to_job(job_id, 'chunk', msg.to_dict())
+    buffer = replay_buffers.setdefault(job_id, ReplayBuffer())
+    buffer.last_seq += 1
+    msg = ChunkMessage(timestamp=timestamp, segment=segment, seq=buffer.last_seq)
+    data = msg.to_dict()
+    buffer.chunks.append(data)
+    await broadcast_to_job(job_id, 'chunk', data)
+
+
+async def send_preview(job_id: str, resolution: float, timeline: list, overall_emotion: dict):
+    """Send coarse preview timeline to job subscribers."""
+    msg = PreviewMessage(resolution=resolution, timeline=timeline, overall_emotion=overall_emotion)
+    await broadcast_to_job(job_id, 'preview', msg.to_dict())
 
 
 async def send_complete(job_id: str, analysis: dict):
     """Send completion message to job subscribers."""
     msg = CompleteMessage(analysis=analysis)
     await broadcast_to_job(job_id, 'complete', msg.to_dict())
+    expire_replay(job_id)
 
 
 async def send_error(job_id: str, code: str, message: str):
     """Send error message to job subscribers."""
     msg = ErrorMessage(code=code, message=message)
     await broadcast_to_job(job_id, 'error', msg.to_dict())
+    expire_replay(job_id)
+
+
+def reset_replay(job_id: str):
+    """Forget buffered events of a job, before it is (re)started on this worker."""
+    replay_buffers[job_id] = ReplayBuffer()
+
+
+def expire_replay(job_id: str):
+    """Drop a finished job's replay buffer once replay_buffer_ttl has passed."""
+    buffer = replay_buffers.get(job_id)
+    if buffer is None:
+        return
+
+    def evict():
+        # Unless the job was restarted meanwhile
+        if replay_buffers.get(job_id) is buffer:
+            del replay_buffers[job_id]
+
+    asyncio.get_event_loop().call_later(settings.replay_buffer_ttl, evict)
 
 
-def cleanup_job(job_id: str):
-    """Clean up job subscribers."""
-    if job_id in job_subscribers:
-        for sid in job_subscribers[job_id]:
-            if sid in client_jobs:
-                del client_jobs[sid]
-        del job_subscribers[job_id]
+async def cleanup_job(job_id: str):
+    """Remove every subscriber from a job's room and drop its replay buffer."""
+    replay_buffers.pop(job_id, None)
+    for encoding in available_encodings():
+        await sio.close_room(job_room(job_id, encoding))
@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the service at a scratch directory
+# before anything under src is imported
+_scratch = tempfile.mkdtemp(prefix="audio-service-tests-")
+os.environ.setdefault("TEMP_DIR", os.path.join(_scratch, "tmp"))
+os.environ.setdefault("MEDIA_DIR", os.path.join(_scratch, "media"))
+os.environ.setdefault("EXTRACTOR_BACKEND", "local")
+os.environ.setdefault("WARM_UP_ANALYSIS", "false")
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1000000")
+os.makedirs(os.environ["MEDIA_DIR"], exist_ok=True)
+
+from dataclasses import fields  # noqa: E402
+from typing import Any, Dict, List, Tuple  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from src.analyzer import AudioFeatures, build_analysis, derive_segments  # noqa: E402
+
+
+def make_track(video_id: str, seconds: int = 8, seed: int = 0) -> Tuple[Dict[str, Any], List[AudioFeatures]]:
+    """A synthetic analysis and the per-chunk features it was derived from."""
+    rng = np.random.default_rng(seed)
+    features = [
+        AudioFeatures(**{
+            f.name: float(i) if f.name == "timestamp" else 60.0 + 120.0 * float(rng.random()) if f.name == "tempo"
+            else float(rng.random())
+            for f in fields(AudioFeatures)
+        })
+        for i in range(seconds)
+    ]
+    segments, aggregator = derive_segments(features)
+    video = {"id": video_id, "title": video_id, "duration": seconds, "thumbnailUrl": ""}
+    return build_analysis(f"job_{video_id}", video, False, segments, aggregator.snapshot()), features
+
+
+@pytest.fixture
+def track_factory():
+    return make_track
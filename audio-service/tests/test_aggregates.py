@@ -0,0 +1,13 @@
+from src.analyzer import emotion_histogram, overall_emotion
+
+
+def test_overall_emotion_matches_summary(track_factory):
+    for seed in range(5):
+        analysis, _ = track_factory("v", seconds=30, seed=seed)
+        histogram = emotion_histogram(analysis["segments"])
+        assert histogram == analysis["summary"]["emotionHistogram"]
+        assert overall_emotion(histogram) == analysis["overallEmotion"]
+
+
+def test_overall_emotion_of_nothing():
+    assert overall_emotion({}) == {"primary": "calm", "confidence": 0.5}
@@ -0,0 +1,24 @@
+import time
+
+from src.utils.cache import TTLCache
+
+
+def test_get_and_pop_return_live_entries():
+    cache = TTLCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    assert cache.pop("b") == 2
+    assert cache.pop("b") is None
+
+
+def test_expired_entries_are_missing(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("token", {"job_a": 3})
+    cache.set("other", {"job_b": 1})
+    now[0] += 11
+    assert cache.pop("token") is None
+    assert cache.get("other") is None
+    assert len(cache) == 0
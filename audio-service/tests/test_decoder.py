@@ -0,0 +1,61 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from src.extractor.base import ExtractionError
+from src.extractor.decoder import StreamDecoder
+
+SAMPLE_RATE = 1000
+
+
+@pytest.fixture
+def failing_ffmpeg(tmp_path, monkeypatch):
+    """An ffmpeg that outputs two seconds of silence, then fails (or hangs, with FAKE_FFMPEG_DELAY)."""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        "#!/bin/sh\n"
+        f"head -c {2 * SAMPLE_RATE * 4} /dev/zero\n"
+        "[ -n \"$FAKE_FFMPEG_DELAY\" ] && exec sleep $FAKE_FFMPEG_DELAY\n"
+        "echo 'Connection reset by peer' >&2\n"
+        "exit 1\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+async def decode(decoder: StreamDecoder) -> int:
+    await decoder.start()
+    await decoder.close_input()
+    try:
+        return sum([len(block) async for block in decoder.blocks()])
+    finally:
+        decoder.close()
+
+
+def test_failure_after_partial_decode_raises(failing_ffmpeg):
+    decoder = StreamDecoder(sample_rate=SAMPLE_RATE)
+    with pytest.raises(ExtractionError, match="Connection reset by peer"):
+        asyncio.run(decode(decoder))
+    assert decoder.samples_decoded == 2 * SAMPLE_RATE
+
+
+def test_failure_at_duration_cap_is_ignored(failing_ffmpeg):
+    decoder = StreamDecoder(sample_rate=SAMPLE_RATE, max_duration=2)
+    assert asyncio.run(decode(decoder)) == 2 * SAMPLE_RATE
+
+
+def test_close_is_not_a_failure(failing_ffmpeg, monkeypatch):
+    # Still running when closed
+    monkeypatch.setenv("FAKE_FFMPEG_DELAY", "10")
+
+    async def stop_early():
+        decoder = StreamDecoder(sample_rate=SAMPLE_RATE)
+        await decoder.start()
+        async for _ in decoder.blocks():
+            decoder.close()
+            await decoder.wait()
+            return decoder.samples_decoded
+
+    assert asyncio.run(stop_early()) > 0
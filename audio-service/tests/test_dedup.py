@@ -0,0 +1,56 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.analyzer import fingerprint_index, similarity_index
+from src.api import routes
+from src.extractor import VideoInfo
+from src.storage import analysis_store, segment_store
+
+
+@pytest.fixture
+def stored_source(track_factory):
+    """A track analyzed before a restart: only the analysis store knows it."""
+    fingerprint = np.random.default_rng(7).integers(1, 2 ** 32, 400, dtype=np.uint64).astype(np.uint32)
+    analysis, features = track_factory("dd_source", seconds=12, seed=7)
+    analysis_store.save("dd_source", analysis, features, fingerprint=fingerprint)
+    yield analysis, fingerprint
+    for video_id in ("dd_source", "dd_copy"):
+        analysis_store.delete(video_id)
+        fingerprint_index.remove(video_id)
+        similarity_index.remove(video_id)
+        segment_store.remove(video_id)
+        routes.jobs.pop(f"job_{video_id}", None)
+
+
+def test_duplicate_completes_through_the_persist_path(stored_source, track_factory):
+    source, fingerprint = stored_source
+    # What load_library does at startup
+    fingerprint_index.load(analysis_store.fingerprints())
+
+    _, features = track_factory("dd_copy", seconds=3)
+    routes.jobs["job_dd_copy"] = {"status": "analyzing", "video_id": "dd_copy", "features": features}
+    video_info = VideoInfo(id="dd_copy", title="Copy", duration=12, thumbnail_url="")
+
+    async def complete():
+        duplicate = await routes.find_duplicate(fingerprint, "dd_copy")
+        assert duplicate is not None
+        return await routes.complete_from_duplicate("job_dd_copy", "dd_copy", video_info, duplicate, fingerprint)
+
+    analysis = asyncio.run(complete())
+
+    job = routes.jobs["job_dd_copy"]
+    assert job["status"] == "complete"
+    assert "features" not in job
+    assert analysis["dedupedFrom"] == "dd_source"
+    assert analysis["overallEmotion"] == source["overallEmotion"]
+    assert analysis["segments"] == source["segments"]
+
+    stored = analysis_store.get_analysis("dd_copy")
+    assert stored["video"]["title"] == "Copy"
+    assert analysis_store.load_track("dd_copy").features == analysis_store.load_track("dd_source").features
+    assert "dd_copy" in dict(analysis_store.fingerprints())
+    assert "dd_copy" in similarity_index
+    assert "dd_copy" in segment_store
+    assert fingerprint_index.lookup(fingerprint, exclude="dd_source")[0] == "dd_copy"
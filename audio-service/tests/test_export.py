@@ -0,0 +1,67 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import routes
+from src.storage import AnalysisStore, export_lines, ndjson_chunks
+
+
+@pytest.fixture
+def store(tmp_path, track_factory):
+    store = AnalysisStore(str(tmp_path / "analyses.db"))
+    for i in range(20):
+        analysis, features = track_factory(f"v{i:02d}", seed=i)
+        store.save(f"v{i:02d}", analysis, features)
+    yield store
+    store.close()
+
+
+def test_export_analyses_round_trip(store):
+    lines = b"".join(ndjson_chunks(export_lines(store, "analyses"))).decode().splitlines()
+    analyses = [json.loads(line) for line in lines]
+    assert [a["video"]["id"] for a in analyses] == [f"v{i:02d}" for i in range(20)]
+
+
+def test_export_segments_rows(store):
+    rows = [json.loads(line) for line in b"".join(ndjson_chunks(export_lines(store, "segments", ["v03"]))).splitlines()]
+    expected = store.get_analysis("v03")["segments"]
+    assert len(rows) == len(expected)
+    assert rows[0]["video_id"] == "v03"
+    assert rows[0]["nucleusAccumbens"] == expected[0]["brainRegions"]["nucleusAccumbens"]
+    assert rows[0]["emotion"] == expected[0]["emotion"]["primary"]
+
+
+def test_export_generator_resumes_on_other_threads(store):
+    # StreamingResponse steps a sync generator on whichever worker thread is free
+    rows = store.iter_analyses(batch_size=1)
+    seen = []
+    for _ in range(5):
+        thread = threading.Thread(target=lambda: seen.append(next(rows)[0]))
+        thread.start()
+        thread.join()
+    assert seen == [f"v{i:02d}" for i in range(5)]
+
+
+def test_concurrent_export_requests(tmp_path, track_factory, monkeypatch):
+    from src.main import app
+
+    store = AnalysisStore(str(tmp_path / "export.db"))
+    for i in range(40):
+        analysis, features = track_factory(f"export{i:02d}", seconds=30, seed=i)
+        store.save(f"export{i:02d}", analysis, features)
+    monkeypatch.setattr(routes, "analysis_store", store)
+
+    client = TestClient(app)
+
+    def export(fmt):
+        response = client.get("/api/export", params={"format": fmt})
+        assert response.status_code == 200
+        return len(response.text.splitlines())
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        counts = list(pool.map(export, ["analyses", "segments"] * 4))
+    store.close()
+    assert counts == [40, 40 * 30] * 4
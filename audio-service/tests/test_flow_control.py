@@ -0,0 +1,82 @@
+import asyncio
+import pickle
+
+import pytest
+import socketio
+
+from src.websocket import server
+from src.websocket.backpressure import ClientState, FlowController
+from src.websocket.bus import AsyncSQLiteManager, JobEvent, JobEventManager
+
+
+async def connect_clients(manager, count: int):
+    sio = socketio.AsyncServer(async_mode='asgi', client_manager=manager)
+    sent = []
+
+    async def record(eio_sid, pkt):
+        sent.append(eio_sid)
+
+    sio._send_eio_packet = record
+    sids = []
+    for i in range(count):
+        sid = await manager.connect(f"eio{i}", '/')
+        await manager.enter_room(sid, '/', 'job_x')
+        sids.append(sid)
+    return sio, sids, sent
+
+
+def throttle(sio, manager, sid) -> FlowController:
+    flow = FlowController(sio, jobs_of=lambda _: ['job_x'], last_seq=lambda _: 0)
+    flow.clients[sid] = ClientState(encoding='json')
+    flow.throttled.add(sid)
+    manager.flow = flow
+    return flow
+
+
+def test_throttled_clients_are_diverted_at_delivery():
+    async def scenario():
+        manager = JobEventManager()
+        sio, (fast, slow), sent = await connect_clients(manager, 2)
+        flow = throttle(sio, manager, slow)
+        await sio.emit('chunk', JobEvent('job_x', 'json', {'seq': 1}), room='job_x')
+        return sent, flow.clients[slow].outbox.chunks
+
+    sent, outbox = asyncio.run(scenario())
+    assert sent == ['eio0']
+    assert outbox == {'job_x': [{'seq': 1}]}
+
+
+def test_events_from_other_workers_are_diverted(tmp_path):
+    async def scenario():
+        manager = AsyncSQLiteManager(f"sqlite:///{tmp_path / 'bus.db'}")
+        sio, (fast, slow), sent = await connect_clients(manager, 2)
+        flow = throttle(sio, manager, slow)
+        # As received from the bus, published by another worker
+        message = {
+            'method': 'emit', 'event': 'progress', 'data': JobEvent('job_x', 'json', {'progress': 40}),
+            'namespace': '/', 'room': 'job_x', 'skip_sid': None, 'callback': None, 'host_id': 'other',
+        }
+        await manager._handle_emit(pickle.loads(pickle.dumps(message)))
+        return sent, flow.clients[slow].outbox.progress
+
+    sent, progress = asyncio.run(scenario())
+    assert sent == ['eio0']
+    assert progress == {'job_x': {'progress': 40}}
+
+
+@pytest.mark.parametrize("bus_url, missed", [("", False), ("sqlite:///bus.db", True)])
+def test_catchup_for_a_job_unknown_to_this_worker(monkeypatch, bus_url, missed):
+    emitted = []
+
+    async def emit(event, data, to=None):
+        emitted.append(data)
+
+    async def client_encoding(sid):
+        return 'json'
+
+    monkeypatch.setattr(server.settings, "message_bus_url", bus_url)
+    monkeypatch.setattr(server.sio, "emit", emit)
+    monkeypatch.setattr(server, "client_encoding", client_encoding)
+    asyncio.run(server.send_catchup("sid", "job_elsewhere", 0))
+    assert emitted[0]["missed"] is missed
+    assert emitted[0]["chunks"] == []
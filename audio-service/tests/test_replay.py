@@ -0,0 +1,35 @@
+import asyncio
+
+from src.config import settings
+from src.websocket import server
+
+
+def test_finished_job_buffer_expires(monkeypatch):
+    monkeypatch.setattr(settings, "replay_buffer_ttl", 0.05)
+
+    async def run():
+        server.reset_replay("job_rp_done")
+        await server.send_chunk("job_rp_done", 0.0, {"startTime": 0.0})
+        await server.send_complete("job_rp_done", {})
+        kept = "job_rp_done" in server.replay_buffers
+        await asyncio.sleep(0.1)
+        return kept, "job_rp_done" in server.replay_buffers
+
+    # Still replayable right after completing, gone after the TTL
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_restarted_job_keeps_its_new_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "replay_buffer_ttl", 0.05)
+
+    async def run():
+        server.reset_replay("job_rp_retry")
+        await server.send_error("job_rp_retry", "EXTRACTION_ERROR", "failed")
+        server.reset_replay("job_rp_retry")
+        await server.send_chunk("job_rp_retry", 0.0, {"startTime": 0.0})
+        await asyncio.sleep(0.1)
+        return server.replay_buffers.get("job_rp_retry")
+
+    buffer = asyncio.run(run())
+    server.replay_buffers.pop("job_rp_retry", None)
+    assert buffer is not None and buffer.last_seq == 1
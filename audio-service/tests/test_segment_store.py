@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from src.storage import SegmentStore, parse_condition
+from src.storage.segments import COLUMN_INDEX, EMOTIONS, SEGMENT_COLUMNS
+
+QUERIES = [
+    (["nucleusAccumbens>0.8"], ["uplifting"]),
+    (["nucleusAccumbens>=0.9", "bass<0.5"], []),
+    ([], ["sad", "calm"]),
+    (["nucleusAccumbens>1.5"], []),
+]
+
+
+def random_track(rng, n: int):
+    matrix = rng.random((n, len(SEGMENT_COLUMNS)), dtype=np.float32)
+    matrix[:, COLUMN_INDEX["startTime"]] = np.arange(n)
+    matrix[:, COLUMN_INDEX["endTime"]] = np.arange(n) + 1
+    # Smooth, so that matching segments form runs
+    matrix[:, COLUMN_INDEX["nucleusAccumbens"]] = (np.sin(np.arange(n) / 5 + rng.random() * 6) + 1) / 2
+    return matrix, rng.integers(0, len(EMOTIONS), n).astype(np.uint8)
+
+
+def brute_force(tracks, conditions, emotions):
+    """Runs of adjacent matching segments, track by track."""
+    moments = []
+    for video_id, (matrix, codes) in tracks.items():
+        mask = np.ones(len(matrix), dtype=bool)
+        for condition in conditions:
+            mask &= condition.matches(matrix[:, COLUMN_INDEX[condition.column]])
+        if emotions:
+            mask &= np.isin(codes, [EMOTIONS.index(e) for e in emotions])
+        i = 0
+        while i < len(matrix):
+            if not mask[i]:
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(matrix) and mask[j + 1]:
+                j += 1
+            moments.append((video_id, float(matrix[i, 0]), float(matrix[j, 1]), j - i + 1))
+            i = j + 1
+    return moments
+
+
+def paged(store, conditions, emotions, limit):
+    moments, cursor = [], None
+    while True:
+        page, cursor = store.query(conditions, emotions, None, limit, cursor)
+        moments += [(m["video_id"], m["start_time"], m["end_time"], m["segments"]) for m in page]
+        if cursor is None:
+            return moments
+
+
+@pytest.fixture
+def library():
+    rng = np.random.default_rng(0)
+    store = SegmentStore()
+    tracks = {}
+    for i in range(120):
+        tracks[f"v{i}"] = random_track(rng, int(rng.integers(1, 200)))
+        store.add(f"v{i}", *tracks[f"v{i}"])
+    return store, tracks, rng
+
+
+@pytest.mark.parametrize("limit", [1, 7, 500])
+@pytest.mark.parametrize("expressions, emotions", QUERIES)
+def test_search_matches_brute_force(library, expressions, emotions, limit):
+    store, tracks, _ = library
+    conditions = [parse_condition(e) for e in expressions]
+    assert paged(store, conditions, emotions, limit) == brute_force(tracks, conditions, emotions)
+
+
+def test_search_after_removes_and_replacements(library):
+    store, tracks, rng = library
+    for i in range(0, 120, 2):
+        store.remove(f"v{i}")
+        del tracks[f"v{i}"]
+    # A replaced track moves to the end of the scan order
+    del tracks["v1"]
+    tracks["v1"] = random_track(rng, 50)
+    store.add("v1", *tracks["v1"])
+
+    assert len(store) == sum(len(matrix) for matrix, _ in tracks.values())
+    for expressions, emotions in QUERIES:
+        conditions = [parse_condition(e) for e in expressions]
+        assert paged(store, conditions, emotions, 7) == brute_force(tracks, conditions, emotions)
+
+
+def test_search_within_one_track(library):
+    store, tracks, _ = library
+    conditions = [parse_condition("nucleusAccumbens>0.8")]
+    moments, cursor = store.query(conditions, [], "v3", 500, None)
+    assert cursor is None
+    assert [(m["video_id"], m["start_time"], m["end_time"], m["segments"]) for m in moments] == \
+        brute_force({"v3": tracks["v3"]}, conditions, [])
+    assert store.query(conditions, [], "missing", 10, None) == ([], None)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.analyzer import SimilarityIndex
+from src.analyzer.similarity import EMBEDDING_DIM
+
+
+def library(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, EMBEDDING_DIM)).astype(np.float32)
+
+
+def near_copy(embedding: np.ndarray, seed: int = 1) -> np.ndarray:
+    return embedding + np.random.default_rng(seed).normal(scale=0.01, size=EMBEDDING_DIM).astype(np.float32)
+
+
+def test_add_finds_near_duplicates():
+    embeddings = library(50)
+    index = SimilarityIndex(approximate=False)
+    index.load((f"t{i}", e) for i, e in enumerate(embeddings))
+    index.add("copy", near_copy(embeddings[7]))
+
+    assert len(index) == 51
+    (key, score), *_ = index.similar("copy", k=3)
+    assert key == "t7" and score > 0.99
+    assert index.search(near_copy(embeddings[12], seed=2), k=1)[0][0][0] == "t12"
+
+
+def test_remove_keeps_the_other_tracks():
+    embeddings = library(20)
+    index = SimilarityIndex(approximate=False)
+    index.load((f"t{i}", e) for i, e in enumerate(embeddings))
+    index.add("copy", near_copy(embeddings[3]))
+
+    index.remove("t3")
+    index.remove("missing")
+    assert "t3" not in index and len(index) == 20
+    assert "t3" not in [key for key, _ in index.similar("copy", k=20)]
+    # The last row was moved into the freed slot
+    np.testing.assert_array_equal(index.get("t19"), embeddings[19])
+    assert index.similar("t19", k=1)[0][0] != "t19"
+
+
+def test_growth_refits_and_clusters():
+    embeddings = library(400)
+    index = SimilarityIndex(approximate=True, probe_lists=4, ivf_min_tracks=200)
+    index.load((f"t{i}", e) for i, e in enumerate(embeddings[:100]))
+    assert not index.clustered
+
+    for i in range(100, 400):
+        index.add(f"t{i}", embeddings[i])
+    assert index.clustered
+
+    exact = SimilarityIndex(approximate=False)
+    exact.load((f"t{i}", e) for i, e in enumerate(embeddings))
+    for i in (0, 150, 399):
+        query = near_copy(embeddings[i], seed=i)
+        assert index.search(query, k=1)[0][0][0] == exact.search(query, k=1)[0][0][0] == f"t{i}"
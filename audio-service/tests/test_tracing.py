@@ -0,0 +1,23 @@
+from src.utils.tracing import Span, Trace, span, start_trace
+
+
+def test_compact_keeps_stage_totals_only():
+    trace = Trace("job_t")
+    with start_trace(trace):
+        for i in range(3):
+            with span("segment", timestamp=i):
+                with span("emit"):
+                    pass
+    stages = trace.stages()
+    assert {name: stats["count"] for name, stats in stages.items()} == {"emit": 3, "segment": 3}
+
+    trace.compact()
+    data = trace.to_dict()
+    assert data["compacted"]
+    assert data["stages"] == stages
+    assert "children" not in data["root"]
+    assert data["span_count"] == 7
+
+
+def test_spans_have_slots():
+    assert not hasattr(Span(name="x", trace=None, start=0.0), "__dict__")
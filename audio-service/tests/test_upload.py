@@ -0,0 +1,102 @@
+import asyncio
+import os
+import stat
+
+import pytest
+from fastapi import HTTPException
+
+from src.analyzer import similarity_index
+from src.api import routes
+from src.config import settings
+from src.extractor import ExtractionError
+from src.storage import analysis_store, segment_store
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """An ffmpeg that reads its input and outputs FAKE_FFMPEG_BYTES of silence."""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        "#!/bin/sh\n"
+        "cat > /dev/null\n"
+        "head -c ${FAKE_FFMPEG_BYTES:-0} /dev/zero\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+class UploadRequest:
+    """The parts of a Starlette request upload_audio reads."""
+
+    def __init__(self, body):
+        self.headers = {"content-type": "application/octet-stream"}
+        self._body = body
+
+    def stream(self):
+        return self._body
+
+
+@pytest.fixture
+def upload_job():
+    yield "up_test"
+    routes.jobs.pop("job_up_test", None)
+
+
+def test_failed_analysis_stops_reading_the_upload(fake_ffmpeg, upload_job, monkeypatch):
+    state = {"blocks": 0, "closed": False}
+
+    async def endless_body():
+        try:
+            while True:
+                state["blocks"] += 1
+                yield b"\0" * 1024
+                await asyncio.sleep(0.01)
+        finally:
+            state["closed"] = True
+
+    async def failing_analysis(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        raise ExtractionError("Failed to decode audio: bad input")
+
+    monkeypatch.setattr(routes, "analyze_stream", failing_analysis)
+
+    async def upload():
+        with pytest.raises(HTTPException) as excinfo:
+            await routes.upload_audio(UploadRequest(endless_body()), upload_id=upload_job)
+        blocks = state["blocks"]
+        await asyncio.sleep(0.05)
+        return excinfo.value, blocks, asyncio.all_tasks() - {asyncio.current_task()}
+
+    error, blocks, pending = asyncio.run(upload())
+
+    assert error.status_code == 400
+    assert routes.jobs["job_up_test"]["status"] == "error"
+    assert state["closed"]
+    assert state["blocks"] == blocks
+    assert not pending
+
+
+@pytest.fixture
+def stored_upload(upload_job):
+    yield upload_job
+    analysis_store.delete(upload_job)
+    similarity_index.remove(upload_job)
+    segment_store.remove(upload_job)
+
+
+@pytest.mark.parametrize("seconds, truncated", [(3, True), (2, False)])
+def test_upload_records_truncation_at_the_cap(fake_ffmpeg, stored_upload, monkeypatch, seconds, truncated):
+    monkeypatch.setattr(settings, "max_audio_duration", 3)
+    monkeypatch.setattr(settings, "dedup_enabled", False)
+    # What ffmpeg -t 3 outputs for an upload of at least `seconds` seconds
+    monkeypatch.setenv("FAKE_FFMPEG_BYTES", str(seconds * settings.sample_rate * 4))
+
+    async def body():
+        yield b"\0" * 4096
+
+    asyncio.run(routes.upload_audio(UploadRequest(body()), upload_id=stored_upload))
+
+    analysis = routes.jobs["job_up_test"]["analysis"]
+    assert analysis["truncated"] is truncated
+    assert analysis["analyzedDuration"] == seconds
+    assert analysis_store.get_analysis(stored_upload)["truncated"] is truncated
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from src.api.schemas import AnalyzeRequest, BatchAnalyzeRequest
+from src.extractor import HTTPMediaBackend, LocalDirectoryBackend, VideoRejectedError
+
+TRAVERSAL_IDS = ["../../etc/passwd", "..", "a/b", "a\\b", "/abs", "", "x" * 65, "id\x00"]
+
+
+@pytest.mark.parametrize("video_id", TRAVERSAL_IDS)
+def test_requests_reject_unsafe_ids(video_id):
+    with pytest.raises(ValidationError):
+        AnalyzeRequest(video_id=video_id, youtube_url="https://example.com")
+    with pytest.raises(ValidationError):
+        BatchAnalyzeRequest(video_ids=["ok", video_id])
+
+
+def test_requests_accept_plain_ids():
+    assert AnalyzeRequest(video_id="dQw4w9WgXcQ", youtube_url="u").video_id == "dQw4w9WgXcQ"
+    assert BatchAnalyzeRequest(video_ids=["a-b_c"]).video_ids == ["a-b_c"]
+
+
+@pytest.mark.parametrize("video_id", TRAVERSAL_IDS + ["../secret"])
+def test_local_backend_rejects_unsafe_ids(tmp_path, video_id):
+    media = tmp_path / "media"
+    media.mkdir()
+    (tmp_path / "secret.wav").write_bytes(b"RIFF")
+    backend = LocalDirectoryBackend(str(media))
+    with pytest.raises(VideoRejectedError, match="Invalid video ID"):
+        asyncio.run(backend.get_video_info("", video_id))
+    with pytest.raises(VideoRejectedError, match="Invalid video ID"):
+        asyncio.run(backend.get_stream("", video_id))
+
+
+@pytest.mark.parametrize("video_id", TRAVERSAL_IDS)
+def test_http_backend_rejects_unsafe_ids_before_fetching(tmp_path, video_id):
+    # Nothing listens on the base URL: a request would fail with ExtractionError instead
+    backend = HTTPMediaBackend("http://127.0.0.1:9", output_dir=str(tmp_path))
+    with pytest.raises(VideoRejectedError):
+        asyncio.run(backend.extract_audio("", video_id))
+    assert list(tmp_path.iterdir()) == []
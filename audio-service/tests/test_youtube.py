@@ -0,0 +1,37 @@
+import http.cookiejar
+
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+from src.extractor import VideoInfo
+from src.extractor.youtube import _stream_source_from
+
+STREAM_URL = "https://rr1.googlevideo.com/videoplayback?id=1"
+VIDEO_INFO = VideoInfo(id="v", title="v", duration=10, thumbnail_url="")
+
+
+def cookie(name: str, value: str, domain: str) -> http.cookiejar.Cookie:
+    return http.cookiejar.Cookie(
+        0, name, value, None, False, domain, True, domain.startswith("."), "/", True,
+        True, None, False, None, None, {},
+    )
+
+
+def test_cookie_header_comes_from_the_jar():
+    jar = YoutubeDLCookieJar()
+    jar.set_cookie(cookie("VISITOR", "abc", ".googlevideo.com"))
+    jar.set_cookie(cookie("OTHER", "nope", ".example.com"))
+    info = {
+        "url": STREAM_URL,
+        "http_headers": {"User-Agent": "test"},
+        "cookies": "VISITOR=abc; Domain=.googlevideo.com; Path=/; Secure",
+    }
+
+    source = _stream_source_from(info, VIDEO_INFO, jar)
+
+    assert source.headers == {"User-Agent": "test", "Cookie": "VISITOR=abc"}
+
+
+def test_no_cookie_header_without_matching_cookies():
+    info = {"url": STREAM_URL, "cookies": "VISITOR=abc; Domain=.googlevideo.com; Path=/"}
+    assert "Cookie" not in _stream_source_from(info, VIDEO_INFO, YoutubeDLCookieJar()).headers
+    assert "Cookie" not in _stream_source_from(info, VIDEO_INFO).headers